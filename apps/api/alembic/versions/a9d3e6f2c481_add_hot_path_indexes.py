@@ -0,0 +1,73 @@
+"""add_hot_path_indexes
+
+Revision ID: a9d3e6f2c481
+Revises: f1a4c7e2d9b3
+Create Date: 2026-10-19 21:05:37.118260
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d3e6f2c481'
+down_revision: Union[str, None] = 'f1a4c7e2d9b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (索引名, 表名, 列)
+INDEXES = [
+    # 首条用户消息预览、assistant_exists 子查询：按会话 + 角色过滤并按时间排序
+    ('ix_message_conversation_role', 'messages', ['conversation_id', 'role', 'created_at']),
+    # 主键为 (class_id, user_id)，按用户单独查询时用不上
+    ('ix_class_student_student', 'class_students', ['student_id']),
+    ('ix_class_teacher_teacher', 'class_teachers', ['teacher_id']),
+    # 新建提示词时按作用域取 max(version)
+    ('ix_prompt_scope_version', 'prompt_scopes', ['scope_type', 'class_id', 'version']),
+]
+
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def _drop_invalid_index(name: str) -> None:
+    # CONCURRENTLY 建索引中途失败会留下无效索引，IF NOT EXISTS 会跳过它，需先删除
+    invalid = op.get_bind().execute(
+        sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {'name': name},
+    ).scalar()
+    if invalid:
+        op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+def upgrade() -> None:
+    # 在线建索引：PostgreSQL 上使用 CONCURRENTLY，不阻塞写入；它不能在事务中执行
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            if _is_postgresql() and not op.get_context().as_sql:
+                _drop_invalid_index(name)
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                if_exists=True,
+                postgresql_concurrently=True,
+            )
@@ -0,0 +1,149 @@
+"""partition_messages_and_audit_logs
+
+Revision ID: c4e8b1f7a2d6
+Revises: a9d3e6f2c481
+Create Date: 2026-10-19 23:12:04.531907
+
+"""
+from datetime import date, datetime
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8b1f7a2d6'
+down_revision: Union[str, None] = 'a9d3e6f2c481'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 预先建好未来几个月的分区，之后由 python -m app.jobs.partitions 定期补建
+MONTHS_AHEAD = 3
+
+# 表名 -> (外键, 索引)；分区表的主键必须包含分区键，改为 (id, created_at)
+TABLES = {
+    'messages': (
+        ('messages_conversation_id_fkey', 'conversation_id', 'conversations(id) ON DELETE CASCADE'),
+        [
+            ('ix_message_conversation', ['conversation_id', 'created_at']),
+            ('ix_message_conversation_role', ['conversation_id', 'role', 'created_at']),
+            ('ix_message_created_at', ['created_at']),
+        ],
+    ),
+    'audit_logs': (
+        ('audit_logs_actor_id_fkey', 'actor_id', 'users(id)'),
+        [
+            ('ix_audit_actor', ['actor_id', 'created_at']),
+            ('ix_audit_action', ['action', 'created_at']),
+        ],
+    ),
+}
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition_name(table: str, month: date) -> str:
+    return f'{table}_y{month.year}m{month.month:02d}'
+
+
+def _first_month(table: str) -> date:
+    now = datetime.utcnow()
+    current = date(now.year, now.month, 1)
+    if op.get_context().as_sql:
+        # 离线生成 SQL 时无法查询数据，只建当前月起的分区，其余数据落入 default 分区
+        return current
+    earliest = op.get_bind().execute(
+        sa.text(f'SELECT min(created_at) FROM {table}_unpartitioned')
+    ).scalar()
+    if earliest is None:
+        return current
+    return min(date(earliest.year, earliest.month, 1), current)
+
+
+def _partition_table(table: str) -> None:
+    (fk_name, fk_column, fk_target), indexes = TABLES[table]
+    legacy = f'{table}_unpartitioned'
+
+    # 旧表改名保留，索引与约束名同时改掉，新表才能沿用原名
+    op.execute(f'ALTER TABLE {table} RENAME TO {legacy}')
+    op.execute(f'ALTER TABLE {legacy} RENAME CONSTRAINT {table}_pkey TO {legacy}_pkey')
+    op.execute(f'ALTER TABLE {legacy} RENAME CONSTRAINT {fk_name} TO {legacy}_{fk_column}_fkey')
+    for name, _ in indexes:
+        op.execute(f'ALTER INDEX {name} RENAME TO {name}_unpartitioned')
+
+    # 列定义与默认值（id 仍使用原序列）沿用旧表
+    op.execute(
+        f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+        f'PARTITION BY RANGE (created_at)'
+    )
+    op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, created_at)')
+    op.execute(
+        f'ALTER TABLE {table} ADD CONSTRAINT {fk_name} '
+        f'FOREIGN KEY ({fk_column}) REFERENCES {fk_target}'
+    )
+    # 在分区表上建索引，之后创建或挂载的分区自动带上
+    for name, columns in indexes:
+        op.execute(f'CREATE INDEX {name} ON {table} ({", ".join(columns)})')
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+
+    # default 分区兜底：尚未建分区的月份写入不会失败
+    op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+    now = datetime.utcnow()
+    last = _add_months(date(now.year, now.month, 1), MONTHS_AHEAD)
+    month = _first_month(table)
+    while month <= last:
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE {_partition_name(table, month)} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+
+    op.execute(f'INSERT INTO {table} SELECT * FROM {legacy}')
+    op.execute(f'DROP TABLE {legacy}')
+
+
+def _unpartition_table(table: str) -> None:
+    (fk_name, fk_column, fk_target), indexes = TABLES[table]
+    partitioned = f'{table}_partitioned'
+
+    op.execute(f'ALTER TABLE {table} RENAME TO {partitioned}')
+    op.execute(f'ALTER TABLE {partitioned} RENAME CONSTRAINT {table}_pkey TO {partitioned}_pkey')
+    op.execute(f'ALTER TABLE {partitioned} RENAME CONSTRAINT {fk_name} TO {partitioned}_{fk_column}_fkey')
+    for name, _ in indexes:
+        op.execute(f'ALTER INDEX {name} RENAME TO {name}_partitioned')
+
+    op.execute(
+        f'CREATE TABLE {table} (LIKE {partitioned} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+    )
+    op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)')
+    op.execute(
+        f'ALTER TABLE {table} ADD CONSTRAINT {fk_name} '
+        f'FOREIGN KEY ({fk_column}) REFERENCES {fk_target}'
+    )
+    for name, columns in indexes:
+        op.execute(f'CREATE INDEX {name} ON {table} ({", ".join(columns)})')
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+
+    op.execute(f'INSERT INTO {table} SELECT * FROM {partitioned}')
+    # 连同全部分区一起删除（已被保留策略摘除的分区不受影响）
+    op.execute(f'DROP TABLE {partitioned}')
+
+
+def upgrade() -> None:
+    # 仅 PostgreSQL 支持声明式分区；数据整体复制到新表，需在维护窗口执行
+    if op.get_context().dialect.name != 'postgresql':
+        return
+    for table in TABLES:
+        _partition_table(table)
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name != 'postgresql':
+        return
+    for table in TABLES:
+        _unpartition_table(table)
@@ -0,0 +1,47 @@
+"""add_deletion_jobs_table
+
+Revision ID: d3a8f61e4b27
+Revises: b7e41d2c9a05
+Create Date: 2026-10-19 14:37:05.512904
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a8f61e4b27'
+down_revision: Union[str, None] = 'b7e41d2c9a05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 创建后台删除任务表
+    op.create_table('deletion_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('requested_by', sa.Integer(), nullable=False),
+    sa.Column('target_type', sa.Enum('user', 'class', 'cohort', name='deletiontarget'), nullable=False),
+    sa.Column('target_id', sa.Integer(), nullable=True),
+    sa.Column('target_label', sa.String(length=100), nullable=True),
+    sa.Column('scope', sa.JSON(), nullable=False),
+    sa.Column('status', sa.Enum('pending', 'processing', 'completed', 'failed', name='deletionstatus'), nullable=False),
+    sa.Column('total_users', sa.Integer(), nullable=False),
+    sa.Column('deleted_users', sa.Integer(), nullable=False),
+    sa.Column('deleted_conversations', sa.Integer(), nullable=False),
+    sa.Column('deleted_messages', sa.Integer(), nullable=False),
+    sa.Column('error_message', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['requested_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_deletion_jobs_id'), 'deletion_jobs', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_deletion_jobs_id'), table_name='deletion_jobs')
+    op.drop_table('deletion_jobs')
+    op.execute("DROP TYPE IF EXISTS deletionstatus")
+    op.execute("DROP TYPE IF EXISTS deletiontarget")
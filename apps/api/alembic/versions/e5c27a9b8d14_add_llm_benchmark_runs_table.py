@@ -0,0 +1,57 @@
+"""add_llm_benchmark_runs_table
+
+Revision ID: e5c27a9b8d14
+Revises: d3a8f61e4b27
+Create Date: 2026-10-19 16:02:48.371950
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c27a9b8d14'
+down_revision: Union[str, None] = 'd3a8f61e4b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 创建 LLM 压测结果表
+    op.create_table('llm_benchmark_runs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('requested_by', sa.Integer(), nullable=True),
+    sa.Column('provider_name', sa.String(length=50), nullable=True),
+    sa.Column('base_url', sa.String(length=255), nullable=True),
+    sa.Column('model_name', sa.String(length=100), nullable=False),
+    sa.Column('class_id', sa.Integer(), nullable=True),
+    sa.Column('prompt_version', sa.Integer(), nullable=True),
+    sa.Column('concurrency', sa.Integer(), nullable=False),
+    sa.Column('total_requests', sa.Integer(), nullable=False),
+    sa.Column('max_tokens', sa.Integer(), nullable=False),
+    sa.Column('success_count', sa.Integer(), nullable=False),
+    sa.Column('error_count', sa.Integer(), nullable=False),
+    sa.Column('rate_limited_count', sa.Integer(), nullable=False),
+    sa.Column('wall_time_ms', sa.Float(), nullable=False),
+    sa.Column('ttft_p50_ms', sa.Float(), nullable=True),
+    sa.Column('ttft_p90_ms', sa.Float(), nullable=True),
+    sa.Column('ttft_p99_ms', sa.Float(), nullable=True),
+    sa.Column('latency_p50_ms', sa.Float(), nullable=True),
+    sa.Column('latency_p90_ms', sa.Float(), nullable=True),
+    sa.Column('latency_p99_ms', sa.Float(), nullable=True),
+    sa.Column('tokens_per_second', sa.Float(), nullable=True),
+    sa.Column('aggregate_tokens_per_second', sa.Float(), nullable=True),
+    sa.Column('errors', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['requested_by'], ['users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_llm_benchmark_runs_id'), 'llm_benchmark_runs', ['id'], unique=False)
+    op.create_index('ix_llm_benchmark_model', 'llm_benchmark_runs', ['model_name', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_llm_benchmark_model', table_name='llm_benchmark_runs')
+    op.drop_index(op.f('ix_llm_benchmark_runs_id'), table_name='llm_benchmark_runs')
+    op.drop_table('llm_benchmark_runs')
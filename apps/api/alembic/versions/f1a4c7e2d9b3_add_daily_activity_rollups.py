@@ -0,0 +1,69 @@
+"""add_daily_activity_rollups
+
+Revision ID: f1a4c7e2d9b3
+Revises: e5c27a9b8d14
+Create Date: 2026-10-19 18:20:11.504318
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a4c7e2d9b3'
+down_revision: Union[str, None] = 'e5c27a9b8d14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 学生每日活动汇总
+    op.create_table('student_daily_activity',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('class_id', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('message_count', sa.Integer(), nullable=False),
+    sa.Column('conversation_count', sa.Integer(), nullable=False),
+    sa.Column('token_in', sa.Integer(), nullable=False),
+    sa.Column('token_out', sa.Integer(), nullable=False),
+    sa.Column('error_count', sa.Integer(), nullable=False),
+    sa.Column('latency_ms_total', sa.Float(), nullable=False),
+    sa.Column('latency_samples', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['class_id'], ['classes.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['student_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('day', 'class_id', 'student_id')
+    )
+    op.create_index('ix_student_daily_activity_student', 'student_daily_activity', ['student_id', 'day'], unique=False)
+
+    # 班级每日活动汇总
+    op.create_table('class_daily_activity',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('class_id', sa.Integer(), nullable=False),
+    sa.Column('active_students', sa.Integer(), nullable=False),
+    sa.Column('message_count', sa.Integer(), nullable=False),
+    sa.Column('conversation_count', sa.Integer(), nullable=False),
+    sa.Column('token_in', sa.Integer(), nullable=False),
+    sa.Column('token_out', sa.Integer(), nullable=False),
+    sa.Column('error_count', sa.Integer(), nullable=False),
+    sa.Column('latency_ms_total', sa.Float(), nullable=False),
+    sa.Column('latency_samples', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['class_id'], ['classes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('day', 'class_id')
+    )
+    op.create_index('ix_class_daily_activity_class', 'class_daily_activity', ['class_id', 'day'], unique=False)
+
+    # 汇总任务按日期范围重算，需要按创建时间查找消息与会话
+    op.create_index('ix_message_created_at', 'messages', ['created_at'], unique=False)
+    op.create_index('ix_conversation_created_at', 'conversations', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_conversation_created_at', table_name='conversations')
+    op.drop_index('ix_message_created_at', table_name='messages')
+    op.drop_index('ix_class_daily_activity_class', table_name='class_daily_activity')
+    op.drop_table('class_daily_activity')
+    op.drop_index('ix_student_daily_activity_student', table_name='student_daily_activity')
+    op.drop_table('student_daily_activity')
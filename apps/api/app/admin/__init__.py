@@ -1,6 +1,16 @@
-from app.admin.llm_routes import router as llm_settings_router
+from app.admin.deletion_routes import router as deletion_jobs_router
+from app.admin.metrics_routes import router as metrics_router
 from app.admin.routes import router as admin_router
 
-admin_router.include_router(llm_settings_router)
+admin_router.include_router(deletion_jobs_router)
+admin_router.include_router(metrics_router)
 
-__all__ = ["admin_router"]
+# 不常用的子系统（名单导入、账号单 XLSX、LLM 设置与压测）在首次请求时才导入，
+# 由 app.main 以 admin_router 的前缀与标签按需登记：(路由, 路径前缀)
+lazy_admin_routers = [
+    ("app.admin.credential_routes:router", ("/users/credential-sheet", "/classes/")),
+    ("app.admin.import_routes:router", ("/users/import-jobs",)),
+    ("app.admin.llm_routes:router", ("/settings/llm",)),
+]
+
+__all__ = ["admin_router", "lazy_admin_routers"]
@@ -0,0 +1,127 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.admin.credential_sheets import (
+    SHEET_FORMATS,
+    CredentialRow,
+    CredentialSheetWriter,
+    iter_file_chunks,
+)
+from app.admin.user_import import generate_random_password
+from app.audit import record_audit
+from app.auth.deps import require_admin
+from app.auth.principal_cache import invalidate_principal
+from app.auth.security import hash_passwords_parallel
+from app.config import get_settings
+from app.db.base import get_db
+from app.models import Class, ClassStudent, User, UserRole
+from app.schemas.admin import CredentialSheetRequest
+
+router = APIRouter()
+settings = get_settings()
+
+SHEET_FORMAT_PATTERN = "^(xlsx|csv)$"
+
+
+def credential_sheet_response(writer: CredentialSheetWriter, file, filename: str):
+    return StreamingResponse(
+        iter_file_chunks(file),
+        media_type=SHEET_FORMATS[writer.fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{writer.fmt}"'
+        },
+    )
+
+
+@router.post("/users/credential-sheet")
+async def render_credential_sheet(
+    request: CredentialSheetRequest,
+    format: str = Query("xlsx", pattern=SHEET_FORMAT_PATTERN),
+    admin: User = Depends(require_admin),
+):
+    """把批量导入返回的账号密码生成可打印的密码单（按班级分表，超管专用）"""
+    writer = CredentialSheetWriter(format)
+    writer.add_all(
+        CredentialRow(
+            class_name=u.class_name,
+            username=u.username,
+            display_name=u.display_name,
+            role=u.role,
+            password=u.initial_password,
+        )
+        for u in request.users
+    )
+    file = await run_in_threadpool(writer.close)
+    return credential_sheet_response(writer, file, "credentials")
+
+
+@router.post("/classes/{class_id}/reset-passwords")
+async def reset_class_passwords(
+    class_id: int,
+    format: str = Query("xlsx", pattern=SHEET_FORMAT_PATTERN),
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """重置班级内所有学生的密码并直接下载密码单（超管专用）
+
+    - 按 import_batch_size 分批读取学生、并行计算哈希、批量更新
+    - 所有批次在同一事务中提交，提交成功后才返回密码单
+    """
+    class_obj = await db.get(Class, class_id)
+    if not class_obj:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="班级不存在")
+
+    writer = CredentialSheetWriter(format)
+    user_ids: list[int] = []
+    last_id = 0
+    while True:
+        result = await db.execute(
+            select(User.id, User.username, User.display_name)
+            .join(ClassStudent, ClassStudent.student_id == User.id)
+            .where(ClassStudent.class_id == class_id, User.id > last_id)
+            .order_by(User.id)
+            .limit(settings.import_batch_size)
+        )
+        students = result.all()
+        if not students:
+            break
+        last_id = students[-1].id
+
+        passwords = [generate_random_password() for _ in students]
+        password_hashes = await hash_passwords_parallel(passwords)
+        await db.execute(
+            update(User),
+            [
+                {"id": s.id, "password_hash": h, "must_change_password": True}
+                for s, h in zip(students, password_hashes)
+            ],
+        )
+        for s, password in zip(students, passwords):
+            writer.add(
+                CredentialRow(
+                    class_name=class_obj.name,
+                    username=s.username,
+                    display_name=s.display_name,
+                    role=UserRole.STUDENT,
+                    password=password,
+                )
+            )
+        user_ids.extend(s.id for s in students)
+
+    await db.commit()
+
+    # 记录审计日志
+    record_audit(
+        actor_id=admin.id,
+        action="reset_class_passwords",
+        target_type="class",
+        target_id=class_id,
+        meta={"count": len(user_ids)},
+    )
+    await invalidate_principal(*user_ids)
+
+    file = await run_in_threadpool(writer.close)
+    return credential_sheet_response(writer, file, f"class-{class_id}-credentials")
@@ -0,0 +1,136 @@
+"""账号密码单生成：按班级分组写入 XLSX（openpyxl 只写模式）或 CSV。
+
+行数据逐条写入临时文件，内存占用与人数无关；生成完成后按块流式返回。
+"""
+
+import csv
+import re
+import tempfile
+from typing import IO, Iterable, Iterator, NamedTuple, Optional
+
+from app.models import UserRole
+
+SHEET_FORMATS = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+}
+
+CREDENTIAL_SHEET_HEADER = ["班级", "学号/工号", "姓名", "角色", "初始密码"]
+
+NO_CLASS_LABEL = "未分班"
+
+ROLE_LABELS = {
+    UserRole.STUDENT: "学生",
+    UserRole.TEACHER: "教师",
+    UserRole.ADMIN: "管理员",
+}
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+class CredentialRow(NamedTuple):
+    class_name: Optional[str]
+    username: str
+    display_name: Optional[str]
+    role: UserRole
+    password: str
+
+    def values(self) -> list[str]:
+        return [
+            self.class_name or NO_CLASS_LABEL,
+            self.username,
+            self.display_name or "",
+            ROLE_LABELS.get(self.role, self.role.value),
+            self.password,
+        ]
+
+
+class CredentialSheetWriter:
+    """按班级分组的密码单写入器
+
+    - xlsx：每个班级一个工作表，只写模式下各表分别落盘
+    - csv：每个班级先写入独立的临时文件，结束时按班级顺序拼接
+    """
+
+    def __init__(self, fmt: str):
+        if fmt not in SHEET_FORMATS:
+            raise ValueError(f"不支持的格式：{fmt}")
+        self.fmt = fmt
+        self.count = 0
+        self._groups: dict[str, object] = {}
+        self._sheet_titles: set[str] = set()
+        self._workbook = None
+        if fmt == "xlsx":
+            from openpyxl import Workbook
+
+            self._workbook = Workbook(write_only=True)
+
+    def _sheet_title(self, class_name: str) -> str:
+        base = _INVALID_SHEET_CHARS.sub("_", class_name)[:31] or NO_CLASS_LABEL
+        title, suffix = base, 2
+        while title in self._sheet_titles:
+            tail = f"_{suffix}"
+            title = base[: 31 - len(tail)] + tail
+            suffix += 1
+        self._sheet_titles.add(title)
+        return title
+
+    def _group(self, class_name: str):
+        group = self._groups.get(class_name)
+        if group is None:
+            if self._workbook is not None:
+                group = self._workbook.create_sheet(self._sheet_title(class_name))
+                group.append(CREDENTIAL_SHEET_HEADER)
+            else:
+                group = tempfile.TemporaryFile(
+                    mode="w+", newline="", encoding="utf-8"
+                )
+            self._groups[class_name] = group
+        return group
+
+    def add(self, row: CredentialRow) -> None:
+        values = row.values()
+        group = self._group(values[0])
+        if self._workbook is not None:
+            group.append(values)
+        else:
+            csv.writer(group).writerow(values)
+        self.count += 1
+
+    def add_all(self, rows: Iterable[CredentialRow]) -> None:
+        for row in rows:
+            self.add(row)
+
+    def close(self) -> IO[bytes]:
+        """写入完成，返回定位到开头的临时文件"""
+        output = tempfile.TemporaryFile()
+        if self._workbook is not None:
+            if not self._groups:
+                self._workbook.create_sheet(NO_CLASS_LABEL).append(
+                    CREDENTIAL_SHEET_HEADER
+                )
+            self._workbook.save(output)
+        else:
+            # 带 BOM，Excel 直接打开不乱码
+            output.write(
+                ("\ufeff" + ",".join(CREDENTIAL_SHEET_HEADER) + "\r\n").encode("utf-8")
+            )
+            for group in self._groups.values():
+                group.seek(0)
+                while chunk := group.read(STREAM_CHUNK_SIZE):
+                    output.write(chunk.encode("utf-8"))
+                group.close()
+        self._groups.clear()
+        output.seek(0)
+        return output
+
+
+def iter_file_chunks(f: IO[bytes]) -> Iterator[bytes]:
+    """按块读取并在结束后关闭文件"""
+    try:
+        while chunk := f.read(STREAM_CHUNK_SIZE):
+            yield chunk
+    finally:
+        f.close()
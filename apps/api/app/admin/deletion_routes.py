@@ -0,0 +1,231 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.audit import record_audit
+from app.auth.deps import require_admin
+from app.auth.principal_cache import invalidate_principal
+from app.db.base import get_db
+from app.jobs import enqueue_job
+from app.models import (
+    Class,
+    ClassStudent,
+    DeletionJob,
+    DeletionStatus,
+    DeletionTarget,
+    User,
+    UserStatus,
+)
+from app.schemas.admin import DeletionJobCreate, DeletionJobInfo
+
+router = APIRouter()
+
+# 尚未结束的删除任务：失败的任务可以重试，涉及的账号同样视为待删除
+UNFINISHED_DELETION_STATUSES = (
+    DeletionStatus.PENDING,
+    DeletionStatus.PROCESSING,
+    DeletionStatus.FAILED,
+)
+
+
+def _deletion_job_to_info(job: DeletionJob) -> DeletionJobInfo:
+    return DeletionJobInfo(
+        id=job.id,
+        requested_by=job.requested_by,
+        target_type=job.target_type,
+        target_id=job.target_id,
+        target_label=job.target_label,
+        status=job.status,
+        total_users=job.total_users or 0,
+        deleted_users=job.deleted_users or 0,
+        deleted_conversations=job.deleted_conversations or 0,
+        deleted_messages=job.deleted_messages or 0,
+        error_message=job.error_message,
+        created_at=job.created_at.isoformat() if job.created_at else "",
+        finished_at=job.finished_at.isoformat() if job.finished_at else None,
+    )
+
+
+async def _enqueue_deletion(db: AsyncSession, job: DeletionJob) -> None:
+    try:
+        await run_in_threadpool(enqueue_job, "app.jobs.deletion.run_deletion_job", job.id)
+    except Exception:
+        job.status = DeletionStatus.FAILED
+        job.error_message = "任务队列不可用"
+        await db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="任务队列不可用，请稍后重试"
+        )
+
+
+async def users_pending_deletion(db: AsyncSession, user_ids: list[int]) -> set[int]:
+    """返回其中已提交删除、但删除任务尚未完成的用户 id"""
+    if not user_ids:
+        return set()
+    result = await db.execute(
+        select(DeletionJob.scope).where(DeletionJob.status.in_(UNFINISHED_DELETION_STATUSES))
+    )
+    pending = {user_id for scope in result.scalars() for user_id in scope.get("user_ids", [])}
+    return pending.intersection(user_ids)
+
+
+async def ensure_not_pending_deletion(db: AsyncSession, user_id: int) -> None:
+    """账号正在后台删除时拒绝修改（恢复启用或修改后仍会被删除任务删除）"""
+    if await users_pending_deletion(db, [user_id]):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="该用户正在删除中，无法修改"
+        )
+
+
+async def submit_deletion_job(
+    db: AsyncSession,
+    admin: User,
+    target_type: DeletionTarget,
+    target_id: Optional[int],
+    target_label: Optional[str],
+    user_ids: list[int],
+    class_ids: list[int],
+) -> DeletionJob:
+    """立即禁用涉及的账号，并创建后台删除任务"""
+    if user_ids:
+        await db.execute(
+            update(User).where(User.id.in_(user_ids)).values(status=UserStatus.DISABLED)
+        )
+    job = DeletionJob(
+        requested_by=admin.id,
+        target_type=target_type,
+        target_id=target_id,
+        target_label=target_label,
+        scope={"user_ids": user_ids, "class_ids": class_ids},
+        status=DeletionStatus.PENDING,
+        total_users=len(user_ids),
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    await invalidate_principal(*user_ids)
+
+    await _enqueue_deletion(db, job)
+
+    # 记录审计日志
+    record_audit(
+        actor_id=admin.id,
+        action=f"delete_{target_type.value}",
+        target_type=target_type.value,
+        target_id=target_id,
+        meta={"label": target_label, "users": len(user_ids), "job_id": job.id},
+    )
+    return job
+
+
+async def _students_of_classes(db: AsyncSession, class_ids: list[int]) -> list[int]:
+    result = await db.execute(
+        select(ClassStudent.student_id)
+        .where(ClassStudent.class_id.in_(class_ids))
+        .distinct()
+        .order_by(ClassStudent.student_id)
+    )
+    return list(result.scalars().all())
+
+
+@router.post("/deletion-jobs", response_model=DeletionJobInfo)
+async def create_deletion_job(
+    request: DeletionJobCreate,
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """创建后台删除任务（超管专用）
+
+    - user：删除单个用户及其对话记录
+    - class：删除班级及班内全部学生
+    - cohort：删除某个年级的全部班级及学生（毕业届）
+    教师账号不会随班级删除。
+    """
+    if request.target_type == DeletionTarget.USER:
+        if request.target_id is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="请指定用户")
+        user = await db.get(User, request.target_id)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="用户不存在")
+        if user.id == admin.id:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="不能删除自己")
+        job = await submit_deletion_job(
+            db, admin, DeletionTarget.USER, user.id, user.username, [user.id], []
+        )
+
+    elif request.target_type == DeletionTarget.CLASS:
+        if request.target_id is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="请指定班级")
+        class_obj = await db.get(Class, request.target_id)
+        if not class_obj:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="班级不存在")
+        user_ids = await _students_of_classes(db, [class_obj.id])
+        job = await submit_deletion_job(
+            db, admin, DeletionTarget.CLASS, class_obj.id, class_obj.name, user_ids, [class_obj.id]
+        )
+
+    else:
+        if not request.grade:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="请指定年级")
+        result = await db.execute(select(Class.id).where(Class.grade == request.grade))
+        class_ids = list(result.scalars().all())
+        if not class_ids:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail=f"年级 {request.grade} 下没有班级"
+            )
+        user_ids = await _students_of_classes(db, class_ids)
+        job = await submit_deletion_job(
+            db, admin, DeletionTarget.COHORT, None, request.grade, user_ids, class_ids
+        )
+
+    return _deletion_job_to_info(job)
+
+
+@router.get("/deletion-jobs/{job_id}", response_model=DeletionJobInfo)
+async def get_deletion_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """查询删除任务进度（超管专用）"""
+    job = await db.get(DeletionJob, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="删除任务不存在")
+    return _deletion_job_to_info(job)
+
+
+@router.post("/deletion-jobs/{job_id}/resume", response_model=DeletionJobInfo)
+async def resume_deletion_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """重新入队失败的删除任务，从已删除的位置继续（超管专用）
+
+    只能重试失败的任务（包括入队失败的任务）；待执行或执行中的任务已有 worker 负责，
+    再次入队会让两个 worker 同时删除。
+    """
+    job = await db.get(DeletionJob, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="删除任务不存在")
+    if job.status == DeletionStatus.COMPLETED:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="删除任务已完成")
+
+    # 以状态为条件更新，并发的重试请求只有一个能入队
+    result = await db.execute(
+        update(DeletionJob)
+        .where(DeletionJob.id == job_id, DeletionJob.status == DeletionStatus.FAILED)
+        .values(status=DeletionStatus.PENDING, error_message=None)
+    )
+    await db.commit()
+    if result.rowcount != 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="删除任务正在执行，只能重试失败的任务"
+        )
+    await db.refresh(job)
+    await _enqueue_deletion(db, job)
+
+    return _deletion_job_to_info(job)
@@ -0,0 +1,179 @@
+from datetime import datetime
+from pathlib import Path
+from uuid import uuid4
+
+import csv
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.admin.credential_routes import SHEET_FORMAT_PATTERN, credential_sheet_response
+from app.admin.credential_sheets import CredentialRow, CredentialSheetWriter
+from app.admin.user_import import ROSTER_SUFFIXES
+from app.audit import record_audit
+from app.auth.deps import require_admin
+from app.config import get_settings
+from app.db.base import get_db
+from app.jobs import enqueue_job
+from app.models import ImportJob, ImportStatus, User, UserRole
+from app.schemas.admin import ImportJobInfo
+
+router = APIRouter()
+settings = get_settings()
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def _import_job_to_info(job: ImportJob) -> ImportJobInfo:
+    return ImportJobInfo(
+        id=job.id,
+        requested_by=job.requested_by,
+        filename=job.filename,
+        dry_run=job.dry_run,
+        status=job.status,
+        total_rows=job.total_rows,
+        processed_rows=job.processed_rows or 0,
+        created_count=job.created_count or 0,
+        error_count=job.error_count or 0,
+        errors=job.errors or [],
+        has_credentials=bool(job.result_file_key),
+        error_message=job.error_message,
+        created_at=job.created_at.isoformat() if job.created_at else "",
+        finished_at=job.finished_at.isoformat() if job.finished_at else None,
+    )
+
+
+@router.post("/users/import-jobs", response_model=ImportJobInfo)
+async def create_user_import_job(
+    file: UploadFile = File(...),
+    dry_run: bool = Form(False),
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """上传 XLSX/CSV 名单并创建后台导入任务（超管专用）
+
+    - 表头需包含：学号/工号、角色；可选：姓名、班级
+    - dry_run=true 时只校验，不创建用户
+    - 上传文件按块写入磁盘，不整体读入内存
+    """
+    suffix = Path(file.filename or "").suffix.lower()
+    if suffix not in ROSTER_SUFFIXES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="仅支持 .xlsx 或 .csv 文件"
+        )
+
+    upload_dir = Path(settings.import_upload_path)
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    file_path = upload_dir / f"{uuid4().hex}{suffix}"
+    max_bytes = settings.import_max_upload_mb * 1024 * 1024
+
+    size = 0
+    with open(file_path, "wb") as out:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                break
+            out.write(chunk)
+    if size > max_bytes:
+        file_path.unlink(missing_ok=True)
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"文件不能超过 {settings.import_max_upload_mb} MB",
+        )
+
+    job = ImportJob(
+        requested_by=admin.id,
+        filename=file.filename,
+        file_key=str(file_path),
+        dry_run=dry_run,
+        status=ImportStatus.PENDING,
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+
+    try:
+        await run_in_threadpool(
+            enqueue_job, "app.jobs.user_import.run_user_import_job", job.id
+        )
+    except Exception:
+        file_path.unlink(missing_ok=True)
+        job.status = ImportStatus.FAILED
+        job.error_message = "任务队列不可用"
+        job.finished_at = datetime.utcnow()
+        await db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="任务队列不可用，请稍后重试"
+        )
+
+    record_audit(
+        actor_id=admin.id,
+        action="create_import_job",
+        target_type="import_job",
+        target_id=job.id,
+        meta={"filename": job.filename, "dry_run": dry_run},
+    )
+
+    return _import_job_to_info(job)
+
+
+@router.get("/users/import-jobs/{job_id}", response_model=ImportJobInfo)
+async def get_user_import_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """查询导入任务进度（超管专用）"""
+    result = await db.execute(select(ImportJob).where(ImportJob.id == job_id))
+    job = result.scalar_one_or_none()
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="导入任务不存在")
+    return _import_job_to_info(job)
+
+
+def _build_job_credential_sheet(result_path: str, fmt: str):
+    writer = CredentialSheetWriter(fmt)
+    with open(result_path, newline="", encoding="utf-8") as f:
+        writer.add_all(
+            CredentialRow(
+                class_name=row["class_name"] or None,
+                username=row["username"],
+                display_name=row["display_name"] or None,
+                role=UserRole(row["role"]),
+                password=row["initial_password"],
+            )
+            for row in csv.DictReader(f)
+        )
+    return writer, writer.close()
+
+
+@router.get("/users/import-jobs/{job_id}/credentials")
+async def download_import_job_credentials(
+    job_id: int,
+    format: str = Query("xlsx", pattern=SHEET_FORMAT_PATTERN),
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """下载导入任务创建的账号密码单，按班级分组（超管专用）
+
+    任务中途失败时，已创建的用户同样可以下载密码单；密码单超过保留期限后被删除。
+    """
+    result = await db.execute(select(ImportJob).where(ImportJob.id == job_id))
+    job = result.scalar_one_or_none()
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="导入任务不存在")
+    finished = job.status in (ImportStatus.COMPLETED, ImportStatus.FAILED)
+    if not finished or not job.created_count or not job.result_file_key:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="导入任务尚未结束、没有新建用户或密码单已过期删除",
+        )
+    if not Path(job.result_file_key).exists():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="密码单文件不存在")
+
+    writer, file = await run_in_threadpool(
+        _build_job_credential_sheet, job.result_file_key, format
+    )
+    return credential_sheet_response(writer, file, f"import-{job_id}-credentials")
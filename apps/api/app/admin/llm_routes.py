@@ -1,59 +1,59 @@
+import time
 from datetime import datetime
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import select
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.audit import record_audit
 from app.auth.deps import require_admin
 from app.config import get_settings
 from app.db.base import get_db
-from app.llm.runtime_settings import update_llm_runtime_settings
-from app.models import AuditLog, SystemConfig, User
+from app.chat.routes_impl import get_effective_prompt_content
+from app.llm.benchmark import SAMPLE_QUESTIONS, run_llm_benchmark
+from app.llm.config_sync import (
+    LEGACY_LLM_CONFIG_KEYS,
+    LLM_CONFIG_KEYS,
+    bump_llm_config_version,
+    config_values_from_rows,
+    config_version_from_rows,
+    list_llm_config_workers,
+    load_llm_config_rows,
+    local_worker_state,
+    publish_llm_config,
+    snapshot_from_rows,
+)
+from app.llm.provider import OpenAICompatibleProvider
+from app.llm.runtime_settings import apply_llm_runtime_snapshot
+from app.models import Class, LLMBenchmarkRun, SystemConfig, User
 from app.schemas.admin import (
+    LLMBenchmarkListResponse,
+    LLMBenchmarkRequest,
+    LLMBenchmarkResult,
     LLMConfigResponse,
     LLMConfigUpdateRequest,
     LLMConfigUpdateResponse,
     LLMTestRequest,
     LLMTestResponse,
+    LLMWorkerInfo,
+    LLMWorkersResponse,
 )
 
 router = APIRouter()
+settings = get_settings()
 
 
-# 定义 LLM 配置的键名（统一使用 dotted keys）
-LLM_CONFIG_KEYS = {
-    "provider_name": "llm.provider",
-    "base_url": "llm.base_url",
-    "api_key": "llm.api_key",
-    "model_name": "llm.model_name",
-}
-
-# 兼容旧的 underscore keys
-LEGACY_LLM_CONFIG_KEYS = {
-    "provider_name": "llm_provider_name",
-    "base_url": "llm_base_url",
-    "api_key": "llm_api_key",
-    "model_name": "llm_model_name",
-}
-
-
-async def migrate_llm_config_keys(db: AsyncSession) -> None:
-    """将旧的 underscore keys 迁移到新的 dotted keys（若新键不存在）。"""
-    changed = False
+def migrate_llm_config_keys(db: AsyncSession, rows: dict[str, SystemConfig]) -> None:
+    """将旧的 underscore keys 迁移到新的 dotted keys（若新键不存在），rows 同步更新。"""
     for field, dotted_key in LLM_CONFIG_KEYS.items():
-        existing = await db.execute(select(SystemConfig).where(SystemConfig.key == dotted_key))
-        if existing.scalar_one_or_none():
+        if dotted_key in rows:
             continue
-
-        legacy_key = LEGACY_LLM_CONFIG_KEYS[field]
-        legacy_result = await db.execute(select(SystemConfig).where(SystemConfig.key == legacy_key))
-        legacy_config = legacy_result.scalar_one_or_none()
+        legacy_config = rows.get(LEGACY_LLM_CONFIG_KEYS[field])
         if legacy_config and legacy_config.value:
-            db.add(SystemConfig(key=dotted_key, value=legacy_config.value))
-            changed = True
-
-    if changed:
-        await db.commit()
+            rows[dotted_key] = SystemConfig(key=dotted_key, value=legacy_config.value)
+            db.add(rows[dotted_key])
 
 
 def mask_api_key(api_key: str) -> str:
@@ -65,50 +65,42 @@ def mask_api_key(api_key: str) -> str:
     return api_key[:4] + "*" * (len(api_key) - 8) + api_key[-4:]
 
 
-async def load_llm_config_values(db: AsyncSession) -> dict[str, str]:
-    config_values: dict[str, str] = {}
-    for field, key in LLM_CONFIG_KEYS.items():
-        result = await db.execute(select(SystemConfig).where(SystemConfig.key == key))
-        config = result.scalar_one_or_none()
-        if config:
-            config_values[field] = config.value
-            continue
-
-        legacy_key = LEGACY_LLM_CONFIG_KEYS[field]
-        legacy_result = await db.execute(select(SystemConfig).where(SystemConfig.key == legacy_key))
-        legacy_config = legacy_result.scalar_one_or_none()
-        config_values[field] = legacy_config.value if legacy_config else ""
-
-    return config_values
-
-
-@router.get("/settings/llm", response_model=LLMConfigResponse)
-async def get_llm_config(
-    db: AsyncSession = Depends(get_db),
-    admin: User = Depends(require_admin),
-):
-    """获取 LLM API 配置"""
-    await migrate_llm_config_keys(db)
-    config_values = await load_llm_config_values(db)
+def _config_response(rows: dict[str, SystemConfig]) -> LLMConfigResponse:
+    config_values = config_values_from_rows(rows)
     api_key = config_values.get("api_key", "")
-
     return LLMConfigResponse(
         provider_name=config_values.get("provider_name", ""),
         base_url=config_values.get("base_url", ""),
         api_key_masked=mask_api_key(api_key),
         model_name=config_values.get("model_name", ""),
         has_api_key=bool(api_key),
+        version=config_version_from_rows(rows),
     )
 
 
+@router.get("/settings/llm", response_model=LLMConfigResponse)
+async def get_llm_config(
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """获取 LLM API 配置"""
+    return _config_response(await load_llm_config_rows(db))
+
+
 @router.put("/settings/llm", response_model=LLMConfigUpdateResponse)
 async def update_llm_config(
     request: LLMConfigUpdateRequest,
     db: AsyncSession = Depends(get_db),
     admin: User = Depends(require_admin),
 ):
-    """更新 LLM API 配置"""
-    await migrate_llm_config_keys(db)
+    """更新 LLM API 配置
+
+    配置版本号加一，本 worker 立即生效，其他 worker 通过 Redis 广播重新加载。
+    先锁定并递增版本号再读取配置：并发的更新依次执行，不会发布相同的版本号。
+    """
+    version = await bump_llm_config_version(db)
+    rows = await load_llm_config_rows(db)
+    migrate_llm_config_keys(db, rows)
 
     updates = {}
     if request.provider_name is not None:
@@ -120,52 +112,77 @@ async def update_llm_config(
     if request.model_name is not None:
         updates["model_name"] = request.model_name
 
-    for field, value in updates.items():
-        key = LLM_CONFIG_KEYS[field]
-        result = await db.execute(select(SystemConfig).where(SystemConfig.key == key))
-        config = result.scalar_one_or_none()
+    def set_value(key: str, value: str) -> None:
+        config = rows.get(key)
         if config:
             config.value = value
         else:
-            db.add(SystemConfig(key=key, value=value))
+            rows[key] = SystemConfig(key=key, value=value)
+            db.add(rows[key])
 
-        legacy_key = LEGACY_LLM_CONFIG_KEYS[field]
-        legacy_result = await db.execute(select(SystemConfig).where(SystemConfig.key == legacy_key))
-        legacy_config = legacy_result.scalar_one_or_none()
+    for field, value in updates.items():
+        set_value(LLM_CONFIG_KEYS[field], value)
+
+        legacy_config = rows.get(LEGACY_LLM_CONFIG_KEYS[field])
         if legacy_config:
             legacy_config.value = value
 
-    db.add(
-        AuditLog(
-            actor_id=admin.id,
-            action="update_llm_config",
-            target_type="system_config",
-            meta={"updated_fields": list(updates.keys())},
-            created_at=datetime.utcnow(),
-        )
-    )
-
     await db.commit()
 
-    config_values = await load_llm_config_values(db)
-    update_llm_runtime_settings(
-        provider=config_values.get("provider_name") or None,
-        base_url=config_values.get("base_url") or None,
-        model_name=config_values.get("model_name") or None,
-        api_key=config_values.get("api_key") or None,
+    record_audit(
+        actor_id=admin.id,
+        action="update_llm_config",
+        target_type="system_config",
+        meta={"updated_fields": list(updates.keys()), "version": version},
     )
 
-    api_key = config_values.get("api_key", "")
+    apply_llm_runtime_snapshot(snapshot_from_rows(rows))
+    await publish_llm_config(version)
+
     return LLMConfigUpdateResponse(
         success=True,
         message="配置已更新",
-        config=LLMConfigResponse(
-            provider_name=config_values.get("provider_name", ""),
-            base_url=config_values.get("base_url", ""),
-            api_key_masked=mask_api_key(api_key),
-            model_name=config_values.get("model_name", ""),
-            has_api_key=bool(api_key),
-        ),
+        config=_config_response(rows),
+    )
+
+
+@router.get("/settings/llm/workers", response_model=LLMWorkersResponse)
+async def get_llm_config_workers(
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """查看各 worker 正在使用的 LLM 配置版本
+
+    超过 3 个心跳周期未上报的 worker 标记为 stale（可能已退出）。
+    """
+    rows = await load_llm_config_rows(db)
+    current_version = config_version_from_rows(rows)
+
+    try:
+        workers = await list_llm_config_workers()
+        broadcast_available = True
+    except Exception:
+        workers = [local_worker_state()]
+        broadcast_available = False
+
+    stale_after = settings.llm_config_heartbeat_seconds * 3
+    now = time.time()
+    items = [
+        LLMWorkerInfo(
+            worker_id=w["worker_id"],
+            version=w.get("version", 0),
+            provider=w.get("provider"),
+            model_name=w.get("model_name"),
+            reported_at=datetime.fromtimestamp(w.get("reported_at", 0)).isoformat(),
+            in_sync=w.get("version", 0) == current_version,
+            stale=now - w.get("reported_at", 0) > stale_after,
+        )
+        for w in workers
+    ]
+    return LLMWorkersResponse(
+        current_version=current_version,
+        broadcast_available=broadcast_available,
+        workers=items,
     )
 
 
@@ -180,13 +197,7 @@ async def test_llm_connection(
 
     import httpx
 
-    settings = get_settings()
-
-    config_values = {}
-    for field, key in LLM_CONFIG_KEYS.items():
-        result = await db.execute(select(SystemConfig).where(SystemConfig.key == key))
-        config = result.scalar_one_or_none()
-        config_values[field] = config.value if config else ""
+    config_values = config_values_from_rows(await load_llm_config_rows(db))
 
     base_url = request.base_url or config_values.get("base_url") or settings.openai_base_url
     api_key = request.api_key or config_values.get("api_key") or settings.openai_api_key
@@ -245,3 +256,161 @@ async def test_llm_connection(
         return LLMTestResponse(success=False, message=f"连接失败: {str(e)}")
     except Exception as e:
         return LLMTestResponse(success=False, message=f"测试失败: {str(e)}")
+
+
+def _benchmark_to_result(run: LLMBenchmarkRun) -> LLMBenchmarkResult:
+    return LLMBenchmarkResult(
+        id=run.id,
+        provider_name=run.provider_name,
+        base_url=run.base_url,
+        model_name=run.model_name,
+        class_id=run.class_id,
+        prompt_version=run.prompt_version,
+        concurrency=run.concurrency,
+        total_requests=run.total_requests,
+        max_tokens=run.max_tokens,
+        success_count=run.success_count,
+        error_count=run.error_count,
+        rate_limited_count=run.rate_limited_count,
+        error_rate=run.error_count / run.total_requests if run.total_requests else 0.0,
+        rate_limited_rate=(
+            run.rate_limited_count / run.total_requests if run.total_requests else 0.0
+        ),
+        wall_time_ms=run.wall_time_ms,
+        ttft_p50_ms=run.ttft_p50_ms,
+        ttft_p90_ms=run.ttft_p90_ms,
+        ttft_p99_ms=run.ttft_p99_ms,
+        latency_p50_ms=run.latency_p50_ms,
+        latency_p90_ms=run.latency_p90_ms,
+        latency_p99_ms=run.latency_p99_ms,
+        tokens_per_second=run.tokens_per_second,
+        aggregate_tokens_per_second=run.aggregate_tokens_per_second,
+        errors=run.errors or [],
+        created_at=run.created_at.isoformat() if run.created_at else "",
+    )
+
+
+@router.post("/settings/llm/benchmark", response_model=LLMBenchmarkResult)
+async def benchmark_llm(
+    request: LLMBenchmarkRequest,
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """LLM 接口压测（超管专用）
+
+    - 以给定并发发起流式请求，使用真实的有效系统提示词与学生提问样本
+    - 统计首字延迟（TTFT）与总延迟的 P50/P90/P99、生成速度、错误率与 429 比例
+    - 结果保存后可在历史记录中横向比较不同服务商与模型
+    """
+    if request.concurrency > settings.llm_benchmark_max_concurrency:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"并发数不能超过 {settings.llm_benchmark_max_concurrency}",
+        )
+    if request.total_requests > settings.llm_benchmark_max_requests:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"请求总数不能超过 {settings.llm_benchmark_max_requests}",
+        )
+    if request.class_id is not None and not await db.get(Class, request.class_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="班级不存在")
+
+    config_values = config_values_from_rows(await load_llm_config_rows(db))
+    provider_name = (
+        request.provider_name or config_values.get("provider_name") or settings.model_provider
+    )
+    base_url = request.base_url or config_values.get("base_url") or settings.openai_base_url
+    api_key = request.api_key or config_values.get("api_key") or settings.openai_api_key
+    model_name = request.model_name or config_values.get("model_name") or settings.model_name
+
+    if not base_url:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="未配置 API 接口地址")
+    if not api_key:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="未配置 API Key")
+    if not model_name:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="未配置模型名称")
+
+    system_prompt, prompt_version = await get_effective_prompt_content(db, request.class_id)
+    questions = [q for q in (request.questions or []) if q.strip()] or SAMPLE_QUESTIONS
+
+    provider = OpenAICompatibleProvider(
+        api_key=api_key,
+        base_url=base_url,
+        model=model_name,
+        provider_name=provider_name,
+    )
+    try:
+        stats = await run_llm_benchmark(
+            provider,
+            system_prompt,
+            questions,
+            concurrency=request.concurrency,
+            total_requests=request.total_requests,
+            max_tokens=request.max_tokens,
+            timeout_seconds=settings.llm_benchmark_timeout_seconds,
+        )
+    finally:
+        await provider.aclose()
+
+    run = LLMBenchmarkRun(
+        requested_by=admin.id,
+        provider_name=provider_name,
+        base_url=base_url,
+        model_name=model_name,
+        class_id=request.class_id,
+        prompt_version=prompt_version,
+        concurrency=stats.concurrency,
+        total_requests=stats.total_requests,
+        max_tokens=request.max_tokens,
+        success_count=stats.success_count,
+        error_count=stats.error_count,
+        rate_limited_count=stats.rate_limited_count,
+        wall_time_ms=stats.wall_time_ms,
+        ttft_p50_ms=stats.ttft_p50_ms,
+        ttft_p90_ms=stats.ttft_p90_ms,
+        ttft_p99_ms=stats.ttft_p99_ms,
+        latency_p50_ms=stats.latency_p50_ms,
+        latency_p90_ms=stats.latency_p90_ms,
+        latency_p99_ms=stats.latency_p99_ms,
+        tokens_per_second=stats.tokens_per_second,
+        aggregate_tokens_per_second=stats.aggregate_tokens_per_second,
+        errors=stats.errors,
+    )
+    db.add(run)
+    await db.commit()
+    await db.refresh(run)
+
+    record_audit(
+        actor_id=admin.id,
+        action="benchmark_llm",
+        target_type="llm_benchmark_run",
+        target_id=run.id,
+        meta={"model_name": model_name, "concurrency": stats.concurrency},
+    )
+
+    return _benchmark_to_result(run)
+
+
+@router.get("/settings/llm/benchmarks", response_model=LLMBenchmarkListResponse)
+async def list_llm_benchmarks(
+    model_name: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """历史压测结果（按时间倒序，可按模型筛选）"""
+    query = select(LLMBenchmarkRun)
+    if model_name:
+        query = query.where(LLMBenchmarkRun.model_name == model_name)
+
+    total = await db.scalar(select(func.count()).select_from(query.subquery()))
+    result = await db.execute(
+        query.order_by(LLMBenchmarkRun.created_at.desc(), LLMBenchmarkRun.id.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    return LLMBenchmarkListResponse(
+        total=total or 0,
+        items=[_benchmark_to_result(run) for run in result.scalars().all()],
+    )
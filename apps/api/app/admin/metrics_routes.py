@@ -0,0 +1,24 @@
+from dataclasses import asdict
+
+from fastapi import APIRouter, Depends
+
+from app.audit import audit_writer
+from app.auth.deps import require_admin
+from app.auth.security import get_password_hasher_stats
+from app.models import User
+from app.schemas.admin import (
+    AuditWriterMetrics,
+    PasswordHasherMetrics,
+    RuntimeMetricsResponse,
+)
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_model=RuntimeMetricsResponse)
+async def get_runtime_metrics(admin: User = Depends(require_admin)):
+    """获取当前进程的运行时指标（超管专用）"""
+    return RuntimeMetricsResponse(
+        password_hasher=PasswordHasherMetrics(**asdict(get_password_hasher_stats())),
+        audit_writer=AuditWriterMetrics(**asdict(audit_writer.stats())),
+    )
@@ -1,26 +1,29 @@
-import secrets
-import string
 from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select, func, delete, update
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select, func, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.admin.deletion_routes import (
+    ensure_not_pending_deletion,
+    submit_deletion_job,
+    users_pending_deletion,
+)
+from app.admin.user_import import generate_random_password, import_users
+from app.audit import record_audit
 from app.auth.deps import require_admin
-from app.auth.security import hash_password
+from app.auth.membership_cache import invalidate_memberships
+from app.auth.principal_cache import invalidate_principal
+from app.auth.security import hash_password_async
 from app.db.base import get_db
 from app.models import (
-    AuditLog,
     Class,
     ClassStudent,
     ClassTeacher,
-    ExportJob,
-    PromptScope,
+    DeletionTarget,
     User,
     UserRole,
-    UserStatus,
 )
 from app.schemas.admin import (
     BulkImportRequest,
@@ -32,7 +35,6 @@ from app.schemas.admin import (
     TeacherClassesUpdateResponse,
     UpdateUserRequest,
     UpdateUserResponse,
-    UserCreatedInfo,
     UserListItem,
     UserListResponse,
 )
@@ -41,12 +43,6 @@ from app.schemas.auth import ResetPasswordRequest, ResetPasswordResponse
 router = APIRouter(prefix="/admin", tags=["超管"])
 
 
-def generate_random_password(length: int = 12) -> str:
-    """生成随机密码"""
-    alphabet = string.ascii_letters + string.digits
-    return "".join(secrets.choice(alphabet) for _ in range(length))
-
-
 @router.post("/users/bulk-import", response_model=BulkImportResponse)
 async def bulk_import_users(
     request: BulkImportRequest,
@@ -59,106 +55,22 @@ async def bulk_import_users(
     - 可选绑定班级
     - 用户首登必须改密码
     """
-    created_users = []
-    errors = []
-
-    # 获取所有涉及的班级
-    class_names = set(u.class_name for u in request.users if u.class_name)
-    class_map = {}
-    if class_names:
-        result = await db.execute(select(Class).where(Class.name.in_(class_names)))
-        for c in result.scalars().all():
-            class_map[c.name] = c
-
-    for item in request.users:
-        class_obj = class_map.get(item.class_name) if item.class_name else None
-        if item.role == UserRole.STUDENT:
-            if not item.class_name:
-                errors.append(f"学生 {item.username} 必须选择班级")
-                continue
-            if not class_obj:
-                errors.append(f"班级 {item.class_name} 不存在，已拒绝创建学生 {item.username}")
-                continue
-
-        # 检查用户名是否已存在
-        existing = await db.execute(select(User).where(User.username == item.username))
-        if existing.scalar_one_or_none():
-            errors.append(f"用户名 {item.username} 已存在")
-            continue
-
-        # 生成初始密码
-        initial_password = generate_random_password()
-
-        # 创建用户
-        user = User(
-            username=item.username,
-            display_name=item.display_name,
-            role=item.role,
-            password_hash=hash_password(initial_password),
-            must_change_password=True,
-            status=UserStatus.ACTIVE,
-            created_at=datetime.utcnow(),
-        )
-        db.add(user)
-        await db.flush()  # 获取 user.id
-
-        # 绑定班级
-        bound_class_name = None
-        if item.class_name:
-            if not class_obj:
-                errors.append(
-                    f"班级 {item.class_name} 不存在，用户 {item.username} 已创建但未绑定班级"
-                )
-            else:
-                if item.role == UserRole.STUDENT:
-                    db.add(
-                        ClassStudent(
-                            class_id=class_obj.id,
-                            student_id=user.id,
-                            created_at=datetime.utcnow(),
-                        )
-                    )
-                    bound_class_name = item.class_name
-                elif item.role == UserRole.TEACHER:
-                    db.add(
-                        ClassTeacher(
-                            class_id=class_obj.id,
-                            teacher_id=user.id,
-                            created_at=datetime.utcnow(),
-                        )
-                    )
-                    bound_class_name = item.class_name
-
-        created_users.append(
-            UserCreatedInfo(
-                username=item.username,
-                display_name=item.display_name,
-                role=item.role,
-                initial_password=initial_password,
-                class_name=bound_class_name,
-            )
-        )
+    response = await import_users(db, request.users)
+
+    await db.commit()
 
     # 记录审计日志
-    audit_log = AuditLog(
+    record_audit(
         actor_id=admin.id,
         action="bulk_import",
         target_type="user",
         meta={
-            "count": len(created_users),
-            "roles": [u.role.value for u in created_users],
+            "count": response.created_count,
+            "roles": [u.role.value for u in response.users],
         },
-        created_at=datetime.utcnow(),
     )
-    db.add(audit_log)
 
-    await db.commit()
-
-    return BulkImportResponse(
-        created_count=len(created_users),
-        users=created_users,
-        errors=errors,
-    )
+    return response
 
 
 @router.get("/users", response_model=UserListResponse)
@@ -169,7 +81,10 @@ async def list_users(
     db: AsyncSession = Depends(get_db),
     admin: User = Depends(require_admin),
 ):
-    """获取用户列表（排除管理员用户）"""
+    """获取用户列表（排除管理员用户）
+
+    pending_deletion 标记已提交删除、后台任务尚未完成的账号，这些账号不能再修改。
+    """
     # 始终排除管理员用户
     query = select(User).where(User.role != UserRole.ADMIN)
     count_query = select(func.count(User.id)).where(User.role != UserRole.ADMIN)
@@ -191,6 +106,7 @@ async def list_users(
     user_ids = [u.id for u in users]
     student_class_map: dict[int, list[str]] = {}
     teacher_class_map: dict[int, list[str]] = {}
+    pending_deletion = await users_pending_deletion(db, user_ids)
 
     if user_ids:
         student_result = await db.execute(
@@ -224,6 +140,7 @@ async def list_users(
             else teacher_class_map.get(u.id, [])
             if u.role == UserRole.TEACHER
             else [],
+            pending_deletion=u.id in pending_deletion,
         )
         for u in users
     ]
@@ -244,6 +161,7 @@ async def reset_password(
 
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="用户不存在")
+    await ensure_not_pending_deletion(db, user.id)
 
     # 生成或使用指定的新密码
     new_password = (
@@ -252,20 +170,19 @@ async def reset_password(
         else generate_random_password()
     )
 
-    user.password_hash = hash_password(new_password)
+    user.password_hash = await hash_password_async(new_password)
     user.must_change_password = True
 
+    await db.commit()
+
     # 记录审计日志
-    audit_log = AuditLog(
+    record_audit(
         actor_id=admin.id,
         action="reset_password",
         target_type="user",
         target_id=user.id,
-        created_at=datetime.utcnow(),
     )
-    db.add(audit_log)
-
-    await db.commit()
+    await invalidate_principal(user.id)
 
     return ResetPasswordResponse(
         user_id=user.id,
@@ -287,6 +204,7 @@ async def update_user(
 
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="用户不存在")
+    await ensure_not_pending_deletion(db, user.id)
 
     # 检查新用户名是否与其他用户冲突
     if request.username is not None and request.username != user.username:
@@ -306,8 +224,10 @@ async def update_user(
     if request.status is not None:
         user.status = request.status
 
+    await db.commit()
+
     # 记录审计日志
-    audit_log = AuditLog(
+    record_audit(
         actor_id=admin.id,
         action="update_user",
         target_type="user",
@@ -317,11 +237,8 @@ async def update_user(
             "display_name": request.display_name,
             "status": request.status.value if request.status else None,
         },
-        created_at=datetime.utcnow(),
     )
-    db.add(audit_log)
-
-    await db.commit()
+    await invalidate_principal(user.id)
 
     return UpdateUserResponse(
         id=user.id,
@@ -348,6 +265,7 @@ async def set_teacher_classes(
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="仅支持设置教师的授课班级"
         )
+    await ensure_not_pending_deletion(db, teacher_id)
 
     class_ids = list(dict.fromkeys(request.class_ids))
     class_names: list[str] = []
@@ -373,17 +291,17 @@ async def set_teacher_classes(
             )
         )
 
-    audit_log = AuditLog(
+    await db.commit()
+
+    # 记录审计日志
+    record_audit(
         actor_id=admin.id,
         action="set_teacher_classes",
         target_type="teacher",
         target_id=teacher_id,
         meta={"class_ids": class_ids},
-        created_at=datetime.utcnow(),
     )
-    db.add(audit_log)
-
-    await db.commit()
+    await invalidate_memberships(teacher_id)
 
     return TeacherClassesUpdateResponse(teacher_id=teacher_id, class_names=class_names)
 
@@ -403,6 +321,7 @@ async def set_student_class(
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="仅支持设置学生的所属班级"
         )
+    await ensure_not_pending_deletion(db, student_id)
 
     class_result = await db.execute(select(Class).where(Class.id == request.class_id))
     class_obj = class_result.scalar_one_or_none()
@@ -418,17 +337,17 @@ async def set_student_class(
         )
     )
 
-    audit_log = AuditLog(
+    await db.commit()
+
+    # 记录审计日志
+    record_audit(
         actor_id=admin.id,
         action="set_student_class",
         target_type="student",
         target_id=student_id,
         meta={"class_id": class_obj.id},
-        created_at=datetime.utcnow(),
     )
-    db.add(audit_log)
-
-    await db.commit()
+    await invalidate_memberships(student_id)
 
     return StudentClassUpdateResponse(
         student_id=student_id,
@@ -443,7 +362,10 @@ async def delete_user(
     db: AsyncSession = Depends(get_db),
     admin: User = Depends(require_admin),
 ):
-    """删除用户（超管专用）"""
+    """删除用户（超管专用）
+
+    账号立即禁用；用户及其会话、消息由后台任务分批删除，进度见 /admin/deletion-jobs/{job_id}
+    """
     result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
 
@@ -456,37 +378,12 @@ async def delete_user(
             status_code=status.HTTP_400_BAD_REQUEST, detail="不能删除自己"
         )
 
-    username = user.username
-
-    # 记录审计日志
-    audit_log = AuditLog(
-        actor_id=admin.id,
-        action="delete_user",
-        target_type="user",
-        target_id=user.id,
-        meta={"username": username, "role": user.role.value},
-        created_at=datetime.utcnow(),
+    # 账号立即禁用，对话记录等由后台任务分批删除
+    job = await submit_deletion_job(
+        db, admin, DeletionTarget.USER, user.id, user.username, [user.id], []
     )
-    db.add(audit_log)
 
-    try:
-        await db.execute(
-            update(AuditLog)
-            .where(AuditLog.actor_id == user.id)
-            .values(actor_id=None)
-        )
-        await db.execute(delete(PromptScope).where(PromptScope.created_by == user.id))
-        await db.execute(delete(ExportJob).where(ExportJob.requested_by == user.id))
-
-        # 删除用户（会级联删除相关的班级关联、会话等）
-        await db.delete(user)
-        await db.commit()
-    except IntegrityError:
-        await db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="用户仍有关联数据，无法删除",
-        )
-
-    return DeleteUserResponse(id=user_id, username=username, message="删除成功")
+    return DeleteUserResponse(
+        id=user_id, username=user.username, message="已禁用，正在后台删除", job_id=job.id
+    )
 
@@ -0,0 +1,256 @@
+"""批量导入用户：JSON 接口与后台导入任务共用的核心逻辑，以及名单文件的流式解析。"""
+
+import csv
+import secrets
+import string
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.security import hash_passwords_parallel
+from app.models import Class, ClassStudent, ClassTeacher, User, UserRole, UserStatus
+from app.schemas.admin import BulkImportResponse, UserCreatedInfo, UserImportItem
+
+ROSTER_SUFFIXES = {".xlsx", ".csv"}
+
+# 名单文件表头 -> 字段（与前端导出的结果表头保持一致）
+ROSTER_HEADER_ALIASES = {
+    "username": {"username", "学号/工号", "学号", "工号", "账号"},
+    "display_name": {"display_name", "姓名", "显示名称"},
+    "role": {"role", "角色"},
+    "class_name": {"class_name", "班级"},
+}
+
+ROLE_ALIASES = {
+    "student": UserRole.STUDENT,
+    "学生": UserRole.STUDENT,
+    "teacher": UserRole.TEACHER,
+    "教师": UserRole.TEACHER,
+    "老师": UserRole.TEACHER,
+}
+
+
+def generate_random_password(length: int = 12) -> str:
+    """生成随机密码"""
+    alphabet = string.ascii_letters + string.digits
+    return "".join(secrets.choice(alphabet) for _ in range(length))
+
+
+async def import_users(
+    db: AsyncSession,
+    items: list[UserImportItem],
+    *,
+    dry_run: bool = False,
+    seen_usernames: Optional[set[str]] = None,
+) -> BulkImportResponse:
+    """校验并创建一批用户（不提交事务）
+
+    - 已存在的用户名用一次查询检出；seen_usernames 用于跨批次检查重复
+    - dry_run 只做校验，不计算密码哈希也不写库，返回的 users 为空
+    - errors 按提交顺序逐行给出
+    """
+    errors = []
+    seen_usernames = seen_usernames if seen_usernames is not None else set()
+
+    # 获取所有涉及的班级
+    class_names = set(u.class_name for u in items if u.class_name)
+    class_map = {}
+    if class_names:
+        result = await db.execute(select(Class).where(Class.name.in_(class_names)))
+        for c in result.scalars().all():
+            class_map[c.name] = c
+
+    # 一次查询找出已存在的用户名
+    usernames = set(u.username for u in items)
+    existing_result = await db.execute(
+        select(User.username).where(User.username.in_(usernames))
+    )
+    taken_usernames = set(existing_result.scalars().all()) | seen_usernames
+
+    accepted = []
+    for item in items:
+        class_obj = class_map.get(item.class_name) if item.class_name else None
+        if item.role == UserRole.STUDENT:
+            if not item.class_name:
+                errors.append(f"学生 {item.username} 必须选择班级")
+                continue
+            if not class_obj:
+                errors.append(f"班级 {item.class_name} 不存在，已拒绝创建学生 {item.username}")
+                continue
+
+        # 检查用户名是否已存在（含本批次内重复）
+        if item.username in taken_usernames:
+            errors.append(f"用户名 {item.username} 已存在")
+            continue
+        taken_usernames.add(item.username)
+        seen_usernames.add(item.username)
+
+        if item.class_name and not class_obj:
+            errors.append(
+                f"班级 {item.class_name} 不存在，用户 {item.username} 已创建但未绑定班级"
+            )
+        accepted.append((item, class_obj))
+
+    if dry_run or not accepted:
+        return BulkImportResponse(created_count=len(accepted), users=[], errors=errors)
+
+    # 生成初始密码并并行计算哈希
+    initial_passwords = [generate_random_password() for _ in accepted]
+    password_hashes = await hash_passwords_parallel(initial_passwords)
+
+    now = datetime.utcnow()
+    # 批量创建用户
+    insert_result = await db.execute(
+        insert(User).returning(User.id, User.username),
+        [
+            {
+                "username": item.username,
+                "display_name": item.display_name,
+                "role": item.role,
+                "password_hash": password_hash,
+                "must_change_password": True,
+                "status": UserStatus.ACTIVE,
+                "created_at": now,
+            }
+            for (item, _), password_hash in zip(accepted, password_hashes)
+        ],
+    )
+    user_ids = {username: user_id for user_id, username in insert_result.all()}
+
+    # 批量绑定班级
+    created_users = []
+    student_links = []
+    teacher_links = []
+    for (item, class_obj), initial_password in zip(accepted, initial_passwords):
+        bound_class_name = None
+        if class_obj:
+            link = {
+                "class_id": class_obj.id,
+                "created_at": now,
+            }
+            if item.role == UserRole.STUDENT:
+                student_links.append({**link, "student_id": user_ids[item.username]})
+                bound_class_name = item.class_name
+            elif item.role == UserRole.TEACHER:
+                teacher_links.append({**link, "teacher_id": user_ids[item.username]})
+                bound_class_name = item.class_name
+
+        created_users.append(
+            UserCreatedInfo(
+                username=item.username,
+                display_name=item.display_name,
+                role=item.role,
+                initial_password=initial_password,
+                class_name=bound_class_name,
+            )
+        )
+
+    if student_links:
+        await db.execute(insert(ClassStudent), student_links)
+    if teacher_links:
+        await db.execute(insert(ClassTeacher), teacher_links)
+
+    return BulkImportResponse(
+        created_count=len(created_users),
+        users=created_users,
+        errors=errors,
+    )
+
+
+# ============================================================================
+# 名单文件流式解析（XLSX 使用 openpyxl 只读模式，CSV 逐行读取）
+# ============================================================================
+
+
+def _cell_text(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return text or None
+
+
+def _map_header(header: list) -> dict[str, int]:
+    columns = {}
+    for index, title in enumerate(header):
+        title = _cell_text(title)
+        if title is None:
+            continue
+        for field, aliases in ROSTER_HEADER_ALIASES.items():
+            if title.lower() in aliases or title in aliases:
+                columns.setdefault(field, index)
+    if "username" not in columns or "role" not in columns:
+        raise ValueError("名单表头缺少必需列：学号/工号、角色")
+    return columns
+
+
+def _iter_raw_rows(path: Path) -> Iterator[list]:
+    if path.suffix.lower() == ".xlsx":
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for row in workbook.worksheets[0].iter_rows(values_only=True):
+                yield list(row)
+        finally:
+            workbook.close()
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            yield from csv.reader(f)
+
+
+def iter_roster_rows(path: Path) -> Iterator[tuple[int, dict[str, Optional[str]]]]:
+    """逐行读取名单文件，产出 (行号, 字段字典)；跳过空行"""
+    rows = _iter_raw_rows(path)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = _map_header(header)
+
+    for row_number, row in enumerate(rows, start=2):
+        values = {
+            field: _cell_text(row[index]) if index < len(row) else None
+            for field, index in columns.items()
+        }
+        if not any(values.values()):
+            continue
+        yield row_number, values
+
+
+def count_roster_rows(path: Path) -> Optional[int]:
+    """估算数据行数用于进度展示（不含表头）"""
+    if path.suffix.lower() == ".xlsx":
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True)
+        try:
+            max_row = workbook.worksheets[0].max_row
+        finally:
+            workbook.close()
+        return max(0, max_row - 1) if max_row else None
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return max(0, sum(1 for _ in csv.reader(f)) - 1)
+
+
+def parse_roster_row(row_number: int, values: dict[str, Optional[str]]) -> UserImportItem:
+    """把一行名单转换为 UserImportItem，失败时抛出带行号的 ValueError"""
+    role_text = (values.get("role") or "").strip()
+    role = ROLE_ALIASES.get(role_text.lower()) or ROLE_ALIASES.get(role_text)
+    if role is None:
+        raise ValueError(f"第 {row_number} 行：角色 {role_text or '（空）'} 无效")
+    try:
+        return UserImportItem(
+            username=values.get("username") or "",
+            display_name=values.get("display_name"),
+            role=role,
+            class_name=values.get("class_name"),
+        )
+    except ValidationError as e:
+        reason = "；".join(err["msg"] for err in e.errors())
+        raise ValueError(f"第 {row_number} 行：{reason}") from None
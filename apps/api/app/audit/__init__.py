@@ -0,0 +1,3 @@
+from app.audit.writer import AuditWriter, AuditWriterStats, audit_writer, record_audit
+
+__all__ = ["AuditWriter", "AuditWriterStats", "audit_writer", "record_audit"]
@@ -0,0 +1,317 @@
+"""异步批量审计日志写入。
+
+请求处理中调用 record_audit 只把条目放入内存队列，由后台任务按批次
+批量 INSERT，请求事务不再承担审计写入与行锁开销。
+
+- 队列满时：开启 Redis 溢出则写入 Redis 列表（后台任务稍后回收），否则丢弃最旧条目
+- 关闭时：stop() 会把队列全部写入数据库；写库失败且开启溢出时转存 Redis
+- 条目所引用的用户在写入前被删除时，actor_id 置空后重试（与 delete_user 行为一致）
+- 批次写入失败时放回队首重试，最多 audit_batch_max_attempts 次；达到上限或数据本身有误
+  （超长、违反约束等）时改为逐条写入，仍然失败的条目记日志并计入 dropped，不阻塞后续条目
+- 逐条写入时数据库不可用则把剩余条目放回队首，等待下次写入
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError, InterfaceError, OperationalError, StatementError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.db.redis import get_redis
+from app.models import AuditLog, User
+
+logger = logging.getLogger(__name__)
+
+SPILL_KEY = "socratic:audit:spill"
+
+
+def _is_data_error(exc: Exception) -> bool:
+    """条目本身无法写入（重试无用）；连接断开、数据库不可用等不算"""
+    if not isinstance(exc, StatementError):
+        return False
+    if isinstance(exc, (OperationalError, InterfaceError)):
+        return False
+    return not getattr(exc, "connection_invalidated", False)
+
+
+@dataclass
+class AuditEntry:
+    action: str
+    actor_id: Optional[int] = None
+    target_type: Optional[str] = None
+    target_id: Optional[int] = None
+    meta: Optional[dict[str, Any]] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["created_at"] = self.created_at.isoformat()
+        return json.dumps(data, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "AuditEntry":
+        data = json.loads(raw)
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+        return cls(**data)
+
+
+@dataclass(frozen=True)
+class AuditWriterStats:
+    running: bool
+    queued: int
+    max_queue_size: int
+    enqueued: int
+    written: int
+    batches: int
+    failed_batches: int
+    spilled: int
+    dropped: int
+    last_flush_ms: Optional[float]
+
+
+class AuditWriter:
+    def __init__(self):
+        settings = get_settings()
+        self.batch_size = settings.audit_batch_size
+        self.flush_interval = settings.audit_flush_interval_seconds
+        self.max_queue_size = settings.audit_max_queue_size
+        self.spill_to_redis = settings.audit_spill_to_redis
+        self.max_batch_attempts = settings.audit_batch_max_attempts
+
+        self._queue: deque[AuditEntry] = deque()
+        self._session_factory: Optional[Callable[[], AsyncSession]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._spill_tasks: set[asyncio.Task] = set()
+        # 队首批次连续失败的次数（失败的批次放回队首，下次写入的仍是同一批）
+        self._batch_attempts = 0
+
+        self._enqueued = 0
+        self._written = 0
+        self._batches = 0
+        self._failed_batches = 0
+        self._spilled = 0
+        self._dropped = 0
+        self._last_flush_ms: Optional[float] = None
+
+    # ------------------------------------------------------------------
+    # 生产者
+    # ------------------------------------------------------------------
+
+    def record(self, entry: AuditEntry) -> None:
+        self._enqueued += 1
+        if len(self._queue) >= self.max_queue_size:
+            if self.spill_to_redis and self._task is not None:
+                task = asyncio.get_running_loop().create_task(self._spill([entry]))
+                self._spill_tasks.add(task)
+                task.add_done_callback(self._spill_tasks.discard)
+                return
+            self._queue.popleft()
+            self._dropped += 1
+
+        self._queue.append(entry)
+        if self._wakeup is not None and len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+
+    async def start(
+        self, session_factory: Optional[Callable[[], AsyncSession]] = None
+    ) -> None:
+        if self._task is not None:
+            return
+        if session_factory is None:
+            from app.db.base import async_session_maker
+
+            session_factory = async_session_maker
+        self._session_factory = session_factory
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run(), name="audit-writer")
+
+    async def stop(self) -> None:
+        """停止后台任务并写出队列中剩余的全部条目"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._spill_tasks:
+            await asyncio.gather(*self._spill_tasks, return_exceptions=True)
+
+        if self._session_factory is not None:
+            await self.flush()
+
+        if self._queue and self.spill_to_redis:
+            remaining = list(self._queue)
+            self._queue.clear()
+            await self._spill(remaining)
+        elif self._queue:
+            logger.error("audit writer stopped with %d unwritten entries", len(self._queue))
+
+        self._wakeup = None
+        self._flush_lock = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("audit flush failed")
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    async def flush(self) -> int:
+        """把当前队列（及 Redis 溢出）批量写入数据库，返回写入条数"""
+        if self._session_factory is None:
+            return 0
+        lock = self._flush_lock or asyncio.Lock()
+        async with lock:
+            started = time.perf_counter()
+            if self.spill_to_redis:
+                await self._reclaim_spill()
+
+            written = 0
+            while self._queue:
+                batch = [
+                    self._queue.popleft()
+                    for _ in range(min(self.batch_size, len(self._queue)))
+                ]
+                try:
+                    await self._write(batch)
+                except Exception as exc:
+                    self._failed_batches += 1
+                    self._batch_attempts += 1
+                    if (
+                        not _is_data_error(exc)
+                        and self._batch_attempts < self.max_batch_attempts
+                    ):
+                        self._queue.extendleft(reversed(batch))
+                        raise
+                    logger.warning(
+                        "audit batch of %d entries failed (attempt %d), writing one by one",
+                        len(batch),
+                        self._batch_attempts,
+                        exc_info=True,
+                    )
+                    written += await self._write_one_by_one(batch)
+                else:
+                    self._written += len(batch)
+                    self._batches += 1
+                    written += len(batch)
+                self._batch_attempts = 0
+
+            if written:
+                self._last_flush_ms = round((time.perf_counter() - started) * 1000, 3)
+            return written
+
+    async def _write(self, batch: list[AuditEntry]) -> None:
+        rows = [asdict(entry) for entry in batch]
+        async with self._session_factory() as session:
+            try:
+                await session.execute(insert(AuditLog), rows)
+                await session.commit()
+            except IntegrityError:
+                await session.rollback()
+                actor_ids = {row["actor_id"] for row in rows if row["actor_id"]}
+                result = await session.execute(
+                    select(User.id).where(User.id.in_(actor_ids))
+                )
+                existing = set(result.scalars().all())
+                for row in rows:
+                    if row["actor_id"] not in existing:
+                        row["actor_id"] = None
+                await session.execute(insert(AuditLog), rows)
+                await session.commit()
+
+    async def _write_one_by_one(self, batch: list[AuditEntry]) -> int:
+        """逐条写入，丢弃无法写入的条目；数据库不可用时剩余条目放回队首并抛出"""
+        written = 0
+        for index, entry in enumerate(batch):
+            try:
+                await self._write([entry])
+            except Exception as exc:
+                if not _is_data_error(exc):
+                    self._queue.extendleft(reversed(batch[index:]))
+                    raise
+                logger.error(
+                    "dropping audit entry %s (actor %s): %s", entry.action, entry.actor_id, exc
+                )
+                self._dropped += 1
+                continue
+            self._written += 1
+            written += 1
+        return written
+
+    async def _spill(self, entries: list[AuditEntry]) -> None:
+        await get_redis().rpush(SPILL_KEY, *[entry.to_json() for entry in entries])
+        self._spilled += len(entries)
+
+    async def _reclaim_spill(self) -> None:
+        room = self.max_queue_size - len(self._queue)
+        if room <= 0:
+            return
+        raw_entries = await get_redis().lpop(SPILL_KEY, min(room, self.batch_size * 10))
+        for raw in raw_entries or []:
+            self._queue.append(AuditEntry.from_json(raw))
+
+    # ------------------------------------------------------------------
+    # 指标
+    # ------------------------------------------------------------------
+
+    def stats(self) -> AuditWriterStats:
+        return AuditWriterStats(
+            running=self._task is not None,
+            queued=len(self._queue),
+            max_queue_size=self.max_queue_size,
+            enqueued=self._enqueued,
+            written=self._written,
+            batches=self._batches,
+            failed_batches=self._failed_batches,
+            spilled=self._spilled,
+            dropped=self._dropped,
+            last_flush_ms=self._last_flush_ms,
+        )
+
+
+audit_writer = AuditWriter()
+
+
+def record_audit(
+    action: str,
+    actor_id: Optional[int] = None,
+    target_type: Optional[str] = None,
+    target_id: Optional[int] = None,
+    meta: Optional[dict[str, Any]] = None,
+) -> None:
+    """记录一条审计日志（异步批量写入，调用方无需 commit）"""
+    audit_writer.record(
+        AuditEntry(
+            action=action,
+            actor_id=actor_id,
+            target_type=target_type,
+            target_id=target_id,
+            meta=meta,
+        )
+    )
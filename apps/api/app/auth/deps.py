@@ -6,6 +6,11 @@ from typing import Optional, List
 from app.db.base import get_db
 from app.models import User, UserRole, UserStatus
 from app.auth.security import decode_token
+from app.auth.principal_cache import (
+    CachedPrincipal,
+    cache_principal,
+    get_cached_principal,
+)
 
 security = HTTPBearer()
 
@@ -14,7 +19,10 @@ async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db),
 ) -> User:
-    """获取当前登录用户"""
+    """获取当前登录用户
+
+    返回的 User 来自 principal 缓存，未绑定到 db session，只能读取。
+    """
     token = credentials.credentials
     payload = decode_token(token)
 
@@ -26,22 +34,27 @@ async def get_current_user(
         )
 
     user_id = int(payload.get("sub"))
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    principal = await get_cached_principal(user_id, token)
+    if principal is None:
+        result = await db.execute(select(User).where(User.id == user_id))
+        user = result.scalar_one_or_none()
 
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="用户不存在",
-        )
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="用户不存在",
+            )
+
+        principal = CachedPrincipal.from_user(user)
+        await cache_principal(principal, token)
 
-    if user.status != UserStatus.ACTIVE:
+    if principal.status != UserStatus.ACTIVE:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="账号已被禁用",
         )
 
-    return user
+    return principal.to_user()
 
 
 async def get_current_active_user(
@@ -0,0 +1,55 @@
+"""班级成员关系缓存。
+
+授权检查（教师是否授课、学生是否在班）只需要“某用户所在班级 id 集合”。
+每个用户首次检查时用一条查询加载整组 id，之后在 TTL 内直接命中缓存；
+修改成员关系的接口在提交后调用 invalidate_memberships。
+授权检查应使用主库会话；副本会话读到的结果可能滞后，不写入缓存。
+"""
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import get_cache
+from app.config import get_settings
+from app.db.replica import REPLICA_SESSION_INFO
+from app.models import ClassStudent, ClassTeacher
+
+
+def _cache_key(user_id: int) -> str:
+    return f"membership:{user_id}"
+
+
+async def _get_class_ids(
+    db: AsyncSession, user_id: int, field: str, column, user_column
+) -> frozenset[int]:
+    cache = get_cache()
+    cached = await cache.get(_cache_key(user_id), field)
+    if cached is not None:
+        return frozenset(cached)
+
+    result = await db.execute(select(column).where(user_column == user_id))
+    class_ids = sorted(result.scalars().all())
+
+    ttl = get_settings().membership_cache_ttl_seconds
+    if ttl > 0 and not db.info.get(REPLICA_SESSION_INFO):
+        await cache.set(_cache_key(user_id), field, class_ids, ttl)
+    return frozenset(class_ids)
+
+
+async def get_teacher_class_ids(db: AsyncSession, teacher_id: int) -> frozenset[int]:
+    """教师授课班级 id 集合"""
+    return await _get_class_ids(
+        db, teacher_id, "teacher", ClassTeacher.class_id, ClassTeacher.teacher_id
+    )
+
+
+async def get_student_class_ids(db: AsyncSession, student_id: int) -> frozenset[int]:
+    """学生所属班级 id 集合"""
+    return await _get_class_ids(
+        db, student_id, "student", ClassStudent.class_id, ClassStudent.student_id
+    )
+
+
+async def invalidate_memberships(*user_ids: int) -> None:
+    if user_ids:
+        await get_cache().delete(*[_cache_key(user_id) for user_id in user_ids])
@@ -0,0 +1,82 @@
+"""已认证用户（principal）缓存。
+
+get_current_user 每个请求都要按 id 查询 users 表；这里把鉴权需要的字段按
+(user_id, token) 缓存一小段时间。修改用户状态/密码的接口在提交后调用
+invalidate_principal，按用户整体失效，保证禁用账号立即生效。
+"""
+
+import hashlib
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from app.cache import get_cache
+from app.config import get_settings
+from app.models import User, UserRole, UserStatus
+
+
+@dataclass(frozen=True)
+class CachedPrincipal:
+    id: int
+    username: str
+    display_name: Optional[str]
+    role: UserRole
+    status: UserStatus
+    must_change_password: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "CachedPrincipal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            display_name=user.display_name,
+            role=user.role,
+            status=user.status,
+            must_change_password=user.must_change_password,
+        )
+
+    def to_user(self) -> User:
+        """构造一个未绑定 session 的 User，仅供读取；需要修改时请重新查询"""
+        return User(
+            id=self.id,
+            username=self.username,
+            display_name=self.display_name,
+            role=self.role,
+            status=self.status,
+            must_change_password=self.must_change_password,
+        )
+
+
+def _cache_key(user_id: int) -> str:
+    return f"principal:{user_id}"
+
+
+def _token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:32]
+
+
+async def get_cached_principal(user_id: int, token: str) -> Optional[CachedPrincipal]:
+    data = await get_cache().get(_cache_key(user_id), _token_digest(token))
+    if data is None:
+        return None
+    return CachedPrincipal(
+        id=data["id"],
+        username=data["username"],
+        display_name=data["display_name"],
+        role=UserRole(data["role"]),
+        status=UserStatus(data["status"]),
+        must_change_password=data["must_change_password"],
+    )
+
+
+async def cache_principal(principal: CachedPrincipal, token: str) -> None:
+    ttl = get_settings().principal_cache_ttl_seconds
+    if ttl <= 0:
+        return
+    data = asdict(principal)
+    data["role"] = principal.role.value
+    data["status"] = principal.status.value
+    await get_cache().set(_cache_key(principal.id), _token_digest(token), data, ttl)
+
+
+async def invalidate_principal(*user_ids: int) -> None:
+    await get_cache().delete(*[_cache_key(user_id) for user_id in user_ids])
@@ -3,7 +3,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from datetime import datetime
 from app.db.base import get_db
-from app.models import User, UserStatus, AuditLog
+from app.audit import record_audit
+from app.models import User, UserStatus
 from app.schemas.auth import (
     LoginRequest,
     LoginResponse,
@@ -11,8 +12,13 @@ from app.schemas.auth import (
     UserInfo,
     ChangePasswordRequest,
 )
-from app.auth.security import verify_password, hash_password, create_access_token
+from app.auth.security import (
+    verify_password_async,
+    hash_password_async,
+    create_access_token,
+)
 from app.auth.deps import get_current_user
+from app.auth.principal_cache import invalidate_principal
 
 router = APIRouter(prefix="/auth", tags=["认证"])
 
@@ -23,7 +29,9 @@ async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.username == request.username))
     user = result.scalar_one_or_none()
 
-    if user is None or not verify_password(request.password, user.password_hash):
+    if user is None or not await verify_password_async(
+        request.password, user.password_hash
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码错误",
@@ -38,15 +46,15 @@ async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
     # 更新最后登录时间
     user.last_login_at = datetime.utcnow()
 
+    await db.commit()
+
     # 记录审计日志
-    audit_log = AuditLog(
+    record_audit(
         actor_id=user.id,
         action="login",
         target_type="user",
         target_id=user.id,
     )
-    db.add(audit_log)
-    await db.commit()
 
     access_token = create_access_token(user.id, user.role.value)
 
@@ -64,7 +72,10 @@ async def change_password(
     db: AsyncSession = Depends(get_db),
 ):
     """修改密码（首登必须调用）"""
-    if not verify_password(request.old_password, current_user.password_hash):
+    result = await db.execute(select(User).where(User.id == current_user.id))
+    user = result.scalar_one()
+
+    if not await verify_password_async(request.old_password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="原密码错误",
@@ -76,18 +87,19 @@ async def change_password(
             detail="新密码不能与原密码相同",
         )
 
-    current_user.password_hash = hash_password(request.new_password)
-    current_user.must_change_password = False
+    user.password_hash = await hash_password_async(request.new_password)
+    user.must_change_password = False
+
+    await db.commit()
 
     # 记录审计日志
-    audit_log = AuditLog(
-        actor_id=current_user.id,
+    record_audit(
+        actor_id=user.id,
         action="change_password",
         target_type="user",
-        target_id=current_user.id,
+        target_id=user.id,
     )
-    db.add(audit_log)
-    await db.commit()
+    await invalidate_principal(user.id)
 
     return {"message": "密码修改成功"}
 
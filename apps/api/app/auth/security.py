@@ -1,11 +1,19 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from threading import Lock
+from typing import Callable, Optional, TypeVar
 import bcrypt
 from jose import jwt, JWTError
 from app.config import get_settings
 
 settings = get_settings()
 
+T = TypeVar("T")
+
 
 def hash_password(password: str) -> str:
     password_bytes = password.encode("utf-8")[:72]
@@ -22,6 +30,173 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return False
 
 
+# ============================================================================
+# 密码哈希工作池
+#
+# bcrypt 每次调用会占用 CPU 数百毫秒，若直接在 async 路由中调用会阻塞整个事件循环，
+# 导致同一进程内所有 SSE 流卡顿。bcrypt 在计算时会释放 GIL，因此放入有界线程池即可
+# 与事件循环并行执行；线程数即并发上限，超出部分在池内排队。
+# ============================================================================
+
+
+@dataclass(frozen=True)
+class PasswordHasherStats:
+    max_workers: int
+    queued: int
+    in_flight: int
+    completed: int
+    total_wait_ms: float
+    max_wait_ms: float
+    total_run_ms: float
+
+
+_pool_lock = Lock()
+_pool: Optional[ThreadPoolExecutor] = None
+_stats_lock = Lock()
+_queued = 0
+_in_flight = 0
+_completed = 0
+_total_wait_ms = 0.0
+_max_wait_ms = 0.0
+_total_run_ms = 0.0
+
+
+def _get_hash_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=settings.password_hash_workers,
+                thread_name_prefix="password-hash",
+            )
+        return _pool
+
+
+def _run_tracked(func: Callable[..., T], submitted_at: float, *args) -> T:
+    global _queued, _in_flight, _completed, _total_wait_ms, _max_wait_ms, _total_run_ms
+    started_at = time.perf_counter()
+    wait_ms = (started_at - submitted_at) * 1000
+    with _stats_lock:
+        _queued -= 1
+        _in_flight += 1
+        _total_wait_ms += wait_ms
+        _max_wait_ms = max(_max_wait_ms, wait_ms)
+    try:
+        return func(*args)
+    finally:
+        run_ms = (time.perf_counter() - started_at) * 1000
+        with _stats_lock:
+            _in_flight -= 1
+            _completed += 1
+            _total_run_ms += run_ms
+
+
+def _dequeue_unstarted() -> None:
+    global _queued
+    with _stats_lock:
+        _queued -= 1
+
+
+async def _run_in_hash_pool(func: Callable[..., T], *args) -> T:
+    global _queued
+    with _stats_lock:
+        _queued += 1
+    try:
+        # 线程池关闭（lifespan 退出）后提交会抛 RuntimeError，任务未入队
+        future = _get_hash_pool().submit(_run_tracked, func, time.perf_counter(), *args)
+    except BaseException:
+        _dequeue_unstarted()
+        raise
+    try:
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        # 等待中的请求被取消：尚未开始执行的任务随之取消，不会再由 _run_tracked 出队
+        if future.cancel():
+            _dequeue_unstarted()
+        raise
+
+
+async def hash_password_async(password: str) -> str:
+    """在密码哈希工作池中计算 bcrypt 哈希，不阻塞事件循环"""
+    return await _run_in_hash_pool(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """在密码哈希工作池中校验密码，不阻塞事件循环"""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+# 批量哈希（如批量导入）使用进程池，按进程数切块并行计算；
+# 进程数为 0 时退化为上面的线程池。
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_hash_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    with _pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=settings.password_hash_processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _process_pool
+
+
+def _hash_passwords(passwords: list[str]) -> list[str]:
+    return [hash_password(password) for password in passwords]
+
+
+async def hash_passwords_parallel(passwords: list[str]) -> list[str]:
+    """并行计算一批密码的哈希，返回顺序与输入一致"""
+    if not passwords:
+        return []
+
+    workers = settings.password_hash_processes or settings.password_hash_workers
+    chunk_size = -(-len(passwords) // workers)
+    chunks = [
+        passwords[i : i + chunk_size] for i in range(0, len(passwords), chunk_size)
+    ]
+
+    if settings.password_hash_processes > 0:
+        loop = asyncio.get_running_loop()
+        pool = _get_hash_process_pool()
+        results = await asyncio.gather(
+            *(loop.run_in_executor(pool, _hash_passwords, chunk) for chunk in chunks)
+        )
+    else:
+        results = await asyncio.gather(
+            *(_run_in_hash_pool(_hash_passwords, chunk) for chunk in chunks)
+        )
+
+    return [password_hash for chunk in results for password_hash in chunk]
+
+
+def get_password_hasher_stats() -> PasswordHasherStats:
+    with _stats_lock:
+        return PasswordHasherStats(
+            max_workers=settings.password_hash_workers,
+            queued=_queued,
+            in_flight=_in_flight,
+            completed=_completed,
+            total_wait_ms=round(_total_wait_ms, 3),
+            max_wait_ms=round(_max_wait_ms, 3),
+            total_run_ms=round(_total_run_ms, 3),
+        )
+
+
+def shutdown_password_hasher() -> None:
+    global _pool, _process_pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=True)
+            _process_pool = None
+
+
 def create_access_token(
     user_id: int, role: str, expires_delta: Optional[timedelta] = None
 ) -> str:
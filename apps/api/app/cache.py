@@ -0,0 +1,111 @@
+"""鉴权热路径使用的小型 TTL 缓存。
+
+数据按 key -> field -> value 两级组织，便于按用户整体失效（删除 key 即可）。
+- local：进程内字典，适合单进程部署或测试
+- redis：Redis hash，多 worker / 多主机共享，失效对所有进程立即可见
+"""
+
+import json
+import time
+from abc import ABC, abstractmethod
+from threading import RLock
+from typing import Any, Optional
+
+from app.config import get_settings
+from app.db.redis import get_redis
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get(self, key: str, field: str) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, field: str, value: Any, ttl_seconds: float) -> None:
+        pass
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        pass
+
+    @abstractmethod
+    async def clear(self) -> None:
+        pass
+
+
+class LocalCache(CacheBackend):
+    def __init__(self):
+        self._lock = RLock()
+        self._data: dict[str, dict[str, tuple[float, Any]]] = {}
+
+    async def get(self, key: str, field: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key, {}).get(field)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._data[key].pop(field, None)
+                return None
+            return value
+
+    async def set(self, key: str, field: str, value: Any, ttl_seconds: float) -> None:
+        with self._lock:
+            self._data.setdefault(key, {})[field] = (
+                time.monotonic() + ttl_seconds,
+                value,
+            )
+
+    async def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    async def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCache(CacheBackend):
+    def __init__(self, prefix: str = "socratic:cache:"):
+        self.prefix = prefix
+
+    async def get(self, key: str, field: str) -> Optional[Any]:
+        raw = await get_redis().hget(self.prefix + key, field)
+        if raw is None:
+            return None
+        payload = json.loads(raw)
+        if payload["exp"] <= time.time():
+            return None
+        return payload["value"]
+
+    async def set(self, key: str, field: str, value: Any, ttl_seconds: float) -> None:
+        payload = json.dumps({"exp": time.time() + ttl_seconds, "value": value})
+        async with get_redis().pipeline(transaction=True) as pipe:
+            pipe.hset(self.prefix + key, field, payload)
+            pipe.expire(self.prefix + key, max(1, int(ttl_seconds) + 1))
+            await pipe.execute()
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await get_redis().delete(*[self.prefix + key for key in keys])
+
+    async def clear(self) -> None:
+        redis = get_redis()
+        async for key in redis.scan_iter(match=self.prefix + "*"):
+            await redis.delete(key)
+
+
+_lock = RLock()
+_cache: Optional[CacheBackend] = None
+
+
+def get_cache() -> CacheBackend:
+    global _cache
+    with _lock:
+        if _cache is None:
+            if get_settings().auth_cache_backend == "redis":
+                _cache = RedisCache()
+            else:
+                _cache = LocalCache()
+        return _cache
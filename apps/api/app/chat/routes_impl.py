@@ -6,6 +6,8 @@ from datetime import datetime
 from typing import List, AsyncGenerator
 import json
 from app.db.base import get_db
+from app.db.partitions import conversation_messages
+from app.db.replica import get_read_db, mark_recent_write
 from app.models import (
     User,
     UserRole,
@@ -13,7 +15,6 @@ from app.models import (
     Message,
     MessageRole,
     Class,
-    ClassStudent,
     PromptScope,
     ScopeType,
 )
@@ -27,6 +28,7 @@ from app.schemas.chat import (
     SendMessageResponse,
 )
 from app.auth.deps import get_current_active_user
+from app.auth.membership_cache import get_student_class_ids
 from app.llm import get_llm_provider, ChatMessage
 from app.prompts import DEFAULT_SYSTEM_PROMPT
 from app.config import get_settings
@@ -101,11 +103,11 @@ async def _require_student_conversation(
 
 async def _get_conversation_history(
     db: AsyncSession,
-    conversation_id: int,
+    conversation: Conversation,
 ) -> list[Message]:
     msg_result = await db.execute(
         select(Message)
-        .where(Message.conversation_id == conversation_id)
+        .where(conversation_messages(conversation.id, conversation.created_at))
         .order_by(Message.created_at.asc())
     )
     return list(msg_result.scalars().all())
@@ -131,7 +133,7 @@ async def _build_chat_context(
     user_content: str,
 ) -> tuple[list[Message], list[ChatMessage]]:
     system_prompt, _ = await get_effective_prompt_content(db, conversation.class_id)
-    history_messages = await _get_conversation_history(db, conversation.id)
+    history_messages = await _get_conversation_history(db, conversation)
     chat_messages = _build_chat_messages(system_prompt, history_messages, user_content)
     return history_messages, chat_messages
 
@@ -244,13 +246,7 @@ async def create_conversation(
         )
 
     # 检查学生是否属于该班级
-    student_check = await db.execute(
-        select(ClassStudent).where(
-            ClassStudent.class_id == request.class_id,
-            ClassStudent.student_id == current_user.id,
-        )
-    )
-    if not student_check.scalar_one_or_none():
+    if request.class_id not in await get_student_class_ids(db, current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="你不属于该班级"
         )
@@ -270,6 +266,7 @@ async def create_conversation(
     db.add(conversation)
     await db.commit()
     await db.refresh(conversation)
+    await mark_recent_write(current_user.id)
 
     # 获取班级名称
     class_result = await db.execute(select(Class).where(Class.id == request.class_id))
@@ -298,7 +295,7 @@ async def list_conversations(
     class_id: int = None,
     page: int = 1,
     page_size: int = 20,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """获取对话列表
@@ -315,7 +312,7 @@ async def list_conversations(
     assistant_exists = (
         select(Message.id)
         .where(
-            Message.conversation_id == Conversation.id,
+            conversation_messages(Conversation.id, Conversation.created_at),
             Message.role == MessageRole.ASSISTANT,
         )
         .exists()
@@ -345,7 +342,9 @@ async def list_conversations(
     for conv in conversations:
         # 获取消息数量
         msg_count_result = await db.execute(
-            select(func.count(Message.id)).where(Message.conversation_id == conv.id)
+            select(func.count(Message.id)).where(
+                conversation_messages(conv.id, conv.created_at)
+            )
         )
         msg_count = msg_count_result.scalar() or 0
 
@@ -357,7 +356,7 @@ async def list_conversations(
         first_user_msg_result = await db.execute(
             select(Message.content)
             .where(
-                Message.conversation_id == conv.id,
+                conversation_messages(conv.id, conv.created_at),
                 Message.role == MessageRole.USER,
             )
             .order_by(Message.created_at.asc())
@@ -391,7 +390,7 @@ async def list_conversations(
 @router.get("/{conversation_id}/messages", response_model=MessageListResponse)
 async def get_messages(
     conversation_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """获取对话消息列表"""
@@ -415,7 +414,7 @@ async def get_messages(
     # 获取消息
     msg_result = await db.execute(
         select(Message)
-        .where(Message.conversation_id == conversation_id)
+        .where(conversation_messages(conversation.id, conversation.created_at))
         .order_by(Message.created_at.asc())
     )
     messages = msg_result.scalars().all()
@@ -509,6 +508,7 @@ async def send_message(
     conversation.last_message_at = datetime.utcnow()
 
     await db.commit()
+    await mark_recent_write(current_user.id)
     await db.refresh(user_message)
     await db.refresh(assistant_message)
 
@@ -558,6 +558,7 @@ async def stream_message(
         content="",
         policy_flags={},
     )
+    await mark_recent_write(current_user.id)
 
     has_prior_assistant = any(m.role == MessageRole.ASSISTANT for m in history_messages)
     provider = get_llm_provider()
@@ -587,6 +588,8 @@ async def stream_message(
             assistant_message.policy_flags = policy_flags
             conversation.last_message_at = datetime.utcnow()
             await db.commit()
+            # 回复可能持续较久，写完后重新计时
+            await mark_recent_write(current_user.id)
             yield _format_sse_event(
                 "done",
                 {"type": "done", "policy_flags": policy_flags},
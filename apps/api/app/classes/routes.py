@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import case, or_, select, func, update
 from sqlalchemy.orm import selectinload
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 from app.db.base import get_db
 from app.models import User, UserRole, Class, ClassStudent, ClassTeacher
 from app.schemas.classes import (
@@ -15,11 +15,27 @@ from app.schemas.classes import (
     TeacherInClass,
     AddStudentsRequest,
     AddTeachersRequest,
+    MembershipResult,
+    MembershipChangeResponse,
+    ClassRolloverRequest,
+    ClassRolloverResult,
+    ClassRolloverResponse,
 )
+from app.audit import record_audit
+from app.db.dml import insert_ignore
 from app.auth.deps import get_current_active_user, require_admin
+from app.auth.membership_cache import (
+    get_student_class_ids,
+    get_teacher_class_ids,
+    invalidate_memberships,
+)
 
 router = APIRouter(prefix="/classes", tags=["班级管理"])
 
+# 班级详情中学生名单的默认/最大分页大小
+ROSTER_PAGE_SIZE = 100
+ROSTER_MAX_PAGE_SIZE = 500
+
 
 @router.post("", response_model=ClassInfo)
 async def create_class(
@@ -69,72 +85,89 @@ async def list_classes(
     - 超管：返回所有班级
     - 教师：返回授课班级
     - 学生：返回所属班级
+
+    先在子查询中分页并用窗口函数带回总数，再只对本页的班级用关联子查询统计学生/教师人数，
+    一页只需一次查询，且不会对整张成员表分组。
     """
     if current_user.role == UserRole.ADMIN:
         # 超管看所有班级
-        query = select(Class)
-        count_query = select(func.count(Class.id))
+        visible = None
     elif current_user.role == UserRole.TEACHER:
         # 教师看授课班级
-        query = (
-            select(Class)
-            .join(ClassTeacher, Class.id == ClassTeacher.class_id)
-            .where(ClassTeacher.teacher_id == current_user.id)
-        )
-        count_query = (
-            select(func.count(Class.id))
-            .join(ClassTeacher, Class.id == ClassTeacher.class_id)
-            .where(ClassTeacher.teacher_id == current_user.id)
+        visible = select(ClassTeacher.class_id).where(
+            ClassTeacher.teacher_id == current_user.id
         )
     else:
         # 学生看所属班级
-        query = (
-            select(Class)
-            .join(ClassStudent, Class.id == ClassStudent.class_id)
-            .where(ClassStudent.student_id == current_user.id)
-        )
-        count_query = (
-            select(func.count(Class.id))
-            .join(ClassStudent, Class.id == ClassStudent.class_id)
-            .where(ClassStudent.student_id == current_user.id)
+        visible = select(ClassStudent.class_id).where(
+            ClassStudent.student_id == current_user.id
         )
 
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
+    page_query = select(
+        Class.id,
+        Class.name,
+        Class.grade,
+        Class.created_at,
+        func.count().over().label("total"),
+    )
+    if visible is not None:
+        page_query = page_query.where(Class.id.in_(visible))
 
-    query = query.order_by(Class.created_at.desc())
     if skip is not None or limit is not None:
         offset_value = int(skip or 0)
         limit_value = int(limit or page_size)
-        query = query.offset(offset_value).limit(limit_value)
     else:
-        query = query.offset((page - 1) * page_size).limit(page_size)
+        offset_value = (page - 1) * page_size
+        limit_value = page_size
+    paged = (
+        page_query.order_by(Class.created_at.desc(), Class.id.desc())
+        .offset(offset_value)
+        .limit(limit_value)
+        .subquery()
+    )
+
+    student_count = (
+        select(func.count())
+        .where(ClassStudent.class_id == paged.c.id)
+        .correlate(paged)
+        .scalar_subquery()
+    )
+    teacher_count = (
+        select(func.count())
+        .where(ClassTeacher.class_id == paged.c.id)
+        .correlate(paged)
+        .scalar_subquery()
+    )
+    query = select(
+        paged,
+        student_count.label("student_count"),
+        teacher_count.label("teacher_count"),
+    ).order_by(paged.c.created_at.desc(), paged.c.id.desc())
     result = await db.execute(query)
-    classes = result.scalars().all()
-
-    # 获取每个班级的学生和教师数量
-    items = []
-    for c in classes:
-        student_count_result = await db.execute(
-            select(func.count(ClassStudent.student_id)).where(
-                ClassStudent.class_id == c.id
-            )
-        )
-        teacher_count_result = await db.execute(
-            select(func.count(ClassTeacher.teacher_id)).where(
-                ClassTeacher.class_id == c.id
-            )
-        )
-        items.append(
-            ClassInfo(
-                id=c.id,
-                name=c.name,
-                grade=c.grade,
-                student_count=student_count_result.scalar() or 0,
-                teacher_count=teacher_count_result.scalar() or 0,
-                created_at=c.created_at.isoformat() if c.created_at else "",
-            )
+    rows = result.all()
+
+    if rows:
+        total = rows[0].total
+    elif offset_value == 0:
+        total = 0
+    else:
+        # 超出最后一页时没有行可带回总数，单独计数
+        count_query = select(func.count(Class.id))
+        if visible is not None:
+            count_query = count_query.where(Class.id.in_(visible))
+        total = (await db.execute(count_query)).scalar() or 0
+
+    items = [
+        ClassInfo(
+            id=row.id,
+            name=row.name,
+            grade=row.grade,
+            student_count=row.student_count,
+            teacher_count=row.teacher_count,
+            created_at=row.created_at.isoformat() if row.created_at else "",
         )
+        for row in rows
+    ]
 
     return ClassListResponse(total=total, items=items)
 
@@ -142,147 +175,346 @@ async def list_classes(
 @router.get("/{class_id}", response_model=ClassDetail)
 async def get_class_detail(
     class_id: int,
+    page: Optional[int] = Query(None, ge=1),
+    page_size: Optional[int] = Query(None, ge=1, le=ROSTER_MAX_PAGE_SIZE),
+    q: Optional[str] = Query(None, max_length=100),
+    compact: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    """获取班级详情"""
-    result = await db.execute(select(Class).where(Class.id == class_id))
-    class_obj = result.scalar_one_or_none()
+    """获取班级详情
+
+    - 学生名单按学号排序；传入 page 或 page_size 时分页返回（默认每页 ROSTER_PAGE_SIZE 人），
+      不传时返回完整名单；q 按学号或姓名前缀筛选学生
+    - 名单只查询界面展示的列，不加载完整的 User 对象
+    - compact=true 时只返回人数，不返回名单
+    """
+    paged = page is not None or page_size is not None
+    page = page or 1
+    page_size = page_size or ROSTER_PAGE_SIZE
+
+    # 班级信息与总人数一次查询
+    student_count = (
+        select(func.count())
+        .select_from(ClassStudent)
+        .where(ClassStudent.class_id == Class.id)
+        .scalar_subquery()
+    )
+    teacher_count = (
+        select(func.count())
+        .select_from(ClassTeacher)
+        .where(ClassTeacher.class_id == Class.id)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(
+            Class.id,
+            Class.name,
+            Class.grade,
+            Class.created_at,
+            student_count.label("student_count"),
+            teacher_count.label("teacher_count"),
+        ).where(Class.id == class_id)
+    )
+    class_row = result.one_or_none()
 
-    if not class_obj:
+    if not class_row:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="班级不存在")
 
     # 权限检查
     if current_user.role == UserRole.TEACHER:
-        teacher_check = await db.execute(
-            select(ClassTeacher).where(
-                ClassTeacher.class_id == class_id,
-                ClassTeacher.teacher_id == current_user.id,
-            )
-        )
-        if not teacher_check.scalar_one_or_none():
+        if class_id not in await get_teacher_class_ids(db, current_user.id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN, detail="无权查看该班级"
             )
     elif current_user.role == UserRole.STUDENT:
-        student_check = await db.execute(
-            select(ClassStudent).where(
-                ClassStudent.class_id == class_id,
-                ClassStudent.student_id == current_user.id,
-            )
-        )
-        if not student_check.scalar_one_or_none():
+        if class_id not in await get_student_class_ids(db, current_user.id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN, detail="无权查看该班级"
             )
 
-    # 获取学生列表
-    students_result = await db.execute(
-        select(User)
+    detail = ClassDetail(
+        id=class_row.id,
+        name=class_row.name,
+        grade=class_row.grade,
+        student_count=class_row.student_count,
+        teacher_count=class_row.teacher_count,
+        student_total=class_row.student_count,
+        page=page,
+        page_size=page_size,
+        students=[],
+        teachers=[],
+        created_at=class_row.created_at.isoformat() if class_row.created_at else "",
+    )
+    if compact:
+        return detail
+
+    # 获取学生列表（分页，可按前缀筛选）
+    student_filter = [ClassStudent.class_id == class_id]
+    keyword = (q or "").strip()
+    if keyword:
+        student_filter.append(
+            or_(
+                User.username.startswith(keyword, autoescape=True),
+                User.display_name.startswith(keyword, autoescape=True),
+            )
+        )
+    offset_value = (page - 1) * page_size if paged else 0
+    students_query = (
+        select(
+            User.id,
+            User.username,
+            User.display_name,
+            User.last_login_at,
+            func.count().over().label("total"),
+        )
         .join(ClassStudent, User.id == ClassStudent.student_id)
-        .where(ClassStudent.class_id == class_id)
+        .where(*student_filter)
+        .order_by(User.username, User.id)
     )
-    students = [
+    if paged:
+        students_query = students_query.offset(offset_value).limit(page_size)
+    student_rows = (await db.execute(students_query)).all()
+    if not paged:
+        detail.page_size = len(student_rows)
+    detail.students = [
         StudentInClass(
             id=s.id,
             username=s.username,
             display_name=s.display_name,
             last_login_at=s.last_login_at.isoformat() if s.last_login_at else None,
         )
-        for s in students_result.scalars().all()
+        for s in student_rows
     ]
+    if student_rows:
+        detail.student_total = student_rows[0].total
+    elif keyword:
+        if offset_value == 0:
+            detail.student_total = 0
+        else:
+            # 超出最后一页时没有行可带回总数，单独计数
+            count_result = await db.execute(
+                select(func.count())
+                .select_from(ClassStudent)
+                .join(User, User.id == ClassStudent.student_id)
+                .where(*student_filter)
+            )
+            detail.student_total = count_result.scalar() or 0
 
-    # 获取教师列表
+    # 获取教师列表（人数很少，不分页）
     teachers_result = await db.execute(
-        select(User)
+        select(User.id, User.username, User.display_name)
         .join(ClassTeacher, User.id == ClassTeacher.teacher_id)
         .where(ClassTeacher.class_id == class_id)
+        .order_by(User.username, User.id)
     )
-    teachers = [
-        TeacherInClass(
-            id=t.id,
-            username=t.username,
-            display_name=t.display_name,
-        )
-        for t in teachers_result.scalars().all()
+    detail.teachers = [
+        TeacherInClass(id=t.id, username=t.username, display_name=t.display_name)
+        for t in teachers_result.all()
     ]
 
-    return ClassDetail(
-        id=class_obj.id,
-        name=class_obj.name,
-        grade=class_obj.grade,
-        students=students,
-        teachers=teachers,
-        created_at=class_obj.created_at.isoformat() if class_obj.created_at else "",
-    )
+    return detail
 
 
-@router.post("/{class_id}/students/bulk-add")
-async def add_students_to_class(
-    class_id: int,
-    request: AddStudentsRequest,
+@router.post("/rollover", response_model=ClassRolloverResponse)
+async def rollover_classes(
+    request: ClassRolloverRequest,
     db: AsyncSession = Depends(get_db),
     admin: User = Depends(require_admin),
 ):
-    """批量添加学生到班级（超管专用）"""
-    result = await db.execute(select(Class).where(Class.id == class_id))
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="班级不存在")
+    """学年升级：把整班学生迁移到新班级（超管专用）
 
-    added = 0
-    errors = []
+    - 所有迁移在一条 UPDATE 中完成，同一事务内提交
+    - 支持链式升级（如 七年级一班 -> 八年级一班、八年级一班 -> 九年级一班 同时进行），
+      每个学生只按迁移前所在班级移动一次
+    """
+    mapping: dict[int, int] = {}
+    for move in request.moves:
+        if move.from_class_id == move.to_class_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="源班级与目标班级不能相同"
+            )
+        if move.from_class_id in mapping:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"班级 {move.from_class_id} 重复出现在迁移列表中",
+            )
+        mapping[move.from_class_id] = move.to_class_id
 
-    other_class_result = await db.execute(
-        select(ClassStudent.student_id, Class.name)
-        .join(Class, Class.id == ClassStudent.class_id)
-        .where(
-            ClassStudent.student_id.in_(request.student_ids),
-            ClassStudent.class_id != class_id,
+    class_ids = set(mapping) | set(mapping.values())
+    existing_result = await db.execute(select(Class.id).where(Class.id.in_(class_ids)))
+    missing = class_ids - set(existing_result.scalars().all())
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"班级不存在：{', '.join(str(i) for i in sorted(missing))}",
+        )
+
+    students_result = await db.execute(
+        select(ClassStudent.class_id, ClassStudent.student_id).where(
+            ClassStudent.class_id.in_(mapping)
         )
     )
-    other_class_map: dict[int, list[str]] = {}
-    for student_id, class_name in other_class_result.all():
-        other_class_map.setdefault(student_id, []).append(class_name)
-
-    for student_id in request.student_ids:
-        # 检查用户是否存在且是学生
-        user_result = await db.execute(select(User).where(User.id == student_id))
-        user = user_result.scalar_one_or_none()
-        if not user:
-            errors.append(f"用户 {student_id} 不存在")
-            continue
-        if user.role != UserRole.STUDENT:
-            errors.append(f"用户 {user.username} 不是学生角色")
-            continue
-        if student_id in other_class_map:
-            class_name = other_class_map[student_id][0]
-            errors.append(f"学生 {user.username} 已在班级 {class_name} 中，请先移除再添加")
-            continue
-
-        # 检查是否已在班级中
-        existing = await db.execute(
-            select(ClassStudent).where(
-                ClassStudent.class_id == class_id,
-                ClassStudent.student_id == student_id,
+    counts: dict[int, int] = {}
+    student_ids = []
+    for from_class_id, student_id in students_result.all():
+        counts[from_class_id] = counts.get(from_class_id, 0) + 1
+        student_ids.append(student_id)
+
+    await db.execute(
+        update(ClassStudent)
+        .where(ClassStudent.class_id.in_(mapping))
+        .values(class_id=case(mapping, value=ClassStudent.class_id))
+    )
+    await db.commit()
+
+    record_audit(
+        actor_id=admin.id,
+        action="rollover_classes",
+        target_type="class",
+        meta={"moves": {str(k): v for k, v in mapping.items()}, "moved": len(student_ids)},
+    )
+    await invalidate_memberships(*student_ids)
+
+    return ClassRolloverResponse(
+        moved=len(student_ids),
+        classes=[
+            ClassRolloverResult(
+                from_class_id=from_class_id,
+                to_class_id=to_class_id,
+                moved=counts.get(from_class_id, 0),
             )
-        )
-        if existing.scalar_one_or_none():
-            errors.append(f"学生 {user.username} 已在该班级中")
-            continue
+            for from_class_id, to_class_id in mapping.items()
+        ],
+    )
+
 
-        db.add(
-            ClassStudent(
-                class_id=class_id, student_id=student_id, created_at=datetime.utcnow()
+def _membership_results(
+    user_ids: List[int],
+    users: dict,
+    role: UserRole,
+    role_label: str,
+    current_members: set[int],
+    other_classes: dict[int, str],
+) -> tuple[list[MembershipResult], list[int]]:
+    """按提交顺序给出每个 id 的校验结果，以及待插入的 id"""
+    results = []
+    candidates = []
+    for user_id in dict.fromkeys(user_ids):
+        user = users.get(user_id)
+        if not user:
+            results.append(
+                MembershipResult(user_id=user_id, status="not_found", message=f"用户 {user_id} 不存在")
+            )
+        elif user.role != role:
+            results.append(
+                MembershipResult(
+                    user_id=user_id,
+                    status="wrong_role",
+                    message=f"用户 {user.username} 不是{role_label}角色",
+                )
+            )
+        elif user_id in current_members:
+            results.append(
+                MembershipResult(
+                    user_id=user_id,
+                    status="already_member",
+                    message=f"{role_label} {user.username} 已在该班级中",
+                )
+            )
+        elif user_id in other_classes:
+            results.append(
+                MembershipResult(
+                    user_id=user_id,
+                    status="in_other_class",
+                    message=f"{role_label} {user.username} 已在班级 {other_classes[user_id]} 中，请先移除再添加",
+                )
             )
+        else:
+            results.append(MembershipResult(user_id=user_id, status="added"))
+            candidates.append(user_id)
+    return results, candidates
+
+
+async def _insert_memberships(
+    db: AsyncSession,
+    link_model,
+    member_column,
+    class_id: int,
+    results: list[MembershipResult],
+    candidates: list[int],
+    users: dict,
+    role_label: str,
+) -> MembershipChangeResponse:
+    """INSERT ... ON CONFLICT DO NOTHING 批量写入关联，并发写入导致的冲突记为已在班级中"""
+    added_ids: set[int] = set()
+    if candidates:
+        now = datetime.utcnow()
+        insert_result = await db.execute(
+            insert_ignore(db, link_model).returning(member_column),
+            [
+                {"class_id": class_id, member_column.key: user_id, "created_at": now}
+                for user_id in candidates
+            ],
         )
-        added += 1
+        added_ids = set(insert_result.scalars().all())
+
+    for result in results:
+        if result.status == "added" and result.user_id not in added_ids:
+            result.status = "already_member"
+            result.message = f"{role_label} {users[result.user_id].username} 已在该班级中"
 
     await db.commit()
+    await invalidate_memberships(*added_ids)
 
-    return {"added": added, "errors": errors}
+    return MembershipChangeResponse(
+        added=len(added_ids),
+        errors=[r.message for r in results if r.status != "added"],
+        results=results,
+    )
 
 
-@router.post("/{class_id}/teachers/add")
+@router.post("/{class_id}/students/bulk-add", response_model=MembershipChangeResponse)
+async def add_students_to_class(
+    class_id: int,
+    request: AddStudentsRequest,
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """批量添加学生到班级（超管专用）
+
+    - 一次查询取出所有用户及其当前班级，一条 INSERT 写入关联
+    - results 按提交顺序给出每个 id 的结果
+    """
+    result = await db.execute(select(Class).where(Class.id == class_id))
+    if not result.scalar_one_or_none():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="班级不存在")
+
+    users_result = await db.execute(
+        select(User.id, User.username, User.role, ClassStudent.class_id, Class.name)
+        .outerjoin(ClassStudent, ClassStudent.student_id == User.id)
+        .outerjoin(Class, Class.id == ClassStudent.class_id)
+        .where(User.id.in_(request.student_ids))
+    )
+    users = {}
+    current_members = set()
+    other_classes: dict[int, str] = {}
+    for row in users_result.all():
+        users[row.id] = row
+        if row.class_id == class_id:
+            current_members.add(row.id)
+        elif row.class_id is not None:
+            other_classes.setdefault(row.id, row.name)
+
+    results, candidates = _membership_results(
+        request.student_ids, users, UserRole.STUDENT, "学生", current_members, other_classes
+    )
+    return await _insert_memberships(
+        db, ClassStudent, ClassStudent.student_id, class_id, results, candidates, users, "学生"
+    )
+
+
+@router.post("/{class_id}/teachers/add", response_model=MembershipChangeResponse)
 async def add_teachers_to_class(
     class_id: int,
     request: AddTeachersRequest,
@@ -294,39 +526,27 @@ async def add_teachers_to_class(
     if not result.scalar_one_or_none():
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="班级不存在")
 
-    added = 0
-    errors = []
-
-    for teacher_id in request.teacher_ids:
-        user_result = await db.execute(select(User).where(User.id == teacher_id))
-        user = user_result.scalar_one_or_none()
-        if not user:
-            errors.append(f"用户 {teacher_id} 不存在")
-            continue
-        if user.role != UserRole.TEACHER:
-            errors.append(f"用户 {user.username} 不是教师角色")
-            continue
-
-        existing = await db.execute(
-            select(ClassTeacher).where(
-                ClassTeacher.class_id == class_id,
-                ClassTeacher.teacher_id == teacher_id,
-            )
-        )
-        if existing.scalar_one_or_none():
-            errors.append(f"教师 {user.username} 已在该班级中")
-            continue
-
-        db.add(
-            ClassTeacher(
-                class_id=class_id, teacher_id=teacher_id, created_at=datetime.utcnow()
-            )
+    users_result = await db.execute(
+        select(User.id, User.username, User.role, ClassTeacher.class_id)
+        .outerjoin(
+            ClassTeacher,
+            (ClassTeacher.teacher_id == User.id) & (ClassTeacher.class_id == class_id),
         )
-        added += 1
-
-    await db.commit()
-
-    return {"added": added, "errors": errors}
+        .where(User.id.in_(request.teacher_ids))
+    )
+    users = {}
+    current_members = set()
+    for row in users_result.all():
+        users[row.id] = row
+        if row.class_id is not None:
+            current_members.add(row.id)
+
+    results, candidates = _membership_results(
+        request.teacher_ids, users, UserRole.TEACHER, "教师", current_members, {}
+    )
+    return await _insert_memberships(
+        db, ClassTeacher, ClassTeacher.teacher_id, class_id, results, candidates, users, "教师"
+    )
 
 
 @router.delete("/{class_id}/students/{student_id}")
@@ -357,6 +577,7 @@ async def remove_student_from_class(
 
     await db.delete(class_student)
     await db.commit()
+    await invalidate_memberships(student_id)
 
     return {"message": "学生已从班级移除"}
 
@@ -389,5 +610,6 @@ async def remove_teacher_from_class(
 
     await db.delete(class_teacher)
     await db.commit()
+    await invalidate_memberships(teacher_id)
 
     return {"message": "教师已从班级移除"}
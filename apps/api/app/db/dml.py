@@ -0,0 +1,13 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def insert_ignore(db: AsyncSession, table):
+    """按当前数据库方言生成 INSERT ... ON CONFLICT DO NOTHING
+
+    只支持 PostgreSQL（生产）与 SQLite（测试）：调用方依赖 ON CONFLICT 与批量 RETURNING，
+    其他数据库按 PostgreSQL 语法生成，执行时由数据库报错。
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(table).on_conflict_do_nothing()
+    return postgresql.insert(table).on_conflict_do_nothing()
@@ -0,0 +1,85 @@
+"""messages / audit_logs 按月分区（PostgreSQL，迁移 c4e8b1f7a2d6 建立）。
+
+- 分区按 created_at 划分，每月一个分区，命名为 {表名}_y2026m09；另有 {表名}_default
+  兜底分区，接收尚未建分区月份的数据（由 app.jobs.partitions 拆出到正式分区）
+- 分区裁剪：按会话查消息时附带 created_at 下界（会话创建时间减去时钟误差），
+  PostgreSQL 只需扫描会话开始之后的月份分区；SQLite 等非分区库上同样成立，只是没有裁剪效果
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Union
+
+from sqlalchemy import DateTime, and_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement, FunctionElement
+
+from app.models import Message
+
+PARTITIONED_TABLES = ("messages", "audit_logs")
+
+# 会话与消息可能由不同主机写入，时间以应用服务器时钟为准，留出足够的误差
+MESSAGE_CLOCK_SKEW_DAYS = 1
+
+
+def month_start(value: Union[date, datetime]) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def parse_partition_month(table: str, name: str) -> Union[date, None]:
+    """从分区名解析月份；不是月度分区（如 default 分区）时返回 None"""
+    prefix = f"{table}_y"
+    if not name.startswith(prefix):
+        return None
+    try:
+        year, month = name[len(prefix) :].split("m")
+        return date(int(year), int(month), 1)
+    except ValueError:
+        return None
+
+
+class _SkewFloor(FunctionElement):
+    """timestamp 列减去 MESSAGE_CLOCK_SKEW_DAYS 天（各方言的日期运算写法不同）"""
+
+    type = DateTime()
+    inherit_cache = True
+    name = "skew_floor"
+
+
+@compiles(_SkewFloor)
+def _skew_floor_default(element, compiler, **kw):
+    column = compiler.process(element.clauses, **kw)
+    return f"({column} - INTERVAL '{MESSAGE_CLOCK_SKEW_DAYS} days')"
+
+
+@compiles(_SkewFloor, "sqlite")
+def _skew_floor_sqlite(element, compiler, **kw):
+    column = compiler.process(element.clauses, **kw)
+    return f"datetime({column}, '-{MESSAGE_CLOCK_SKEW_DAYS} days')"
+
+
+def message_floor(conversation_created_at) -> Union[datetime, ColumnElement]:
+    """会话中消息 created_at 的下界；参数为 datetime 或 Conversation.created_at 列"""
+    if isinstance(conversation_created_at, datetime):
+        return conversation_created_at - timedelta(days=MESSAGE_CLOCK_SKEW_DAYS)
+    return _SkewFloor(conversation_created_at)
+
+
+def conversation_messages(conversation_id, conversation_created_at) -> ColumnElement:
+    """某会话全部消息的过滤条件（带分区裁剪用的时间下界）
+
+    可传入具体值（已加载的会话），也可传入 Conversation.id / Conversation.created_at 列
+    用于关联子查询与 join。
+    """
+    return and_(
+        Message.conversation_id == conversation_id,
+        Message.created_at >= message_floor(conversation_created_at),
+    )
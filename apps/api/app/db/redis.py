@@ -0,0 +1,26 @@
+from typing import TYPE_CHECKING, Optional
+
+from app.config import get_settings
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+_redis: Optional["Redis"] = None
+
+
+def get_redis() -> "Redis":
+    """获取进程共享的 Redis 客户端（内部维护连接池，首次调用时创建）"""
+    global _redis
+    if _redis is None:
+        # 未启用 Redis 的部署不必在启动时导入客户端库
+        from redis.asyncio import from_url as redis_from_url
+
+        _redis = redis_from_url(get_settings().redis_url, decode_responses=True)
+    return _redis
+
+
+async def close_redis() -> None:
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
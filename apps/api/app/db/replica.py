@@ -0,0 +1,174 @@
+"""只读副本路由（可选，配置 database_replica_url 后启用）。
+
+只读接口使用 get_read_db 代替 get_db：
+- 未配置副本：与 get_db 相同，走主库
+- 读己之写：用户刚写入（如学生刚发送消息）后 read_your_writes_seconds 秒内，
+  该用户的只读请求仍走主库，避免刚发的消息在列表里"消失"
+- 延迟回退：定期测量副本复制延迟，超过 replica_max_lag_seconds 或副本不可用时回退主库
+
+写入标记存放在鉴权缓存（app.cache）中，auth_cache_backend=redis 时对所有 worker 可见。
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from fastapi import Depends
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.auth.security import decode_token
+from app.cache import get_cache
+from app.config import get_settings
+from app.db.base import async_session_maker
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+RECENT_WRITE_FIELD = "primary"
+# 副本会话的 session.info 标记；成员关系缓存据此不缓存副本上读到的结果
+REPLICA_SESSION_INFO = "replica"
+
+# 副本上 WAL 已全部回放时延迟为 0；否则为距最后一次回放事务的秒数
+# （主库空闲时回放时间戳不再前进，因此先比较 LSN）
+PG_REPLICA_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+replica_engine: Optional[AsyncEngine] = (
+    create_async_engine(
+        settings.database_replica_url,
+        echo=False,
+        connect_args={"timeout": settings.db_connect_timeout_seconds},
+    )
+    if settings.database_replica_url
+    else None
+)
+replica_session_maker: Optional[async_sessionmaker] = (
+    async_sessionmaker(
+        replica_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        info={REPLICA_SESSION_INFO: True},
+    )
+    if replica_engine is not None
+    else None
+)
+
+
+class ReplicaLagMonitor:
+    """按 check_interval_seconds 缓存副本延迟的测量结果"""
+
+    def __init__(self, engine: AsyncEngine, max_lag_seconds: float, check_interval_seconds: float):
+        self.engine = engine
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self.lag_seconds: Optional[float] = None
+        self._usable = False
+        self._checked_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return time.monotonic() - self._checked_at < self.check_interval_seconds
+
+    async def measure_lag(self) -> Optional[float]:
+        """复制延迟（秒）；无法判断时返回 None"""
+        async with self.engine.connect() as conn:
+            if conn.dialect.name != "postgresql":
+                return 0.0
+            lag = await conn.scalar(PG_REPLICA_LAG_SQL)
+        return float(lag) if lag is not None else None
+
+    async def usable(self) -> bool:
+        if self._fresh():
+            return self._usable
+        async with self._lock:
+            # 等锁期间可能已有其他请求完成了测量
+            if self._fresh():
+                return self._usable
+            try:
+                async with asyncio.timeout(settings.db_connect_timeout_seconds):
+                    self.lag_seconds = await self.measure_lag()
+            except Exception:
+                logger.warning("只读副本不可用，读请求回退主库", exc_info=True)
+                self.lag_seconds = None
+            usable = self.lag_seconds is not None and self.lag_seconds <= self.max_lag_seconds
+            if self._usable and not usable and self.lag_seconds is not None:
+                logger.warning("只读副本延迟 %.1fs，读请求回退主库", self.lag_seconds)
+            self._usable = usable
+            self._checked_at = time.monotonic()
+        return self._usable
+
+
+replica_monitor: Optional[ReplicaLagMonitor] = (
+    ReplicaLagMonitor(
+        replica_engine,
+        max_lag_seconds=settings.replica_max_lag_seconds,
+        check_interval_seconds=settings.replica_lag_check_interval_seconds,
+    )
+    if replica_engine is not None
+    else None
+)
+
+
+def _recent_write_key(user_id: int) -> str:
+    return f"recent_write:{user_id}"
+
+
+async def mark_recent_write(user_id: int) -> None:
+    """标记用户刚写入，随后一段时间内其只读请求走主库"""
+    if replica_session_maker is None or settings.read_your_writes_seconds <= 0:
+        return
+    await get_cache().set(
+        _recent_write_key(user_id), RECENT_WRITE_FIELD, True, settings.read_your_writes_seconds
+    )
+
+
+async def has_recent_write(user_id: int) -> bool:
+    return bool(await get_cache().get(_recent_write_key(user_id), RECENT_WRITE_FIELD))
+
+
+async def read_session_maker(user_id: Optional[int]) -> async_sessionmaker:
+    """选择只读请求使用的会话工厂"""
+    if replica_session_maker is None or replica_monitor is None:
+        return async_session_maker
+    if user_id is not None and await has_recent_write(user_id):
+        return async_session_maker
+    if not await replica_monitor.usable():
+        return async_session_maker
+    return replica_session_maker
+
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def _token_user_id(credentials: Optional[HTTPAuthorizationCredentials]) -> Optional[int]:
+    # 只用于选择数据库，鉴权仍由 get_current_user 负责
+    payload = decode_token(credentials.credentials) if credentials else None
+    try:
+        return int(payload["sub"]) if payload else None
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+async def get_read_db(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)):
+    """只读接口的数据库会话：可用时走只读副本，否则走主库"""
+    session_maker = await read_session_maker(_token_user_id(credentials))
+    async with session_maker() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+async def dispose_replica_engine() -> None:
+    if replica_engine is not None:
+        await replica_engine.dispose()
@@ -0,0 +1,3 @@
+from app.exports.routes import router as exports_router
+
+__all__ = ["exports_router"]
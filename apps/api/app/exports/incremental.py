@@ -0,0 +1,118 @@
+"""按消费方的增量导出（供区县等下游系统每晚拉取）。
+
+- 增量导出也是一个 ExportJob，scope 中记录 mode=incremental、consumer 以及本次的消息 id 区间
+  (from_message_id, to_message_id]；消费方的水位即最近一次已完成增量任务的 to_message_id
+- 上界只取 export_incremental_settle_minutes 分钟之前写入的消息：流式回复在插入后才写完内容，
+  等它们落定后再导出，下游无需处理"同一条消息先空后满"的变更
+- 输出按 export_segment_rows 条切分为 gzip NDJSON 分段；每完成一段就把分段信息和续传位置
+  (resume_after) 写回 scope，任务失败后续传只需从 resume_after 继续
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models import ExportJob, ExportStatus, Message
+
+settings = get_settings()
+
+INCREMENTAL_MODE = "incremental"
+
+# 同一消费方的范围字段必须与上次一致，否则水位没有意义
+SCOPE_FILTER_FIELDS = ("class_id", "student_id")
+
+
+def is_incremental(scope: dict) -> bool:
+    return scope.get("mode") == INCREMENTAL_MODE
+
+
+def _consumer_jobs(consumer: str):
+    return select(ExportJob).where(
+        ExportJob.scope["mode"].as_string() == INCREMENTAL_MODE,
+        ExportJob.scope["consumer"].as_string() == consumer,
+    )
+
+
+async def last_completed_job(db: AsyncSession, consumer: str) -> Optional[ExportJob]:
+    """消费方最近一次完成的增量导出（即当前水位）"""
+    result = await db.execute(
+        _consumer_jobs(consumer)
+        .where(ExportJob.status == ExportStatus.COMPLETED)
+        .order_by(ExportJob.id.desc())
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+async def has_running_job(db: AsyncSession, consumer: str) -> bool:
+    result = await db.execute(
+        _consumer_jobs(consumer)
+        .where(ExportJob.status.in_([ExportStatus.PENDING, ExportStatus.PROCESSING]))
+        .limit(1)
+    )
+    return result.scalar_one_or_none() is not None
+
+
+def scope_changed(previous: ExportJob, scope: dict) -> bool:
+    return any(previous.scope.get(f) != scope.get(f) for f in SCOPE_FILTER_FIELDS)
+
+
+async def build_incremental_scope(
+    db: AsyncSession, consumer: str, base_scope: dict, previous: Optional[ExportJob]
+) -> dict:
+    """从上次水位到当前已落定的最大消息 id"""
+    from_message_id = previous.scope.get("to_message_id", 0) if previous else 0
+    settled_before = datetime.utcnow() - timedelta(
+        minutes=settings.export_incremental_settle_minutes
+    )
+    result = await db.execute(
+        select(Message.id, Message.created_at)
+        .where(Message.created_at <= settled_before)
+        .order_by(Message.id.desc())
+        .limit(1)
+    )
+    latest = result.one_or_none()
+    if latest is None or latest.id <= from_message_id:
+        to_message_id = from_message_id
+        to_created_at = previous.scope.get("to_created_at") if previous else None
+    else:
+        to_message_id = latest.id
+        to_created_at = latest.created_at.isoformat()
+
+    return {
+        **base_scope,
+        "format": "ndjson",
+        "mode": INCREMENTAL_MODE,
+        "consumer": consumer,
+        "from_message_id": from_message_id,
+        "to_message_id": to_message_id,
+        "to_created_at": to_created_at,
+        "resume_after": from_message_id,
+        "segments": [],
+    }
+
+
+def segment_key(job: ExportJob, index: int) -> str:
+    return f"incremental/{job.scope['consumer']}/{job.id}/part-{index:05d}.ndjson.gz"
+
+
+def manifest_key(job: ExportJob) -> str:
+    return f"incremental/{job.scope['consumer']}/{job.id}/manifest.json"
+
+
+def manifest(job: ExportJob) -> dict:
+    scope = job.scope
+    return {
+        "job_id": job.id,
+        "consumer": scope["consumer"],
+        "class_id": scope.get("class_id"),
+        "student_id": scope.get("student_id"),
+        "from_message_id": scope["from_message_id"],
+        "to_message_id": scope["to_message_id"],
+        "to_created_at": scope.get("to_created_at"),
+        "rows": sum(segment["rows"] for segment in scope["segments"]),
+        "segments": scope["segments"],
+    }
@@ -0,0 +1,64 @@
+"""导出范围（ExportJob.scope）与对应的消息查询。"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from sqlalchemy import Select, select
+
+from app.models import Class, Conversation, Message, User
+
+
+def parse_scope_date(value: Optional[str]) -> Optional[date]:
+    """解析 YYYY-MM-DD；格式错误抛出 ValueError"""
+    return date.fromisoformat(value) if value else None
+
+
+def _scoped_statement(scope: dict) -> Select:
+    query = (
+        select(
+            Message.conversation_id,
+            Class.name.label("class_name"),
+            User.username,
+            User.display_name,
+            Conversation.title,
+            Message.id.label("message_id"),
+            Message.role,
+            Message.content,
+            Message.created_at,
+            Message.token_in,
+            Message.token_out,
+        )
+        .join(Conversation, Conversation.id == Message.conversation_id)
+        .join(User, User.id == Conversation.student_id)
+        .join(Class, Class.id == Conversation.class_id)
+    )
+    if scope.get("class_id") is not None:
+        query = query.where(Conversation.class_id == scope["class_id"])
+    if scope.get("student_id") is not None:
+        query = query.where(Conversation.student_id == scope["student_id"])
+    start_date = parse_scope_date(scope.get("start_date"))
+    if start_date:
+        query = query.where(Message.created_at >= datetime.combine(start_date, time.min))
+    end_date = parse_scope_date(scope.get("end_date"))
+    if end_date:
+        query = query.where(
+            Message.created_at < datetime.combine(end_date + timedelta(days=1), time.min)
+        )
+    return query
+
+
+def export_statement(scope: dict) -> Select:
+    """按范围查询消息及其会话、学生、班级信息，按会话、消息顺序排列
+
+    scope: {class_id?, student_id?, start_date?, end_date?}，日期均含当天。
+    """
+    return _scoped_statement(scope).order_by(Message.conversation_id, Message.id)
+
+
+def incremental_statement(scope: dict, after_id: int, until_id: int) -> Select:
+    """增量导出：消息 id 在 (after_id, until_id] 之间，按消息 id 排列"""
+    return (
+        _scoped_statement(scope)
+        .where(Message.id > after_id, Message.id <= until_id)
+        .order_by(Message.id)
+    )
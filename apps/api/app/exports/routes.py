@@ -0,0 +1,408 @@
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.audit import record_audit
+from app.auth.deps import require_admin, require_teacher
+from app.auth.membership_cache import get_teacher_class_ids
+from app.config import get_settings
+from app.db.base import get_db
+from app.db.replica import get_read_db
+from app.exports.incremental import (
+    build_incremental_scope,
+    has_running_job,
+    is_incremental,
+    last_completed_job,
+    scope_changed,
+)
+from app.exports.query import parse_scope_date
+from app.exports.storage import get_export_storage, verify_download_token
+from app.exports.streaming import STREAM_FORMATS, iter_gzip_export
+from app.exports.writers import EXPORT_FORMATS
+from app.jobs import enqueue_job
+from app.models import ExportJob, ExportStatus, User, UserRole
+from app.schemas.exports import (
+    ExportCreate,
+    ExportJobInfo,
+    ExportLink,
+    ExportListResponse,
+    ExportWatermark,
+)
+
+router = APIRouter(prefix="/exports", tags=["数据导出"])
+settings = get_settings()
+
+
+def _export_job_to_info(job: ExportJob) -> ExportJobInfo:
+    return ExportJobInfo(
+        id=job.id,
+        requested_by=job.requested_by,
+        scope=job.scope,
+        status=job.status,
+        file_key=job.file_key,
+        error_message=job.error_message,
+        created_at=job.created_at.isoformat() if job.created_at else "",
+        finished_at=job.finished_at.isoformat() if job.finished_at else None,
+    )
+
+
+async def _get_own_job(db: AsyncSession, job_id: int, current_user: User) -> ExportJob:
+    job = await db.get(ExportJob, job_id)
+    if not job or (
+        current_user.role != UserRole.ADMIN and job.requested_by != current_user.id
+    ):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="导出任务不存在")
+    return job
+
+
+def _export_file(job: ExportJob, segment: Optional[int] = None) -> tuple[str, str, str]:
+    """任务的导出文件：(file_key, 下载文件名, media_type)；segment 指定增量导出的分段"""
+    if segment is not None:
+        segments = job.scope.get("segments", []) if is_incremental(job.scope) else []
+        if not 0 <= segment < len(segments):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="分段不存在")
+        file_key = segments[segment]["file_key"]
+        return file_key, file_key.rsplit("/", 1)[-1], "application/gzip"
+
+    if job.status != ExportStatus.COMPLETED or not job.file_key:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="导出尚未完成")
+    fmt = job.scope.get("format", "csv")
+    if is_incremental(job.scope):
+        return job.file_key, f"export_{job.id}_manifest.json", "application/json"
+    return (
+        job.file_key,
+        f"export_{job.id}.{fmt}",
+        EXPORT_FORMATS.get(fmt, "application/octet-stream"),
+    )
+
+
+async def _stream_file(file_key: str, filename: str, media_type: str) -> StreamingResponse:
+    """从导出存储按块读出并返回"""
+    storage = get_export_storage()
+    if not await run_in_threadpool(storage.exists, file_key):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="导出文件已过期")
+    return StreamingResponse(
+        storage.iter_chunks(file_key),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+async def _check_scope(db: AsyncSession, request: ExportCreate, current_user: User) -> None:
+    """校验日期格式与导出权限"""
+    try:
+        start_date = parse_scope_date(request.start_date)
+        end_date = parse_scope_date(request.end_date)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="日期格式错误，应为 YYYY-MM-DD"
+        )
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="开始日期不能晚于结束日期"
+        )
+
+    if current_user.role == UserRole.TEACHER:
+        if request.class_id is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="请指定班级")
+        if request.class_id not in await get_teacher_class_ids(db, current_user.id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN, detail="无权导出该班级的数据"
+            )
+
+
+async def _enqueue_export(db: AsyncSession, job: ExportJob) -> None:
+    try:
+        await run_in_threadpool(enqueue_job, "app.jobs.export.run_export_job", job.id)
+    except Exception:
+        job.status = ExportStatus.FAILED
+        job.error_message = "任务队列不可用"
+        await db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="任务队列不可用，请稍后重试"
+        )
+
+
+async def _incremental_scope(
+    db: AsyncSession, request: ExportCreate, current_user: User
+) -> dict:
+    """校验增量导出请求并计算本次的消息区间"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="增量导出仅限管理员")
+    if request.start_date or request.end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="增量导出不支持按日期筛选"
+        )
+    if await has_running_job(db, request.consumer):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="该消费方有进行中的增量导出"
+        )
+    scope = request.model_dump()
+    previous = await last_completed_job(db, request.consumer)
+    if previous and scope_changed(previous, scope):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="导出范围与该消费方上次的增量导出不一致",
+        )
+    return await build_incremental_scope(db, request.consumer, scope, previous)
+
+
+@router.post("", response_model=ExportJobInfo)
+async def create_export(
+    request: ExportCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_teacher),
+):
+    """创建学习数据导出任务（教师/超管）
+
+    - 教师只能导出自己授课班级的数据，需指定 class_id
+    - 可按学生、日期范围（含首尾两天）筛选
+    - 格式：csv / xlsx / ndjson，由后台任务生成文件
+    - 指定 consumer 时为增量导出（超管）：只导出该消费方上次水位之后的消息，
+      输出为 gzip NDJSON 分段和 manifest.json，失败后可续传
+    """
+    await _check_scope(db, request, current_user)
+    if request.consumer:
+        scope = await _incremental_scope(db, request, current_user)
+    else:
+        scope = request.model_dump()
+
+    job = ExportJob(
+        requested_by=current_user.id,
+        scope=scope,
+        status=ExportStatus.PENDING,
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+
+    await _enqueue_export(db, job)
+
+    # 记录审计日志
+    record_audit(
+        actor_id=current_user.id,
+        action="export",
+        target_type="export_job",
+        target_id=job.id,
+        meta=job.scope,
+    )
+
+    return _export_job_to_info(job)
+
+
+@router.post("/stream")
+async def stream_export(
+    request: ExportCreate,
+    db: AsyncSession = Depends(get_read_db),
+    auth_db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_teacher),
+):
+    """即时导出（适合中小范围）：直接返回 gzip 压缩的 CSV / NDJSON 下载流
+
+    不创建后台任务、不写临时文件；数据边读边压缩边发送。配置只读副本时从副本读取。
+    """
+    if request.format not in STREAM_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="即时导出仅支持 csv / ndjson 格式"
+        )
+    if request.consumer:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="即时导出不支持增量模式"
+        )
+    # 权限校验走主库（成员关系会写入缓存）
+    await _check_scope(auth_db, request, current_user)
+    scope = request.model_dump()
+
+    # 记录审计日志
+    record_audit(
+        actor_id=current_user.id,
+        action="export_stream",
+        target_type="export",
+        target_id=None,
+        meta=scope,
+    )
+
+    async def body() -> AsyncIterator[bytes]:
+        # 响应期间单独持有一个会话（游标需要在整个响应过程中保持打开）
+        async with AsyncSession(db.bind, expire_on_commit=False) as stream_db:
+            async for chunk in iter_gzip_export(
+                stream_db, scope, request.format, settings.export_batch_size
+            ):
+                yield chunk
+
+    filename = f"export_{datetime.utcnow():%Y%m%d%H%M%S}.{request.format}.gz"
+    return StreamingResponse(
+        body(),
+        media_type="application/gzip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("", response_model=ExportListResponse)
+async def list_exports(
+    skip: int = 0,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_teacher),
+):
+    """获取导出任务列表（教师看自己的，超管看全部）"""
+    query = select(ExportJob)
+    count_query = select(func.count(ExportJob.id))
+    if current_user.role != UserRole.ADMIN:
+        query = query.where(ExportJob.requested_by == current_user.id)
+        count_query = count_query.where(ExportJob.requested_by == current_user.id)
+
+    total = (await db.execute(count_query)).scalar() or 0
+    result = await db.execute(
+        query.order_by(ExportJob.created_at.desc(), ExportJob.id.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    items = [_export_job_to_info(job) for job in result.scalars().all()]
+
+    return ExportListResponse(total=total, items=items)
+
+
+@router.get("/watermarks/{consumer}", response_model=ExportWatermark)
+async def get_export_watermark(
+    consumer: str,
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """查询消费方的增量导出水位（超管专用）"""
+    job = await last_completed_job(db, consumer)
+    return ExportWatermark(
+        consumer=consumer,
+        job_id=job.id if job else None,
+        message_id=job.scope.get("to_message_id", 0) if job else 0,
+        created_at=job.scope.get("to_created_at") if job else None,
+    )
+
+
+@router.get("/files/{token}")
+async def download_export_by_link(token: str):
+    """通过签名链接下载导出文件（本地存储；无需登录，链接过期后失效）"""
+    payload = verify_download_token(token)
+    if payload is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="下载链接无效或已过期")
+    filename = payload.get("filename") or payload["key"].rsplit("/", 1)[-1]
+    return await _stream_file(payload["key"], filename, "application/octet-stream")
+
+
+@router.get("/{job_id}", response_model=ExportJobInfo)
+async def get_export(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_teacher),
+):
+    """查询导出任务状态"""
+    return _export_job_to_info(await _get_own_job(db, job_id, current_user))
+
+
+@router.get("/{job_id}/download")
+async def download_export(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_teacher),
+):
+    """下载导出文件（由 API 从存储中转发送）"""
+    job = await _get_own_job(db, job_id, current_user)
+    return await _stream_file(*_export_file(job))
+
+
+@router.get("/{job_id}/segments/{index}")
+async def download_export_segment(
+    job_id: int,
+    index: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_teacher),
+):
+    """下载增量导出的某个分段（已完成的分段在任务结束前即可下载）"""
+    job = await _get_own_job(db, job_id, current_user)
+    return await _stream_file(*_export_file(job, index))
+
+
+@router.get("/{job_id}/link", response_model=ExportLink)
+async def get_export_link(
+    job_id: int,
+    segment: Optional[int] = Query(None, ge=0, description="增量导出的分段序号"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_teacher),
+):
+    """生成带过期时间的下载链接，大文件由客户端直接从存储下载，不经 API 转发
+
+    - local 存储：/exports/files/{token}，token 为签名
+    - s3 存储：对象存储的预签名 URL
+    """
+    job = await _get_own_job(db, job_id, current_user)
+    file_key, filename, _ = _export_file(job, segment)
+    storage = get_export_storage()
+    if not await run_in_threadpool(storage.exists, file_key):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="导出文件已过期")
+
+    expires_in = settings.export_link_ttl_seconds
+    url = await run_in_threadpool(storage.download_url, file_key, filename, expires_in)
+    return ExportLink(
+        url=url,
+        expires_at=(datetime.utcnow() + timedelta(seconds=expires_in)).isoformat(),
+    )
+
+
+@router.post("/{job_id}/resume", response_model=ExportJobInfo)
+async def resume_export(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_teacher),
+):
+    """重新入队失败的导出任务；增量导出从最后一个完成的分段之后继续
+
+    入队失败的任务同样标记为失败。待执行或执行中的任务已有 worker 负责，不能重试：
+    两个 worker 会写入相同的分段文件，并同时更新 segments 与 resume_after。
+    """
+    job = await _get_own_job(db, job_id, current_user)
+    if job.status == ExportStatus.COMPLETED:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="导出任务已完成")
+
+    # 以状态为条件更新，并发的重试请求只有一个能入队
+    result = await db.execute(
+        update(ExportJob)
+        .where(ExportJob.id == job.id, ExportJob.status == ExportStatus.FAILED)
+        .values(status=ExportStatus.PENDING, error_message=None)
+    )
+    await db.commit()
+    if result.rowcount != 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="导出进行中，只能重试失败的任务"
+        )
+    await db.refresh(job)
+    await _enqueue_export(db, job)
+
+    return _export_job_to_info(job)
+
+
+@router.delete("/{job_id}")
+async def delete_export(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_teacher),
+):
+    """删除导出任务及其文件"""
+    job = await _get_own_job(db, job_id, current_user)
+    if job.status in (ExportStatus.PENDING, ExportStatus.PROCESSING):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="导出进行中，无法删除")
+
+    storage = get_export_storage()
+    file_keys = [job.file_key] if job.file_key else []
+    if is_incremental(job.scope):
+        file_keys += [segment["file_key"] for segment in job.scope.get("segments", [])]
+    for file_key in file_keys:
+        await run_in_threadpool(storage.delete, file_key)
+    await db.delete(job)
+    await db.commit()
+
+    return {"message": "导出任务已删除"}
@@ -0,0 +1,290 @@
+"""导出文件存储：本地目录或 S3 兼容对象存储（由 export_storage 选择）。
+
+- 写入：writer(key) 返回一个只写的二进制流，导出写入器直接向其中逐块写入；
+  成功结束时 commit()，异常时 abort()（也可作为 with 语句使用）
+  - local：先写 .part 临时文件，commit 时改名
+  - s3：按 export_s3_part_size_mb 分块做 multipart 上传，内存中最多保留一个分块，不落盘
+- 读取：iter_chunks(key) 按块读出，供下载接口流式返回
+- 下载链接：download_url(key, filename) 生成带过期时间的链接
+  - local：指向 /exports/files/{token}，token 为带过期时间的签名
+  - s3：对象存储的预签名 URL
+"""
+
+import io
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, Optional
+
+from jose import JWTError, jwt
+
+from app.config import get_settings
+
+settings = get_settings()
+
+READ_CHUNK_SIZE = 64 * 1024
+MIN_S3_PART_SIZE = 5 * 1024 * 1024  # S3 要求除最后一块外每块至少 5 MiB
+
+DOWNLOAD_TOKEN_TYPE = "export_download"
+
+
+class StorageWriter(io.RawIOBase):
+    """只写的导出文件流；with 语句正常退出时提交，异常时放弃"""
+
+    def writable(self) -> bool:
+        return True
+
+    def commit(self) -> None:
+        raise NotImplementedError
+
+    def abort(self) -> None:
+        raise NotImplementedError
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
+
+
+class ExportStorage:
+    def writer(self, key: str) -> StorageWriter:
+        raise NotImplementedError
+
+    def iter_chunks(self, key: str) -> Iterator[bytes]:
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def download_url(self, key: str, filename: str, expires_in: int) -> str:
+        raise NotImplementedError
+
+    def write_bytes(self, key: str, data: bytes) -> None:
+        with self.writer(key) as out:
+            out.write(data)
+
+
+# ---------------------------------------------------------------------------
+# 本地目录
+# ---------------------------------------------------------------------------
+
+
+class _LocalWriter(StorageWriter):
+    def __init__(self, path: Path):
+        super().__init__()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._path = path
+        self._part_path = path.with_name(path.name + ".part")
+        self._file = open(self._part_path, "wb")
+
+    def write(self, data) -> int:
+        return self._file.write(data)
+
+    def commit(self) -> None:
+        self._file.close()
+        self._part_path.replace(self._path)
+        self.close()
+
+    def abort(self) -> None:
+        self._file.close()
+        self._part_path.unlink(missing_ok=True)
+        self.close()
+
+
+class LocalExportStorage(ExportStorage):
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if not path.is_relative_to(self.root.resolve()):
+            raise ValueError(f"非法的文件 key：{key}")
+        return path
+
+    def writer(self, key: str) -> StorageWriter:
+        return _LocalWriter(self.path(key))
+
+    def iter_chunks(self, key: str) -> Iterator[bytes]:
+        with open(self.path(key), "rb") as f:
+            while chunk := f.read(READ_CHUNK_SIZE):
+                yield chunk
+
+    def exists(self, key: str) -> bool:
+        return self.path(key).exists()
+
+    def delete(self, key: str) -> None:
+        self.path(key).unlink(missing_ok=True)
+
+    def download_url(self, key: str, filename: str, expires_in: int) -> str:
+        return f"/exports/files/{sign_download_token(key, filename, expires_in)}"
+
+
+# ---------------------------------------------------------------------------
+# S3 兼容对象存储（AWS S3 / MinIO / 各云厂商 OSS 的 S3 接口）
+# ---------------------------------------------------------------------------
+
+
+class _MultipartWriter(StorageWriter):
+    def __init__(self, client, bucket: str, key: str, part_size: int):
+        super().__init__()
+        self._client = client
+        self._bucket = bucket
+        self._key = key
+        self._part_size = part_size
+        self._buffer = bytearray()
+        self._parts: list[dict] = []
+        self._upload_id: Optional[str] = None
+
+    def write(self, data) -> int:
+        self._buffer += data
+        while len(self._buffer) >= self._part_size:
+            self._upload_part(bytes(self._buffer[: self._part_size]))
+            del self._buffer[: self._part_size]
+        return len(data)
+
+    def _upload_part(self, body: bytes) -> None:
+        if self._upload_id is None:
+            response = self._client.create_multipart_upload(Bucket=self._bucket, Key=self._key)
+            self._upload_id = response["UploadId"]
+        number = len(self._parts) + 1
+        response = self._client.upload_part(
+            Bucket=self._bucket,
+            Key=self._key,
+            UploadId=self._upload_id,
+            PartNumber=number,
+            Body=body,
+        )
+        self._parts.append({"PartNumber": number, "ETag": response["ETag"]})
+
+    def commit(self) -> None:
+        if self._upload_id is None:
+            # 不足一个分块：直接上传
+            self._client.put_object(Bucket=self._bucket, Key=self._key, Body=bytes(self._buffer))
+        else:
+            if self._buffer:
+                self._upload_part(bytes(self._buffer))
+            self._client.complete_multipart_upload(
+                Bucket=self._bucket,
+                Key=self._key,
+                UploadId=self._upload_id,
+                MultipartUpload={"Parts": self._parts},
+            )
+        self._buffer = bytearray()
+        self.close()
+
+    def abort(self) -> None:
+        if self._upload_id is not None:
+            self._client.abort_multipart_upload(
+                Bucket=self._bucket, Key=self._key, UploadId=self._upload_id
+            )
+        self._buffer = bytearray()
+        self.close()
+
+
+class S3ExportStorage(ExportStorage):
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        client=None,
+        part_size: int = MIN_S3_PART_SIZE,
+    ):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.part_size = part_size
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            try:
+                import boto3
+            except ImportError as e:
+                raise RuntimeError("使用 S3 导出存储需要安装 boto3") from e
+
+            self._client = boto3.client(
+                "s3",
+                endpoint_url=settings.export_s3_endpoint_url or None,
+                region_name=settings.export_s3_region or None,
+                aws_access_key_id=settings.export_s3_access_key or None,
+                aws_secret_access_key=settings.export_s3_secret_key or None,
+            )
+        return self._client
+
+    def object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def writer(self, key: str) -> StorageWriter:
+        return _MultipartWriter(self.client, self.bucket, self.object_key(key), self.part_size)
+
+    def iter_chunks(self, key: str) -> Iterator[bytes]:
+        response = self.client.get_object(Bucket=self.bucket, Key=self.object_key(key))
+        yield from response["Body"].iter_chunks(READ_CHUNK_SIZE)
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+        except Exception:
+            return False
+        return True
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self.object_key(key))
+
+    def download_url(self, key: str, filename: str, expires_in: int) -> str:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self.object_key(key),
+                "ResponseContentDisposition": f'attachment; filename="{filename}"',
+            },
+            ExpiresIn=expires_in,
+        )
+
+
+# ---------------------------------------------------------------------------
+# 下载链接签名（本地存储）
+# ---------------------------------------------------------------------------
+
+
+def _token_secret() -> str:
+    # 与登录令牌使用不同的密钥，下载链接不能当作访问令牌使用
+    return f"{settings.jwt_secret}:{DOWNLOAD_TOKEN_TYPE}"
+
+
+def sign_download_token(key: str, filename: str, expires_in: int) -> str:
+    payload = {
+        "typ": DOWNLOAD_TOKEN_TYPE,
+        "key": key,
+        "filename": filename,
+        "exp": datetime.utcnow() + timedelta(seconds=expires_in),
+    }
+    return jwt.encode(payload, _token_secret(), algorithm=settings.jwt_algorithm)
+
+
+def verify_download_token(token: str) -> Optional[dict]:
+    """校验签名与有效期，返回 {key, filename}；无效或过期返回 None"""
+    try:
+        payload = jwt.decode(token, _token_secret(), algorithms=[settings.jwt_algorithm])
+    except JWTError:
+        return None
+    if payload.get("typ") != DOWNLOAD_TOKEN_TYPE or not payload.get("key"):
+        return None
+    return payload
+
+
+@lru_cache
+def get_export_storage() -> ExportStorage:
+    if settings.export_storage == "s3":
+        return S3ExportStorage(
+            bucket=settings.export_s3_bucket,
+            prefix=settings.export_s3_prefix,
+            part_size=max(settings.export_s3_part_size_mb * 1024 * 1024, MIN_S3_PART_SIZE),
+        )
+    return LocalExportStorage(settings.export_local_path)
@@ -0,0 +1,52 @@
+"""即时导出：从服务端游标逐批读取，编码后立即 gzip 压缩并交给响应流。
+
+每批数据写入一个可复用的小缓冲区后立刻压缩、清空；生成器只在客户端取走上一块后才会继续读取
+下一批，因此下载速度即是读库速度（背压来自客户端连接），内存中最多保留一批数据，不落盘。
+"""
+
+import io
+import zlib
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.exports.query import export_statement
+from app.exports.writers import ExportWriter
+
+STREAM_FORMATS = {"csv", "ndjson"}
+
+# gzip 头（wbits=16+MAX_WBITS）
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+async def iter_gzip_export(
+    db: AsyncSession, scope: dict, fmt: str, batch_size: int
+) -> AsyncIterator[bytes]:
+    """按批产出 gzip 压缩后的导出数据"""
+    if fmt not in STREAM_FORMATS:
+        raise ValueError(f"不支持的格式：{fmt}")
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, _GZIP_WBITS)
+    buffer = io.BytesIO()
+    writer = ExportWriter(fmt, buffer)
+
+    def drain() -> bytes:
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if data else b""
+
+    result = await db.stream(
+        export_statement(scope).execution_options(yield_per=batch_size)
+    )
+    try:
+        async for partition in result.partitions():
+            writer.write_rows(partition)
+            chunk = drain()
+            if chunk:
+                yield chunk
+    finally:
+        await result.close()
+
+    writer.close()
+    yield drain() + compressor.flush()
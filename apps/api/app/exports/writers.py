@@ -0,0 +1,114 @@
+"""学习数据导出的文件写入器：CSV / XLSX（openpyxl 只写模式）/ NDJSON。
+
+写入器只接受二进制文件对象，行数据按批追加，不在内存中保留已写入的行。
+"""
+
+import csv
+import io
+import json
+from typing import IO, Iterable, Sequence
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "ndjson": "application/x-ndjson",
+}
+
+EXPORT_FORMAT_PATTERN = "^(" + "|".join(EXPORT_FORMATS) + ")$"
+
+# （字段名, 表头）；NDJSON 使用字段名，CSV/XLSX 使用中文表头
+EXPORT_COLUMNS = [
+    ("conversation_id", "会话ID"),
+    ("class_name", "班级"),
+    ("username", "学号"),
+    ("display_name", "姓名"),
+    ("title", "会话标题"),
+    ("message_id", "消息ID"),
+    ("role", "角色"),
+    ("content", "内容"),
+    ("created_at", "时间"),
+    ("token_in", "输入token"),
+    ("token_out", "输出token"),
+]
+
+EXPORT_FIELDS = [name for name, _ in EXPORT_COLUMNS]
+
+
+def export_record(row) -> dict:
+    """把查询结果行转成可序列化的导出记录"""
+    return {
+        "conversation_id": row.conversation_id,
+        "class_name": row.class_name,
+        "username": row.username,
+        "display_name": row.display_name,
+        "title": row.title,
+        "message_id": row.message_id,
+        "role": row.role.value if hasattr(row.role, "value") else row.role,
+        "content": row.content,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "token_in": row.token_in,
+        "token_out": row.token_out,
+    }
+
+
+class ExportWriter:
+    """按批写入导出记录；close() 之后文件才完整（XLSX 在 close 时打包）"""
+
+    def __init__(self, fmt: str, out: IO[bytes]):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"不支持的格式：{fmt}")
+        self.fmt = fmt
+        self.count = 0
+        self._out = out
+        self._text = None
+        self._csv = None
+        self._workbook = None
+        self._sheet = None
+
+        if fmt == "csv":
+            # 带 BOM，Excel 直接打开不乱码
+            self._text = io.TextIOWrapper(out, encoding="utf-8-sig", newline="")
+            self._csv = csv.writer(self._text)
+            self._csv.writerow([label for _, label in EXPORT_COLUMNS])
+        elif fmt == "xlsx":
+            from openpyxl import Workbook
+
+            self._workbook = Workbook(write_only=True)
+            self._sheet = self._workbook.create_sheet("对话记录")
+            self._sheet.append([label for _, label in EXPORT_COLUMNS])
+
+    def write_rows(self, rows: Iterable) -> None:
+        records = [export_record(row) for row in rows]
+        if self.fmt == "csv":
+            self._csv.writerows(_values(record) for record in records)
+            self._text.flush()
+        elif self.fmt == "xlsx":
+            from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+            for record in records:
+                self._sheet.append(
+                    [
+                        ILLEGAL_CHARACTERS_RE.sub("", v) if isinstance(v, str) else v
+                        for v in _values(record)
+                    ]
+                )
+        else:
+            self._out.write(
+                "".join(
+                    json.dumps(record, ensure_ascii=False) + "\n" for record in records
+                ).encode("utf-8")
+            )
+        self.count += len(records)
+
+    def close(self) -> None:
+        if self._text is not None:
+            self._text.flush()
+            self._text.detach()
+            self._text = None
+        if self._workbook is not None:
+            self._workbook.save(self._out)
+            self._workbook = None
+
+
+def _values(record: dict) -> Sequence:
+    return [record[name] for name in EXPORT_FIELDS]
@@ -0,0 +1,3 @@
+from app.jobs.queue import enqueue_job, get_job_queue, job_session_factory
+
+__all__ = ["enqueue_job", "get_job_queue", "job_session_factory"]
@@ -0,0 +1,244 @@
+"""学习活动日汇总：把消息与会话按（日期, 班级, 学生）汇总到 rollup 表，报表只读汇总表。
+
+- 以 system_configs 中的水位（已汇总到的最大消息 id / 会话 id）驱动：每次运行找出水位之后
+  新写入数据所在的最早日期，从那天起按天整日重算（先删后插），结果与重算次数无关
+- 流式回复与错误标记在消息插入之后才写回，因此最近 activity_rollup_settle_minutes
+  分钟所在的日期每次都会重算
+- 日期按 UTC 划分（与 created_at 一致）
+
+定时运行（在 apps/api 目录下，例如每 5 分钟一次的 cron，或常驻循环）：
+    python -m app.jobs.activity_rollup
+    python -m app.jobs.activity_rollup --watch 300
+回填历史数据：
+    python -m app.jobs.activity_rollup --backfill
+    python -m app.jobs.activity_rollup --since 2026-09-01
+"""
+
+import argparse
+import asyncio
+import json
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.jobs.queue import job_session_factory
+from app.models import (
+    ClassDailyActivity,
+    Conversation,
+    Message,
+    MessageRole,
+    StudentDailyActivity,
+    SystemConfig,
+)
+
+settings = get_settings()
+
+WATERMARK_KEY = "activity.rollup_watermark"
+
+COUNTER_FIELDS = (
+    "message_count",
+    "conversation_count",
+    "token_in",
+    "token_out",
+    "error_count",
+    "latency_ms_total",
+    "latency_samples",
+)
+
+
+async def rebuild_activity_day(db: AsyncSession, day: date) -> int:
+    """重算某一天的学生与班级汇总，返回学生汇总行数（不提交）"""
+    start = datetime.combine(day, time.min)
+    end = start + timedelta(days=1)
+
+    latency = Message.policy_flags["latency_ms"].as_float()
+    message_rows = await db.execute(
+        select(
+            Conversation.class_id,
+            Conversation.student_id,
+            func.count(Message.id).filter(Message.role == MessageRole.USER),
+            func.coalesce(func.sum(Message.token_in), 0),
+            func.coalesce(func.sum(Message.token_out), 0),
+            func.count(Message.id).filter(
+                Message.policy_flags["error"].as_string().is_not(None)
+            ),
+            func.coalesce(func.sum(latency), 0),
+            func.count(latency),
+        )
+        .join(Conversation, Conversation.id == Message.conversation_id)
+        .where(Message.created_at >= start, Message.created_at < end)
+        .group_by(Conversation.class_id, Conversation.student_id)
+    )
+    conversation_rows = await db.execute(
+        select(Conversation.class_id, Conversation.student_id, func.count(Conversation.id))
+        .where(Conversation.created_at >= start, Conversation.created_at < end)
+        .group_by(Conversation.class_id, Conversation.student_id)
+    )
+
+    students: dict[tuple[int, int], dict] = defaultdict(
+        lambda: dict.fromkeys(COUNTER_FIELDS, 0)
+    )
+    for class_id, student_id, *counters in message_rows:
+        row = students[(class_id, student_id)]
+        (
+            row["message_count"],
+            row["token_in"],
+            row["token_out"],
+            row["error_count"],
+            row["latency_ms_total"],
+            row["latency_samples"],
+        ) = counters
+        row["latency_ms_total"] = float(row["latency_ms_total"])
+    for class_id, student_id, conversations in conversation_rows:
+        students[(class_id, student_id)]["conversation_count"] = conversations
+
+    now = datetime.utcnow()
+    classes: dict[int, dict] = defaultdict(
+        lambda: {**dict.fromkeys(COUNTER_FIELDS, 0), "active_students": 0}
+    )
+    for (class_id, _), counters in students.items():
+        totals = classes[class_id]
+        totals["active_students"] += 1
+        for field in COUNTER_FIELDS:
+            totals[field] += counters[field]
+
+    await db.execute(delete(StudentDailyActivity).where(StudentDailyActivity.day == day))
+    await db.execute(delete(ClassDailyActivity).where(ClassDailyActivity.day == day))
+    if students:
+        await db.execute(
+            insert(StudentDailyActivity),
+            [
+                {
+                    "day": day,
+                    "class_id": class_id,
+                    "student_id": student_id,
+                    "updated_at": now,
+                    **counters,
+                }
+                for (class_id, student_id), counters in students.items()
+            ],
+        )
+        await db.execute(
+            insert(ClassDailyActivity),
+            [
+                {"day": day, "class_id": class_id, "updated_at": now, **totals}
+                for class_id, totals in classes.items()
+            ],
+        )
+    return len(students)
+
+
+async def _load_watermark(db: AsyncSession) -> Optional[dict]:
+    row = await db.scalar(select(SystemConfig).where(SystemConfig.key == WATERMARK_KEY))
+    if row is None or not row.value:
+        return None
+    try:
+        return json.loads(row.value)
+    except ValueError:
+        return None
+
+
+async def _save_watermark(db: AsyncSession, watermark: dict) -> None:
+    row = await db.scalar(select(SystemConfig).where(SystemConfig.key == WATERMARK_KEY))
+    if row is None:
+        row = SystemConfig(key=WATERMARK_KEY)
+        db.add(row)
+    row.value = json.dumps(watermark)
+    row.updated_at = datetime.utcnow()
+
+
+async def _earliest_day(
+    db: AsyncSession, message_id: int, conversation_id: int
+) -> Optional[date]:
+    """水位之后新写入的消息/会话中最早的日期"""
+    earliest = [
+        await db.scalar(select(func.min(Message.created_at)).where(Message.id > message_id)),
+        await db.scalar(
+            select(func.min(Conversation.created_at)).where(Conversation.id > conversation_id)
+        ),
+    ]
+    earliest = [value for value in earliest if value is not None]
+    return min(earliest).date() if earliest else None
+
+
+async def process_activity_rollup(
+    session_factory: Callable[[], AsyncSession],
+    since: Optional[date] = None,
+    backfill: bool = False,
+) -> int:
+    """按水位（或从 since 起）重算受影响的日期，返回重算的天数
+
+    backfill=True 时忽略水位，从最早的数据起全部重算。
+    """
+    async with session_factory() as db:
+        # 先记下当前最大 id，本次之后写入的数据留给下一次
+        new_watermark = {
+            "message_id": await db.scalar(select(func.max(Message.id))) or 0,
+            "conversation_id": await db.scalar(select(func.max(Conversation.id))) or 0,
+        }
+        watermark = await _load_watermark(db)
+
+        if since is None:
+            if watermark is None or backfill:
+                # 首次运行或回填：从最早的数据开始
+                since = await _earliest_day(db, 0, 0)
+            else:
+                since = await _earliest_day(
+                    db, watermark.get("message_id", 0), watermark.get("conversation_id", 0)
+                )
+            now = datetime.utcnow()
+            settled = (now - timedelta(minutes=settings.activity_rollup_settle_minutes)).date()
+            since = min(since, settled) if since else settled
+
+        today = datetime.utcnow().date()
+        days = 0
+        day = since
+        while day <= today:
+            await rebuild_activity_day(db, day)
+            await db.commit()
+            days += 1
+            day += timedelta(days=1)
+
+        await _save_watermark(db, new_watermark)
+        await db.commit()
+        return days
+
+
+async def _run(since: Optional[date] = None, backfill: bool = False) -> int:
+    async with job_session_factory() as session_factory:
+        return await process_activity_rollup(session_factory, since, backfill)
+
+
+def run_activity_rollup_job(since: Optional[str] = None) -> int:
+    """RQ 任务入口（since 为 ISO 日期字符串）"""
+    return asyncio.run(_run(date.fromisoformat(since) if since else None))
+
+
+async def _watch(interval: float) -> None:
+    while True:
+        days = await _run()
+        print(f"activity rollup: rebuilt {days} day(s)")
+        await asyncio.sleep(interval)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="汇总学习活动日报表")
+    parser.add_argument("--since", type=date.fromisoformat, help="从该日期（含）起重算")
+    parser.add_argument("--backfill", action="store_true", help="从最早的数据起全部重算")
+    parser.add_argument("--watch", type=float, metavar="SECONDS", help="常驻运行，按间隔循环")
+    args = parser.parse_args()
+
+    if args.watch:
+        asyncio.run(_watch(args.watch))
+        return
+
+    days = asyncio.run(_run(args.since, args.backfill))
+    print(f"activity rollup: rebuilt {days} day(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""后台删除任务：按固定批次删除用户、班级及其对话记录。
+
+- 先分批删除消息、再删除会话，最后删除用户与班级，每批单独提交，避免长事务锁住 messages 表
+- 每一步都是幂等的（只删除仍然存在的数据），任务中断后重新入队即可从断点继续
+- 进度计数随每批提交写入 DeletionJob
+- 删除班级后清除其教师、学生的成员关系缓存，授权检查不再放行已删除的班级
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.audit import audit_writer, record_audit
+from app.auth.membership_cache import invalidate_memberships
+from app.config import get_settings
+from app.jobs.queue import job_session_factory
+from app.models import (
+    AuditLog,
+    Class,
+    ClassStudent,
+    ClassTeacher,
+    Conversation,
+    DeletionJob,
+    DeletionStatus,
+    ExportJob,
+    ImportJob,
+    Message,
+    PromptScope,
+    User,
+)
+
+settings = get_settings()
+
+
+async def _delete_chat_history(db: AsyncSession, job: DeletionJob, condition) -> None:
+    """分批删除满足条件的会话下的消息，再分批删除会话"""
+    conversation_ids = select(Conversation.id).where(condition)
+    batch_size = settings.deletion_batch_size
+
+    while True:
+        result = await db.execute(
+            select(Message.id)
+            .where(Message.conversation_id.in_(conversation_ids))
+            .limit(batch_size)
+        )
+        message_ids = result.scalars().all()
+        if not message_ids:
+            break
+        await db.execute(delete(Message).where(Message.id.in_(message_ids)))
+        job.deleted_messages += len(message_ids)
+        await db.commit()
+
+    while True:
+        result = await db.execute(conversation_ids.limit(batch_size))
+        ids = result.scalars().all()
+        if not ids:
+            break
+        await db.execute(delete(Conversation).where(Conversation.id.in_(ids)))
+        job.deleted_conversations += len(ids)
+        await db.commit()
+
+
+async def _delete_users(db: AsyncSession, job: DeletionJob, user_ids: list[int]) -> None:
+    batch_size = settings.deletion_batch_size
+    for start in range(0, len(user_ids), batch_size):
+        chunk = user_ids[start : start + batch_size]
+        result = await db.execute(select(User.id).where(User.id.in_(chunk)))
+        remaining = result.scalars().all()
+        if not remaining:
+            continue
+
+        await _delete_chat_history(db, job, Conversation.student_id.in_(remaining))
+
+        await db.execute(
+            update(AuditLog).where(AuditLog.actor_id.in_(remaining)).values(actor_id=None)
+        )
+        await db.execute(delete(PromptScope).where(PromptScope.created_by.in_(remaining)))
+        await db.execute(delete(ExportJob).where(ExportJob.requested_by.in_(remaining)))
+        await db.execute(delete(ImportJob).where(ImportJob.requested_by.in_(remaining)))
+        await db.execute(
+            delete(DeletionJob).where(
+                DeletionJob.requested_by.in_(remaining), DeletionJob.id != job.id
+            )
+        )
+        # 班级关联由外键级联删除
+        await db.execute(delete(User).where(User.id.in_(remaining)))
+        job.deleted_users += len(remaining)
+        await db.commit()
+
+
+async def _delete_classes(db: AsyncSession, job: DeletionJob, class_ids: list[int]) -> None:
+    await _delete_chat_history(db, job, Conversation.class_id.in_(class_ids))
+
+    teachers = await db.execute(
+        select(ClassTeacher.teacher_id).where(ClassTeacher.class_id.in_(class_ids))
+    )
+    students = await db.execute(
+        select(ClassStudent.student_id).where(ClassStudent.class_id.in_(class_ids))
+    )
+    member_ids = set(teachers.scalars().all()) | set(students.scalars().all())
+
+    # 班级关联由外键级联删除
+    await db.execute(delete(Class).where(Class.id.in_(class_ids)))
+    await db.commit()
+    await invalidate_memberships(*member_ids)
+
+
+async def process_deletion(
+    session_factory: Callable[[], AsyncSession], job_id: int
+) -> None:
+    async with session_factory() as db:
+        job = await db.get(DeletionJob, job_id)
+        # 只处理待执行的任务，重复投递的同一任务不会并发执行
+        if job is None or job.status != DeletionStatus.PENDING:
+            return
+
+        job.status = DeletionStatus.PROCESSING
+        job.error_message = None
+        await db.commit()
+
+        user_ids = job.scope.get("user_ids", [])
+        class_ids = job.scope.get("class_ids", [])
+        try:
+            await _delete_users(db, job, user_ids)
+            if class_ids:
+                await _delete_classes(db, job, class_ids)
+            job.status = DeletionStatus.COMPLETED
+        except Exception as e:
+            await db.rollback()
+            await db.refresh(job)
+            job.status = DeletionStatus.FAILED
+            job.error_message = str(e)
+
+        job.finished_at = datetime.utcnow()
+        await db.commit()
+
+        record_audit(
+            actor_id=job.requested_by,
+            action="deletion_job_finished",
+            target_type="deletion_job",
+            target_id=job.id,
+            meta={
+                "status": job.status.value,
+                "deleted_users": job.deleted_users,
+                "deleted_conversations": job.deleted_conversations,
+                "deleted_messages": job.deleted_messages,
+            },
+        )
+
+
+async def _run(job_id: int) -> None:
+    async with job_session_factory() as session_factory:
+        await audit_writer.start(session_factory)
+        try:
+            await process_deletion(session_factory, job_id)
+        finally:
+            await audit_writer.stop()
+
+
+def run_deletion_job(job_id: int) -> None:
+    """RQ 任务入口"""
+    asyncio.run(_run(job_id))
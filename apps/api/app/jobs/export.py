@@ -0,0 +1,193 @@
+"""学习数据导出任务：用服务端游标分批读取消息，逐批写入 CSV / XLSX / NDJSON 文件。
+
+- 查询以 yield_per=export_batch_size 流式执行（asyncpg 下为服务端游标），内存占用与范围大小无关
+- 文件经 app.exports.storage 写入本地目录或 S3 兼容存储，边生成边写出（本地为 .part 临时文件，
+  完成后改名；S3 为分块上传，完成后合并），下载接口不会读到写了一半的文件
+- file_key 为存储内的相对 key
+- 增量导出（scope.mode=incremental）写成 gzip NDJSON 分段与 manifest.json，见 app.exports.incremental
+"""
+
+import asyncio
+import gzip
+import json
+from datetime import datetime
+from typing import Callable
+from uuid import uuid4
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.audit import audit_writer, record_audit
+from app.config import get_settings
+from app.exports.incremental import is_incremental, manifest, manifest_key, segment_key
+from app.exports.query import export_statement, incremental_statement
+from app.exports.storage import get_export_storage
+from app.exports.writers import ExportWriter
+from app.jobs.queue import job_session_factory
+from app.models import ExportJob, ExportStatus
+
+settings = get_settings()
+
+
+class _Segment:
+    """一个增量分段：gzip NDJSON，边压缩边写入存储，完成后提交"""
+
+    def __init__(self, file_key: str, index: int):
+        self.file_key = file_key
+        self.index = index
+        self.rows = 0
+        self.first_message_id = None
+        self.last_message_id = None
+        self._raw = get_export_storage().writer(file_key)
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode="wb")
+        self._writer = ExportWriter("ndjson", self._gzip)
+
+    def write(self, rows: list) -> None:
+        if not rows:
+            return
+        self._writer.write_rows(rows)
+        self.rows += len(rows)
+        if self.first_message_id is None:
+            self.first_message_id = rows[0].message_id
+        self.last_message_id = rows[-1].message_id
+
+    def finish(self) -> dict:
+        self._writer.close()
+        self._gzip.close()
+        self._raw.commit()
+        return {
+            "index": self.index,
+            "file_key": self.file_key,
+            "rows": self.rows,
+            "first_message_id": self.first_message_id,
+            "last_message_id": self.last_message_id,
+        }
+
+    def discard(self) -> None:
+        self._raw.abort()
+
+
+async def _write_full_export(db: AsyncSession, job: ExportJob) -> int:
+    fmt = job.scope.get("format", "csv")
+    file_key = f"export-{job.id}-{uuid4().hex[:8]}.{fmt}"
+
+    with get_export_storage().writer(file_key) as out:
+        writer = ExportWriter(fmt, out)
+        result = await db.stream(
+            export_statement(job.scope).execution_options(
+                yield_per=settings.export_batch_size
+            )
+        )
+        async for partition in result.partitions():
+            writer.write_rows(partition)
+        writer.close()
+
+    job.file_key = file_key
+    return writer.count
+
+
+async def _write_incremental_export(
+    session_factory: Callable[[], AsyncSession], db: AsyncSession, job: ExportJob
+) -> int:
+    """从 resume_after 续写分段；每完成一段提交一次进度"""
+    scope = job.scope
+    segments = list(scope.get("segments", []))
+    segment_rows = settings.export_segment_rows
+    segment = None
+
+    async def finish_segment() -> None:
+        segments.append(segment.finish())
+        job.scope = {
+            **job.scope,
+            "segments": list(segments),
+            "resume_after": segment.last_message_id,
+        }
+        await db.commit()
+
+    # 游标使用独立会话，进度提交不会关闭游标
+    async with session_factory() as read_db:
+        result = await read_db.stream(
+            incremental_statement(
+                scope, scope["resume_after"], scope["to_message_id"]
+            ).execution_options(yield_per=settings.export_batch_size)
+        )
+        try:
+            async for partition in result.partitions():
+                pending = list(partition)
+                while pending:
+                    if segment is None:
+                        index = len(segments)
+                        segment = _Segment(segment_key(job, index), index)
+                    take = segment_rows - segment.rows
+                    segment.write(pending[:take])
+                    pending = pending[take:]
+                    if segment.rows >= segment_rows:
+                        await finish_segment()
+                        segment = None
+            if segment is not None:
+                await finish_segment()
+                segment = None
+        except Exception:
+            if segment is not None:
+                segment.discard()
+            raise
+
+    file_key = manifest_key(job)
+    get_export_storage().write_bytes(
+        file_key, json.dumps(manifest(job), ensure_ascii=False, indent=2).encode("utf-8")
+    )
+    job.file_key = file_key
+    return sum(s["rows"] for s in segments)
+
+
+async def process_export(session_factory: Callable[[], AsyncSession], job_id: int) -> None:
+    async with session_factory() as db:
+        job = await db.get(ExportJob, job_id)
+        if job is None or job.status != ExportStatus.PENDING:
+            return
+
+        job.status = ExportStatus.PROCESSING
+        job.error_message = None
+        await db.commit()
+
+        rows = 0
+        try:
+            if is_incremental(job.scope):
+                rows = await _write_incremental_export(session_factory, db, job)
+            else:
+                rows = await _write_full_export(db, job)
+            job.status = ExportStatus.COMPLETED
+        except Exception as e:
+            await db.rollback()
+            await db.refresh(job)
+            job.status = ExportStatus.FAILED
+            job.error_message = str(e)
+
+        job.finished_at = datetime.utcnow()
+        await db.commit()
+
+        record_audit(
+            actor_id=job.requested_by,
+            action="export_finished",
+            target_type="export_job",
+            target_id=job.id,
+            meta={
+                "status": job.status.value,
+                "format": job.scope.get("format", "csv"),
+                "mode": job.scope.get("mode", "full"),
+                "rows": rows,
+            },
+        )
+
+
+async def _run(job_id: int) -> None:
+    async with job_session_factory() as session_factory:
+        await audit_writer.start(session_factory)
+        try:
+            await process_export(session_factory, job_id)
+        finally:
+            await audit_writer.stop()
+
+
+def run_export_job(job_id: int) -> None:
+    """RQ 任务入口"""
+    asyncio.run(_run(job_id))
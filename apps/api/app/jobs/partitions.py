@@ -0,0 +1,201 @@
+"""messages / audit_logs 月度分区维护（仅 PostgreSQL，其他数据库上什么也不做）。
+
+- 补建分区：当前月起 partition_months_ahead 个月的分区提前建好
+- 拆出 default 分区：落入 default 分区的数据（分区未及时建好、离线迁移）按月移到正式分区
+- 保留策略：早于保留月数的分区从主表摘除（DETACH），按 partition_retention_action
+  移到归档 schema 或直接删除；保留月数为 0 时不处理
+- 有 default 分区时不能 DETACH CONCURRENTLY，摘除会短暂锁住主表，建议在低峰期运行
+
+定时运行（在 apps/api 目录下，例如每天一次的 cron，或常驻循环）：
+    python -m app.jobs.partitions
+    python -m app.jobs.partitions --watch 86400
+"""
+
+import argparse
+import asyncio
+from datetime import date, datetime
+from typing import Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.db.partitions import (
+    PARTITIONED_TABLES,
+    add_months,
+    month_start,
+    parse_partition_month,
+    partition_name,
+)
+from app.jobs.queue import job_session_factory
+
+settings = get_settings()
+
+
+def _retention_months(table: str) -> int:
+    return {
+        "messages": settings.message_retention_months,
+        "audit_logs": settings.audit_log_retention_months,
+    }[table]
+
+
+async def _is_partitioned(db: AsyncSession, table: str) -> bool:
+    kind = await db.scalar(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": table},
+    )
+    return kind == "p"
+
+
+async def list_partitions(db: AsyncSession, table: str) -> dict[date, str]:
+    """已挂载的月度分区：月份 -> 分区名（不含 default 分区）"""
+    rows = await db.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:table AS regclass)"
+        ),
+        {"table": table},
+    )
+    partitions = {}
+    for (name,) in rows:
+        month = parse_partition_month(table, name)
+        if month is not None:
+            partitions[month] = name
+    return partitions
+
+
+async def create_partition(db: AsyncSession, table: str, month: date) -> str:
+    """建立某月分区，并把 default 分区中该月的数据移入（不提交）"""
+    name = partition_name(table, month)
+    lower, upper = month.isoformat(), add_months(month, 1).isoformat()
+    # 挂载时要校验 default 分区中没有该月数据，期间不允许写入 default 分区
+    await db.execute(text(f"LOCK TABLE {table}_default IN EXCLUSIVE MODE"))
+    await db.execute(
+        text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    )
+    await db.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {table}_default "
+            f"WHERE created_at >= '{lower}' AND created_at < '{upper}' RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        )
+    )
+    await db.execute(
+        text(
+            f"ALTER TABLE {table} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+        )
+    )
+    return name
+
+
+async def retire_partition(db: AsyncSession, table: str, name: str) -> None:
+    """从主表摘除分区，归档或删除（不提交）"""
+    await db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+    if settings.partition_retention_action == "drop":
+        await db.execute(text(f"DROP TABLE {name}"))
+        return
+
+    schema = settings.partition_archive_schema
+    # 归档数据不应阻止删除用户；级联删除的外键保留，删除会话时归档中的消息一并删除
+    foreign_keys = await db.execute(
+        text(
+            "SELECT conname FROM pg_constraint "
+            "WHERE conrelid = CAST(:name AS regclass) AND contype = 'f' AND confdeltype <> 'c'"
+        ),
+        {"name": name},
+    )
+    for (constraint,) in foreign_keys.all():
+        await db.execute(text(f'ALTER TABLE {name} DROP CONSTRAINT "{constraint}"'))
+    await db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema}"))
+    await db.execute(text(f"ALTER TABLE {name} SET SCHEMA {schema}"))
+
+
+async def maintain_table(db: AsyncSession, table: str, today: date) -> dict[str, list[str]]:
+    current = month_start(today)
+    partitions = await list_partitions(db, table)
+
+    # default 分区中已有数据的月份，以及未来需要提前建好的月份
+    default_months = await db.execute(
+        text(f"SELECT DISTINCT CAST(date_trunc('month', created_at) AS date) FROM {table}_default")
+    )
+    wanted = {month for (month,) in default_months}
+    wanted.update(add_months(current, n) for n in range(settings.partition_months_ahead + 1))
+
+    created = []
+    for month in sorted(wanted - partitions.keys()):
+        partitions[month] = await create_partition(db, table, month)
+        await db.commit()
+        created.append(partitions[month])
+
+    retired = []
+    retention = _retention_months(table)
+    if retention > 0:
+        cutoff = add_months(current, -retention)
+        for month in sorted(partitions):
+            if month >= cutoff:
+                break
+            await retire_partition(db, table, partitions[month])
+            await db.commit()
+            retired.append(partitions[month])
+
+    return {"created": created, "retired": retired}
+
+
+async def process_partitions(
+    session_factory: Callable[[], AsyncSession],
+    today: Optional[date] = None,
+) -> dict[str, dict[str, list[str]]]:
+    """维护全部分区表，返回每张表新建与摘除的分区名"""
+    today = today or datetime.utcnow().date()
+    results = {}
+    async with session_factory() as db:
+        if db.bind.dialect.name != "postgresql":
+            return results
+        for table in PARTITIONED_TABLES:
+            if not await _is_partitioned(db, table):
+                continue
+            results[table] = await maintain_table(db, table, today)
+    return results
+
+
+async def _run() -> dict[str, dict[str, list[str]]]:
+    async with job_session_factory() as session_factory:
+        return await process_partitions(session_factory)
+
+
+def run_partition_maintenance_job() -> dict[str, dict[str, list[str]]]:
+    """RQ 任务入口"""
+    return asyncio.run(_run())
+
+
+def _report(results: dict[str, dict[str, list[str]]]) -> None:
+    if not results:
+        print("partitions: nothing to do (not a partitioned PostgreSQL database)")
+    for table, changes in results.items():
+        print(
+            f"partitions: {table} created {len(changes['created'])}, "
+            f"{settings.partition_retention_action} {len(changes['retired'])}"
+        )
+
+
+async def _watch(interval: float) -> None:
+    while True:
+        _report(await _run())
+        await asyncio.sleep(interval)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="维护消息与审计日志的月度分区")
+    parser.add_argument("--watch", type=float, metavar="SECONDS", help="常驻运行，按间隔循环")
+    args = parser.parse_args()
+
+    if args.watch:
+        asyncio.run(_watch(args.watch))
+        return
+
+    _report(asyncio.run(_run()))
+
+
+if __name__ == "__main__":
+    main()
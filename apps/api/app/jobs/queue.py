@@ -0,0 +1,50 @@
+"""RQ 后台任务的入队与数据库会话。
+
+启动 worker（在 apps/api 目录下）：
+    rq worker socratic --url $REDIS_URL
+
+任务函数本身是同步的 RQ 入口，内部用 asyncio.run 复用与 API 相同的异步代码；
+每个任务创建独立的数据库引擎，结束时释放。
+"""
+
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import get_settings
+
+if TYPE_CHECKING:
+    from rq import Queue
+
+settings = get_settings()
+
+
+def get_job_queue() -> "Queue":
+    # rq 只在入队时用到，不在 API 启动时导入
+    from redis import Redis
+    from rq import Queue
+
+    return Queue(settings.rq_queue_name, connection=Redis.from_url(settings.redis_url))
+
+
+def enqueue_job(func_path: str, *args, timeout: Optional[int] = None) -> str:
+    """按函数路径入队，返回 RQ job id（同步调用，路由中请放入线程池执行）"""
+    job = get_job_queue().enqueue(
+        func_path,
+        *args,
+        job_timeout=timeout or settings.job_timeout_seconds,
+    )
+    return job.id
+
+
+@asynccontextmanager
+async def job_session_factory() -> AsyncIterator[async_sessionmaker[AsyncSession]]:
+    engine = create_async_engine(
+        settings.database_url,
+        connect_args={"timeout": settings.db_connect_timeout_seconds},
+    )
+    try:
+        yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    finally:
+        await engine.dispose()
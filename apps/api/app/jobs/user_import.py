@@ -0,0 +1,216 @@
+"""用户名单导入任务：流式读取上传的 XLSX/CSV，分批校验并创建用户。
+
+- 每批 import_batch_size 行调用一次 import_users（一次查重 + 并行哈希 + 批量插入）并提交，
+  同时更新 ImportJob 的进度字段
+- dry_run 只校验，不计算哈希也不写入用户
+- 新建用户的初始密码逐批追加写入结果 CSV（result_file_key）；中途失败时已提交批次的用户
+  仍然存在，密码单同样可以下载
+- 任务结束后删除上传的名单文件；密码单为明文，超过 import_credentials_retention_hours
+  后由清理任务删除
+
+定时清理过期密码单（在 apps/api 目录下，例如每小时一次的 cron，或常驻循环）：
+    python -m app.jobs.user_import
+    python -m app.jobs.user_import --watch 3600
+"""
+
+import argparse
+import asyncio
+import csv
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.admin.user_import import (
+    count_roster_rows,
+    import_users,
+    iter_roster_rows,
+    parse_roster_row,
+)
+from app.audit import audit_writer, record_audit
+from app.auth.security import shutdown_password_hasher
+from app.config import get_settings
+from app.jobs.queue import job_session_factory
+from app.models import ImportJob, ImportStatus
+from app.schemas.admin import UserImportItem
+
+settings = get_settings()
+
+CREDENTIAL_COLUMNS = ["username", "display_name", "role", "class_name", "initial_password"]
+
+
+def credentials_path(job: ImportJob) -> Path:
+    return Path(job.file_key).with_suffix(".credentials.csv")
+
+
+async def process_user_import(
+    session_factory: Callable[[], AsyncSession], job_id: int
+) -> None:
+    async with session_factory() as db:
+        job = await db.get(ImportJob, job_id)
+        if job is None or job.status != ImportStatus.PENDING:
+            return
+
+        path = Path(job.file_key)
+        job.status = ImportStatus.PROCESSING
+        job.total_rows = count_roster_rows(path)
+        await db.commit()
+
+        errors: list[str] = []
+        seen_usernames: set[str] = set()
+        credentials_file = None
+        credentials_writer = None
+        if not job.dry_run:
+            result_path = credentials_path(job)
+            credentials_file = open(result_path, "w", newline="", encoding="utf-8")
+            credentials_writer = csv.writer(credentials_file)
+            credentials_writer.writerow(CREDENTIAL_COLUMNS)
+            job.result_file_key = str(result_path)
+
+        def add_error(message: str) -> None:
+            job.error_count += 1
+            if len(errors) < settings.import_max_reported_errors:
+                errors.append(message)
+
+        async def flush(batch: list[UserImportItem], rows_read: int) -> None:
+            if batch:
+                response = await import_users(
+                    db, batch, dry_run=job.dry_run, seen_usernames=seen_usernames
+                )
+                job.created_count += response.created_count
+                for message in response.errors:
+                    add_error(message)
+            job.processed_rows = rows_read
+            job.errors = list(errors)
+            await db.commit()
+
+            if credentials_writer is not None and batch:
+                credentials_writer.writerows(
+                    [
+                        u.username,
+                        u.display_name or "",
+                        u.role.value,
+                        u.class_name or "",
+                        u.initial_password,
+                    ]
+                    for u in response.users
+                )
+                credentials_file.flush()
+
+        try:
+            batch: list[UserImportItem] = []
+            rows_read = 0
+            for row_number, values in iter_roster_rows(path):
+                rows_read += 1
+                try:
+                    batch.append(parse_roster_row(row_number, values))
+                except ValueError as e:
+                    add_error(str(e))
+                if len(batch) >= settings.import_batch_size:
+                    await flush(batch, rows_read)
+                    batch = []
+            await flush(batch, rows_read)
+            job.status = ImportStatus.COMPLETED
+        except Exception as e:
+            await db.rollback()
+            await db.refresh(job)
+            job.status = ImportStatus.FAILED
+            job.error_message = str(e)
+        finally:
+            if credentials_file is not None:
+                credentials_file.close()
+
+        # 名单文件不再需要；没有新建任何用户时密码单为空，一并删除
+        path.unlink(missing_ok=True)
+        if credentials_file is not None and not job.created_count:
+            result_path.unlink(missing_ok=True)
+            job.result_file_key = None
+        job.finished_at = datetime.utcnow()
+        await db.commit()
+
+        record_audit(
+            actor_id=job.requested_by,
+            action="user_import",
+            target_type="import_job",
+            target_id=job.id,
+            meta={
+                "dry_run": job.dry_run,
+                "status": job.status.value,
+                "created_count": job.created_count,
+                "error_count": job.error_count,
+            },
+        )
+
+
+async def purge_import_credentials(
+    session_factory: Callable[[], AsyncSession], now: Optional[datetime] = None
+) -> int:
+    """删除超过保留期限的密码单文件，返回清理的任务数"""
+    retention = settings.import_credentials_retention_hours
+    if retention <= 0:
+        return 0
+    cutoff = (now or datetime.utcnow()) - timedelta(hours=retention)
+    async with session_factory() as db:
+        result = await db.execute(
+            select(ImportJob).where(
+                ImportJob.result_file_key.is_not(None),
+                ImportJob.finished_at < cutoff,
+            )
+        )
+        jobs = result.scalars().all()
+        for job in jobs:
+            Path(job.result_file_key).unlink(missing_ok=True)
+            job.result_file_key = None
+        await db.commit()
+        return len(jobs)
+
+
+async def _run(job_id: int) -> None:
+    async with job_session_factory() as session_factory:
+        await audit_writer.start(session_factory)
+        try:
+            await process_user_import(session_factory, job_id)
+        finally:
+            await audit_writer.stop()
+            shutdown_password_hasher()
+
+
+def run_user_import_job(job_id: int) -> None:
+    """RQ 任务入口"""
+    asyncio.run(_run(job_id))
+
+
+async def _purge() -> int:
+    async with job_session_factory() as session_factory:
+        return await purge_import_credentials(session_factory)
+
+
+def run_import_credentials_purge_job() -> int:
+    """RQ 任务入口"""
+    return asyncio.run(_purge())
+
+
+async def _watch(interval: float) -> None:
+    while True:
+        purged = await _purge()
+        print(f"user import: purged {purged} credential file(s)")
+        await asyncio.sleep(interval)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="清理导入任务中过期的初始密码单")
+    parser.add_argument("--watch", type=float, metavar="SECONDS", help="常驻运行，按间隔循环")
+    args = parser.parse_args()
+
+    if args.watch:
+        asyncio.run(_watch(args.watch))
+        return
+
+    purged = asyncio.run(_purge())
+    print(f"user import: purged {purged} credential file(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""按需加载的路由：不常用的子系统在首次请求时才导入，缩短冷启动。
+
+include_lazy_router 先在应用中登记一个占位路由，匹配给定的路径前缀；首次命中时导入
+真正的 APIRouter 并替换占位路由，再把请求重新交给路由表处理。
+- 占位路由应在所有立即加载的路由之后登记：只有其他路由都不完全匹配的请求才会触发加载
+- OpenAPI 文档生成前需调用 load_lazy_routers，保证文档完整
+"""
+
+import importlib
+from typing import Any, Sequence
+
+from fastapi import FastAPI
+from starlette.routing import BaseRoute, Match
+from starlette.types import Receive, Scope, Send
+
+
+class LazyRouter(BaseRoute):
+    def __init__(
+        self,
+        app: FastAPI,
+        target: str,
+        paths: Sequence[str],
+        include_kwargs: dict[str, Any],
+    ) -> None:
+        self.app_ref = app
+        self.target = target
+        self.paths = tuple(paths)
+        self.include_kwargs = include_kwargs
+        self.loaded = False
+
+    def _route_path(self, scope: Scope) -> str:
+        path, root_path = scope["path"], scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            return path[len(root_path) :] or "/"
+        return path
+
+    def matches(self, scope: Scope) -> tuple[Match, Scope]:
+        if self.loaded or scope["type"] not in ("http", "websocket"):
+            return Match.NONE, {}
+        path = self._route_path(scope)
+        for prefix in self.paths:
+            if path == prefix or path.startswith(prefix if prefix.endswith("/") else prefix + "/"):
+                return Match.FULL, {}
+        return Match.NONE, {}
+
+    def load(self) -> None:
+        """导入真正的路由并替换占位路由（同步执行，并发的首次请求不会重复加载）"""
+        if self.loaded:
+            return
+        module_name, _, attribute = self.target.partition(":")
+        router = getattr(importlib.import_module(module_name), attribute)
+        self.app_ref.router.routes.remove(self)
+        self.app_ref.include_router(router, **self.include_kwargs)
+        self.loaded = True
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.load()
+        await self.app_ref.router(scope, receive, send)
+
+
+def include_lazy_router(
+    app: FastAPI,
+    target: str,
+    paths: Sequence[str],
+    prefix: str = "",
+    **include_kwargs: Any,
+) -> LazyRouter:
+    """登记按需加载的路由
+
+    target 为 "模块:属性" 形式的 APIRouter 路径；paths 为（不含 prefix 的）路径前缀，
+    以 / 结尾时只匹配其下的子路径。其余参数传给 app.include_router。
+    """
+    placeholder = LazyRouter(
+        app,
+        target,
+        [prefix + path for path in paths],
+        {"prefix": prefix, **include_kwargs},
+    )
+    app.router.routes.append(placeholder)
+    return placeholder
+
+
+def load_lazy_routers(app: FastAPI) -> None:
+    for route in list(app.router.routes):
+        if isinstance(route, LazyRouter):
+            route.load()
@@ -0,0 +1,176 @@
+"""LLM 接口压测：并发发起流式请求，统计首字延迟、总延迟、吞吐与错误率。"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import httpx
+
+from app.llm.provider import ChatMessage, LLMProvider
+
+# 默认的学生提问样本（覆盖概念解释、报错排查、算法思路等常见场景）
+SAMPLE_QUESTIONS = [
+    "for 循环和 while 循环有什么区别？什么时候用哪一个？",
+    "我的代码报错 IndexError: list index out of range，这是什么意思？",
+    "怎么判断一个数是不是质数？我写的代码总是不对。",
+    "为什么 print(0.1 + 0.2) 输出的不是 0.3？",
+    "列表和字典分别适合存什么样的数据？",
+    "函数里修改了变量，为什么外面的值没有变？",
+    "怎么用 turtle 画一个五角星？",
+    "递归是什么意思？能不能不直接给我代码，先告诉我思路？",
+]
+
+MAX_REPORTED_ERRORS = 5
+
+
+@dataclass
+class ProbeResult:
+    ok: bool
+    total_ms: float
+    ttft_ms: Optional[float] = None
+    chunks: int = 0
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class BenchmarkStats:
+    total_requests: int
+    concurrency: int
+    success_count: int
+    error_count: int
+    rate_limited_count: int
+    wall_time_ms: float
+    ttft_p50_ms: Optional[float]
+    ttft_p90_ms: Optional[float]
+    ttft_p99_ms: Optional[float]
+    latency_p50_ms: Optional[float]
+    latency_p90_ms: Optional[float]
+    latency_p99_ms: Optional[float]
+    tokens_per_second: Optional[float]  # 单个流的平均生成速度（按流式分片估算）
+    aggregate_tokens_per_second: Optional[float]  # 整体吞吐
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def error_rate(self) -> float:
+        return self.error_count / self.total_requests if self.total_requests else 0.0
+
+    @property
+    def rate_limited_rate(self) -> float:
+        return self.rate_limited_count / self.total_requests if self.total_requests else 0.0
+
+
+def percentile(values: list[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 1)
+
+
+async def _probe(
+    provider: LLMProvider, messages: list[ChatMessage], max_tokens: int
+) -> ProbeResult:
+    started = time.perf_counter()
+    ttft_ms = None
+    chunks = 0
+    try:
+        async for _ in provider.chat_stream(messages, max_tokens=max_tokens):
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - started) * 1000
+            chunks += 1
+    except httpx.HTTPStatusError as e:
+        return ProbeResult(
+            ok=False,
+            total_ms=(time.perf_counter() - started) * 1000,
+            status_code=e.response.status_code,
+            error=f"HTTP {e.response.status_code}",
+        )
+    except Exception as e:
+        return ProbeResult(
+            ok=False,
+            total_ms=(time.perf_counter() - started) * 1000,
+            error=f"{type(e).__name__}: {e}"[:200],
+        )
+    return ProbeResult(
+        ok=True,
+        total_ms=(time.perf_counter() - started) * 1000,
+        ttft_ms=ttft_ms,
+        chunks=chunks,
+    )
+
+
+def summarize(results: list[ProbeResult], concurrency: int, wall_time_ms: float) -> BenchmarkStats:
+    succeeded = [r for r in results if r.ok]
+    ttfts = [r.ttft_ms for r in succeeded if r.ttft_ms is not None]
+    latencies = [r.total_ms for r in succeeded]
+
+    stream_rates = [
+        r.chunks / ((r.total_ms - r.ttft_ms) / 1000)
+        for r in succeeded
+        if r.ttft_ms is not None and r.chunks > 1 and r.total_ms > r.ttft_ms
+    ]
+    total_chunks = sum(r.chunks for r in succeeded)
+
+    errors = []
+    for r in results:
+        if r.error and r.error not in errors:
+            errors.append(r.error)
+
+    return BenchmarkStats(
+        total_requests=len(results),
+        concurrency=concurrency,
+        success_count=len(succeeded),
+        error_count=len(results) - len(succeeded),
+        rate_limited_count=sum(1 for r in results if r.status_code == 429),
+        wall_time_ms=round(wall_time_ms, 1),
+        ttft_p50_ms=percentile(ttfts, 50),
+        ttft_p90_ms=percentile(ttfts, 90),
+        ttft_p99_ms=percentile(ttfts, 99),
+        latency_p50_ms=percentile(latencies, 50),
+        latency_p90_ms=percentile(latencies, 90),
+        latency_p99_ms=percentile(latencies, 99),
+        tokens_per_second=(
+            round(sum(stream_rates) / len(stream_rates), 1) if stream_rates else None
+        ),
+        aggregate_tokens_per_second=(
+            round(total_chunks / (wall_time_ms / 1000), 1)
+            if total_chunks and wall_time_ms > 0
+            else None
+        ),
+        errors=errors[:MAX_REPORTED_ERRORS],
+    )
+
+
+async def run_llm_benchmark(
+    provider: LLMProvider,
+    system_prompt: str,
+    questions: list[str],
+    *,
+    concurrency: int,
+    total_requests: int,
+    max_tokens: int,
+    timeout_seconds: float,
+) -> BenchmarkStats:
+    """以固定并发发起 total_requests 个流式请求，问题按顺序轮换"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(index: int) -> ProbeResult:
+        messages = [
+            ChatMessage(role="system", content=system_prompt),
+            ChatMessage(role="user", content=questions[index % len(questions)]),
+        ]
+        async with semaphore:
+            try:
+                async with asyncio.timeout(timeout_seconds):
+                    return await _probe(provider, messages, max_tokens)
+            except TimeoutError:
+                return ProbeResult(
+                    ok=False, total_ms=timeout_seconds * 1000, error="timeout"
+                )
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(run_one(i) for i in range(total_requests)))
+    wall_time_ms = (time.perf_counter() - started) * 1000
+    return summarize(list(results), concurrency, wall_time_ms)
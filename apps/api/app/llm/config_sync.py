@@ -0,0 +1,259 @@
+"""LLM 配置的版本化快照与跨 worker 同步。
+
+- 配置保存在 system_configs（dotted keys，兼容旧的 underscore keys），
+  llm.config_version 每次更新加一；一次查询即可读出完整快照
+- 版本号用 UPDATE ... RETURNING 原子加一，版本行的行锁持有到提交，并发的更新依次执行，
+  每个版本号只对应一份配置
+- 更新后把新版本号写入 Redis 并通过 pub/sub 广播，各 worker 收到后从数据库重新加载，
+  整体替换运行时配置（API Key 不经过 Redis）
+- 各 worker 定期把当前运行的版本写入 Redis 哈希，供管理端查看；
+  心跳时也会比对 Redis 中的最新版本，弥补断线期间错过的广播
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Integer, String, cast, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.db.dml import insert_ignore
+from app.db.redis import get_redis
+from app.llm.runtime_settings import (
+    LLMRuntimeSettings,
+    apply_llm_runtime_snapshot,
+    get_llm_runtime_settings,
+)
+from app.models import SystemConfig
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# 定义 LLM 配置的键名（统一使用 dotted keys）
+LLM_CONFIG_KEYS = {
+    "provider_name": "llm.provider",
+    "base_url": "llm.base_url",
+    "api_key": "llm.api_key",
+    "model_name": "llm.model_name",
+}
+
+# 兼容旧的 underscore keys
+LEGACY_LLM_CONFIG_KEYS = {
+    "provider_name": "llm_provider_name",
+    "base_url": "llm_base_url",
+    "api_key": "llm_api_key",
+    "model_name": "llm_model_name",
+}
+
+LLM_CONFIG_VERSION_KEY = "llm.config_version"
+
+CHANNEL = "socratic:llm-config"
+VERSION_KEY = "socratic:llm-config:version"
+WORKERS_KEY = "socratic:llm-config:workers"
+
+REDIS_TIMEOUT_SECONDS = 2.0
+RECONNECT_DELAY_SECONDS = 5.0
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def load_llm_config_rows(db: AsyncSession) -> dict[str, SystemConfig]:
+    """一次查询读出所有 LLM 配置行（含旧键与版本号）"""
+    keys = [
+        *LLM_CONFIG_KEYS.values(),
+        *LEGACY_LLM_CONFIG_KEYS.values(),
+        LLM_CONFIG_VERSION_KEY,
+    ]
+    result = await db.execute(select(SystemConfig).where(SystemConfig.key.in_(keys)))
+    return {row.key: row for row in result.scalars().all()}
+
+
+async def bump_llm_config_version(db: AsyncSession) -> int:
+    """版本号原子加一并返回新版本号（不提交）
+
+    应在读取配置之前调用：版本行的行锁持有到提交，并发的更新在此等待，
+    之后读到的是先提交的配置。
+    """
+    await db.execute(
+        insert_ignore(db, SystemConfig).values(
+            key=LLM_CONFIG_VERSION_KEY, value="0", updated_at=datetime.utcnow()
+        )
+    )
+    result = await db.execute(
+        update(SystemConfig)
+        .where(SystemConfig.key == LLM_CONFIG_VERSION_KEY)
+        .values(value=cast(cast(SystemConfig.value, Integer) + 1, String))
+        .returning(SystemConfig.value)
+    )
+    return int(result.scalar_one())
+
+
+def config_values_from_rows(rows: dict[str, SystemConfig]) -> dict[str, str]:
+    """dotted key 优先，不存在时回退到旧键"""
+    values: dict[str, str] = {}
+    for field, key in LLM_CONFIG_KEYS.items():
+        row = rows.get(key) or rows.get(LEGACY_LLM_CONFIG_KEYS[field])
+        values[field] = (row.value if row else None) or ""
+    return values
+
+
+def config_version_from_rows(rows: dict[str, SystemConfig]) -> int:
+    row = rows.get(LLM_CONFIG_VERSION_KEY)
+    try:
+        return int(row.value) if row and row.value else 0
+    except ValueError:
+        return 0
+
+
+def snapshot_from_rows(rows: dict[str, SystemConfig]) -> LLMRuntimeSettings:
+    values = config_values_from_rows(rows)
+    return LLMRuntimeSettings(
+        provider=values["provider_name"] or None,
+        base_url=values["base_url"] or None,
+        model_name=values["model_name"] or None,
+        api_key=values["api_key"] or None,
+        version=config_version_from_rows(rows),
+    )
+
+
+async def load_llm_config_snapshot(db: AsyncSession) -> LLMRuntimeSettings:
+    return snapshot_from_rows(await load_llm_config_rows(db))
+
+
+async def publish_llm_config(version: int) -> bool:
+    """广播新版本号；Redis 不可用时只记录日志，由其他 worker 的心跳补齐"""
+    if not settings.llm_config_broadcast:
+        return False
+    try:
+        async with asyncio.timeout(REDIS_TIMEOUT_SECONDS):
+            redis = get_redis()
+            await redis.set(VERSION_KEY, version)
+            await redis.publish(CHANNEL, version)
+        return True
+    except Exception:
+        logger.warning("broadcast of LLM config version %s failed", version, exc_info=True)
+        return False
+
+
+async def list_llm_config_workers() -> list[dict]:
+    """读取各 worker 上报的配置版本（按 worker id 排序）"""
+    async with asyncio.timeout(REDIS_TIMEOUT_SECONDS):
+        entries = await get_redis().hgetall(WORKERS_KEY)
+    workers = []
+    for worker_id, raw in sorted(entries.items()):
+        try:
+            workers.append({"worker_id": worker_id, **json.loads(raw)})
+        except ValueError:
+            continue
+    return workers
+
+
+def local_worker_state() -> dict:
+    runtime = get_llm_runtime_settings()
+    return {
+        "worker_id": WORKER_ID,
+        "version": runtime.version,
+        "provider": runtime.provider or settings.model_provider,
+        "model_name": runtime.model_name or settings.model_name,
+        "reported_at": time.time(),
+    }
+
+
+class LLMConfigSync:
+    """每个 worker 一个实例：订阅配置广播、定期上报版本"""
+
+    def __init__(self, session_factory=None):
+        self._session_factory = session_factory
+        self._tasks: list[asyncio.Task] = []
+
+    def _get_session_factory(self):
+        if self._session_factory is None:
+            from app.db.base import async_session_maker
+
+            self._session_factory = async_session_maker
+        return self._session_factory
+
+    async def reload(self) -> LLMRuntimeSettings:
+        """从数据库加载最新快照并整体替换运行时配置"""
+        async with self._get_session_factory()() as db:
+            snapshot = await load_llm_config_snapshot(db)
+        apply_llm_runtime_snapshot(snapshot)
+        return snapshot
+
+    async def start(self, session_factory=None) -> None:
+        if self._tasks:
+            return
+        if session_factory is not None:
+            self._session_factory = session_factory
+        self._tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._heartbeat()),
+        ]
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if tasks:
+            try:
+                async with asyncio.timeout(REDIS_TIMEOUT_SECONDS):
+                    await get_redis().hdel(WORKERS_KEY, WORKER_ID)
+            except Exception:
+                pass
+
+    async def _report(self) -> None:
+        state = local_worker_state()
+        worker_id = state.pop("worker_id")
+        async with asyncio.timeout(REDIS_TIMEOUT_SECONDS):
+            await get_redis().hset(WORKERS_KEY, worker_id, json.dumps(state))
+
+    async def _reload_if_changed(self, version: Optional[str]) -> None:
+        if version is None:
+            return
+        if int(version) != get_llm_runtime_settings().version:
+            snapshot = await self.reload()
+            logger.info("LLM config reloaded, version %s", snapshot.version)
+        await self._report()
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = get_redis().pubsub()
+            try:
+                await pubsub.subscribe(CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        await self._reload_if_changed(message.get("data"))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("LLM config subscription lost, retrying", exc_info=True)
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def _heartbeat(self) -> None:
+        while True:
+            try:
+                async with asyncio.timeout(REDIS_TIMEOUT_SECONDS):
+                    latest = await get_redis().get(VERSION_KEY)
+                await self._reload_if_changed(latest)
+                if latest is None:
+                    await self._report()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("LLM config heartbeat failed", exc_info=True)
+            await asyncio.sleep(settings.llm_config_heartbeat_seconds)
+
+
+llm_config_sync = LLMConfigSync()
@@ -1,12 +1,18 @@
+import asyncio
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from threading import RLock
 from typing import List, Optional, AsyncGenerator
 import httpx
 from app.config import get_settings
-from app.llm.runtime_settings import get_llm_runtime_settings
+from app.llm.runtime_settings import LLMRuntimeSettings, get_llm_runtime_settings
+from app.resources import resources
 
 settings = get_settings()
 
+# 配置切换后旧 Provider 的连接池保留一段时间，让进行中的流式回复正常结束
+PROVIDER_RETIRE_SECONDS = 300.0
+
 
 @dataclass
 class ChatMessage:
@@ -55,12 +61,15 @@ class OpenAICompatibleProvider(LLMProvider):
         base_url: str = "https://api.openai.com/v1",
         model: str = "gpt-4o-mini",
         provider_name: str = "openai",
+        client: Optional[httpx.AsyncClient] = None,
     ):
         self.api_key = api_key
         self.base_url = base_url.rstrip("/")
         self.model = model
         self.provider_name = provider_name
-        self.client = httpx.AsyncClient(timeout=120.0)
+        # 传入的共享连接池由调用方负责关闭
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(timeout=120.0)
 
     async def chat(
         self,
@@ -141,18 +150,59 @@ class OpenAICompatibleProvider(LLMProvider):
                     if "content" in delta:
                         yield delta["content"]
 
+    async def aclose(self) -> None:
+        if self._owns_client:
+            await self.client.aclose()
 
-def get_llm_provider() -> LLMProvider:
-    """获取配置的 LLM Provider"""
-    runtime = get_llm_runtime_settings()
-    api_key = runtime.api_key or settings.openai_api_key
-    base_url = runtime.base_url or settings.openai_base_url
-    model_name = runtime.model_name or settings.model_name
-    provider_name = runtime.provider or settings.model_provider
 
+_provider_lock = RLock()
+_provider: Optional[OpenAICompatibleProvider] = None
+_provider_settings: Optional[LLMRuntimeSettings] = None
+
+
+def _build_provider(runtime: LLMRuntimeSettings) -> OpenAICompatibleProvider:
     return OpenAICompatibleProvider(
-        api_key=api_key,
-        base_url=base_url,
-        model=model_name,
-        provider_name=provider_name,
+        api_key=runtime.api_key or settings.openai_api_key,
+        base_url=runtime.base_url or settings.openai_base_url,
+        model=runtime.model_name or settings.model_name,
+        provider_name=runtime.provider or settings.model_provider,
+        client=resources.http_client,
+    )
+
+
+def _retire_provider(provider: OpenAICompatibleProvider) -> None:
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    loop.call_later(
+        PROVIDER_RETIRE_SECONDS, lambda: loop.create_task(provider.aclose())
     )
+
+
+def _uses_stale_client(provider: OpenAICompatibleProvider) -> bool:
+    # 共享连接池随应用启动创建、关闭时释放，之前或之后建立的 Provider 需要重建
+    shared = resources.http_client
+    return provider.client.is_closed or (shared is not None and provider.client is not shared)
+
+
+def get_llm_provider() -> LLMProvider:
+    """获取配置的 LLM Provider
+
+    同一份运行时配置快照复用同一个 Provider（及其连接池）；
+    快照被替换后，下一次调用原子地切换到按新配置创建的 Provider。
+    """
+    global _provider, _provider_settings
+    runtime = get_llm_runtime_settings()
+    with _provider_lock:
+        if (
+            _provider is None
+            or _provider_settings is not runtime
+            or _uses_stale_client(_provider)
+        ):
+            previous = _provider
+            _provider = _build_provider(runtime)
+            _provider_settings = runtime
+            if previous is not None:
+                _retire_provider(previous)
+        return _provider
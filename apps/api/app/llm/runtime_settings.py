@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from threading import RLock
 from typing import Optional
 
@@ -11,6 +11,7 @@ class LLMRuntimeSettings:
     base_url: Optional[str] = None
     model_name: Optional[str] = None
     api_key: Optional[str] = None
+    version: int = 0  # 数据库中的配置版本（llm.config_version）
 
 
 _lock = RLock()
@@ -32,7 +33,8 @@ def update_llm_runtime_settings(
     global _settings
     with _lock:
         current = _settings
-        _settings = LLMRuntimeSettings(
+        _settings = replace(
+            current,
             provider=provider if provider is not None else current.provider,
             base_url=base_url if base_url is not None else current.base_url,
             model_name=model_name if model_name is not None else current.model_name,
@@ -40,6 +42,17 @@ def update_llm_runtime_settings(
         )
 
 
+def apply_llm_runtime_snapshot(snapshot: LLMRuntimeSettings) -> None:
+    """Replace the runtime settings with a complete, versioned snapshot.
+
+    Readers see either the old or the new snapshot, never a mix of both.
+    """
+
+    global _settings
+    with _lock:
+        _settings = snapshot
+
+
 def get_llm_runtime_settings() -> LLMRuntimeSettings:
     with _lock:
         return _settings
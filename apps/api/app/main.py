@@ -1,28 +1,60 @@
 import asyncio
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from redis.asyncio import from_url as redis_from_url
-from sqlalchemy import select
 
 from app.config import get_settings
 from app.auth import auth_router
-from app.admin import admin_router
+from app.admin import admin_router, lazy_admin_routers
 from app.classes import classes_router
 from app.prompts import prompts_router
 from app.chat import chat_router
 from app.teacher import teacher_router
-from app.exports import exports_router
-from app.db.base import async_session_maker
-from app.models import SystemConfig
-from app.llm.runtime_settings import update_llm_runtime_settings
+from app.llm.config_sync import llm_config_sync
+from app.auth.security import shutdown_password_hasher
+from app.audit import audit_writer
+from app.lazy_router import include_lazy_router, load_lazy_routers
+from app.resources import resources
 
 settings = get_settings()
 
+
+async def load_llm_settings_from_db() -> None:
+    if settings.skip_startup_llm_sync:
+        return
+
+    try:
+        async with asyncio.timeout(settings.startup_db_timeout_seconds):
+            await llm_config_sync.reload()
+    except Exception:
+        pass
+
+    # 订阅配置广播并定期上报本 worker 的配置版本
+    if settings.llm_config_broadcast:
+        await llm_config_sync.start()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """启动时创建并预热共享资源；关闭时先停掉依赖它们的后台任务，再释放连接池"""
+    await resources.startup()
+    await load_llm_settings_from_db()
+    await audit_writer.start()
+    try:
+        yield
+    finally:
+        await llm_config_sync.stop()
+        await audit_writer.stop()
+        shutdown_password_hasher()
+        await resources.shutdown()
+
+
 app = FastAPI(
     title="Socratic Coding Platform",
     description="苏格拉底式中学编程辅助平台 API",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS 配置（开发环境允许所有来源，生产环境需收紧）
@@ -42,40 +74,22 @@ app.include_router(classes_router)
 app.include_router(prompts_router)
 app.include_router(chat_router)
 app.include_router(teacher_router)
-app.include_router(exports_router)
 
+# 不常用的子系统首次请求时才导入（须在上面的路由之后登记）
+for target, paths in lazy_admin_routers:
+    include_lazy_router(
+        app, target, paths, prefix=admin_router.prefix, tags=admin_router.tags
+    )
+include_lazy_router(app, "app.exports:exports_router", ["/exports"])
 
-@app.on_event("startup")
-async def load_llm_settings_from_db() -> None:
-    if settings.skip_startup_llm_sync:
-        return
 
-    try:
-        async with asyncio.timeout(settings.startup_db_timeout_seconds):
-            async with async_session_maker() as session:
-                result = await session.execute(
-                    select(SystemConfig).where(
-                        SystemConfig.key.in_(
-                            [
-                                "llm.provider",
-                                "llm.base_url",
-                                "llm.model_name",
-                                "llm.api_key",
-                            ]
-                        )
-                    )
-                )
-                rows = result.scalars().all()
-    except Exception:
-        return
+def openapi_with_lazy_routes():
+    # 生成文档前加载全部按需路由
+    load_lazy_routers(app)
+    return FastAPI.openapi(app)
 
-    config = {row.key: row.value for row in rows}
-    update_llm_runtime_settings(
-        provider=config.get("llm.provider"),
-        base_url=config.get("llm.base_url"),
-        model_name=config.get("llm.model_name"),
-        api_key=config.get("llm.api_key"),
-    )
+
+app.openapi = openapi_with_lazy_routes
 
 
 @app.get("/healthz")
@@ -85,31 +99,4 @@ async def healthz():
 
 @app.get("/readyz")
 async def readyz():
-    checks = {
-        "database": False,
-        "redis": not settings.readiness_check_redis,
-    }
-
-    try:
-        async with asyncio.timeout(settings.startup_db_timeout_seconds):
-            async with async_session_maker() as session:
-                await session.execute(select(1))
-                checks["database"] = True
-    except Exception:
-        checks["database"] = False
-
-    if settings.readiness_check_redis:
-        redis = redis_from_url(settings.redis_url, decode_responses=True)
-        try:
-            async with asyncio.timeout(settings.startup_db_timeout_seconds):
-                pong = await redis.ping()
-                checks["redis"] = bool(pong)
-        except Exception:
-            checks["redis"] = False
-        finally:
-            await redis.aclose()
-
-    return {
-        "ok": all(checks.values()),
-        "checks": checks,
-    }
+    return await resources.readiness()
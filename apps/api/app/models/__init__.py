@@ -12,6 +12,14 @@ from app.models.models import (
     MessageRole,
     ExportJob,
     ExportStatus,
+    ImportJob,
+    ImportStatus,
+    DeletionJob,
+    DeletionTarget,
+    DeletionStatus,
+    LLMBenchmarkRun,
+    StudentDailyActivity,
+    ClassDailyActivity,
     AuditLog,
     SystemConfig,
 )
@@ -30,6 +38,14 @@ __all__ = [
     "MessageRole",
     "ExportJob",
     "ExportStatus",
+    "ImportJob",
+    "ImportStatus",
+    "DeletionJob",
+    "DeletionTarget",
+    "DeletionStatus",
+    "LLMBenchmarkRun",
+    "StudentDailyActivity",
+    "ClassDailyActivity",
     "AuditLog",
     "SystemConfig",
 ]
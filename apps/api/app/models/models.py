@@ -6,7 +6,9 @@ from sqlalchemy import (
     String,
     Text,
     Boolean,
+    Date,
     DateTime,
+    Float,
     ForeignKey,
     Enum,
     JSON,
@@ -92,6 +94,8 @@ class ClassTeacher(Base):
     )
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
+    __table_args__ = (Index("ix_class_teacher_teacher", "teacher_id"),)
+
 
 class ClassStudent(Base):
     """班级-学生关联表"""
@@ -106,6 +110,8 @@ class ClassStudent(Base):
     )
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
+    __table_args__ = (Index("ix_class_student_student", "student_id"),)
+
 
 class ScopeType(str, enum.Enum):
     GLOBAL = "global"
@@ -139,6 +145,7 @@ class PromptScope(Base):
 
     __table_args__ = (
         Index("ix_prompt_scope_lookup", "scope_type", "class_id", "is_active"),
+        Index("ix_prompt_scope_version", "scope_type", "class_id", "version"),
     )
 
 
@@ -170,6 +177,7 @@ class Conversation(Base):
     __table_args__ = (
         Index("ix_conversation_student", "student_id", "last_message_at"),
         Index("ix_conversation_class", "class_id", "last_message_at"),
+        Index("ix_conversation_created_at", "created_at"),
     )
 
 
@@ -180,7 +188,11 @@ class MessageRole(str, enum.Enum):
 
 
 class Message(Base):
-    """对话消息"""
+    """对话消息
+
+    PostgreSQL 上按 created_at 月度分区（见 app.db.partitions），库中主键为 (id, created_at)。
+    ORM 同样以 (id, created_at) 标识一行，更新/删除单条消息时可裁剪到所在分区。
+    """
 
     __tablename__ = "messages"
 
@@ -204,7 +216,10 @@ class Message(Base):
 
     __table_args__ = (
         Index("ix_message_conversation", "conversation_id", "created_at"),
+        Index("ix_message_conversation_role", "conversation_id", "role", "created_at"),
+        Index("ix_message_created_at", "created_at"),
     )
+    __mapper_args__ = {"primary_key": [id, created_at]}
 
 
 class ExportStatus(str, enum.Enum):
@@ -237,6 +252,171 @@ class ExportJob(Base):
     requester = relationship("User")
 
 
+class ImportStatus(str, enum.Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class ImportJob(Base):
+    """用户名单导入任务"""
+
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    requested_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    filename = Column(String(255), nullable=False)  # 上传时的原始文件名
+    file_key = Column(String(255), nullable=False)  # 上传文件的存储路径
+    dry_run = Column(Boolean, default=False, nullable=False)  # 仅校验，不创建用户
+    status = Column(
+        Enum(ImportStatus, values_callable=lambda obj: [e.value for e in obj]),
+        default=ImportStatus.PENDING,
+        nullable=False,
+    )
+    total_rows = Column(Integer, nullable=True)
+    processed_rows = Column(Integer, default=0, nullable=False)
+    created_count = Column(Integer, default=0, nullable=False)
+    error_count = Column(Integer, default=0, nullable=False)
+    errors = Column(JSON, nullable=True)  # 逐行错误（只保留前若干条）
+    result_file_key = Column(String(255), nullable=True)  # 初始密码结果文件
+    error_message = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    requester = relationship("User")
+
+
+class DeletionTarget(str, enum.Enum):
+    USER = "user"
+    CLASS = "class"
+    COHORT = "cohort"  # 按年级删除整届学生
+
+
+class DeletionStatus(str, enum.Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class DeletionJob(Base):
+    """后台删除任务（分批删除用户及其对话记录）"""
+
+    __tablename__ = "deletion_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    requested_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    target_type = Column(
+        Enum(DeletionTarget, values_callable=lambda obj: [e.value for e in obj]),
+        nullable=False,
+    )
+    target_id = Column(Integer, nullable=True)  # 用户或班级 id
+    target_label = Column(String(100), nullable=True)  # 用户名 / 班级名 / 年级
+    scope = Column(JSON, nullable=False)  # {user_ids: [...], class_ids: [...]}
+    status = Column(
+        Enum(DeletionStatus, values_callable=lambda obj: [e.value for e in obj]),
+        default=DeletionStatus.PENDING,
+        nullable=False,
+    )
+    total_users = Column(Integer, default=0, nullable=False)
+    deleted_users = Column(Integer, default=0, nullable=False)
+    deleted_conversations = Column(Integer, default=0, nullable=False)
+    deleted_messages = Column(Integer, default=0, nullable=False)
+    error_message = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    requester = relationship("User")
+
+
+class LLMBenchmarkRun(Base):
+    """LLM 接口压测结果，用于横向比较不同服务商与模型"""
+
+    __tablename__ = "llm_benchmark_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    requested_by = Column(
+        Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True
+    )
+    provider_name = Column(String(50), nullable=True)
+    base_url = Column(String(255), nullable=True)
+    model_name = Column(String(100), nullable=False)
+    class_id = Column(Integer, nullable=True)  # 使用哪个班级的有效提示词
+    prompt_version = Column(Integer, nullable=True)
+    concurrency = Column(Integer, nullable=False)
+    total_requests = Column(Integer, nullable=False)
+    max_tokens = Column(Integer, nullable=False)
+    success_count = Column(Integer, nullable=False)
+    error_count = Column(Integer, nullable=False)
+    rate_limited_count = Column(Integer, nullable=False)
+    wall_time_ms = Column(Float, nullable=False)
+    ttft_p50_ms = Column(Float, nullable=True)
+    ttft_p90_ms = Column(Float, nullable=True)
+    ttft_p99_ms = Column(Float, nullable=True)
+    latency_p50_ms = Column(Float, nullable=True)
+    latency_p90_ms = Column(Float, nullable=True)
+    latency_p99_ms = Column(Float, nullable=True)
+    tokens_per_second = Column(Float, nullable=True)
+    aggregate_tokens_per_second = Column(Float, nullable=True)
+    errors = Column(JSON, nullable=True)  # 错误样本
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_llm_benchmark_model", "model_name", "created_at"),
+    )
+
+
+class StudentDailyActivity(Base):
+    """学生每日学习活动汇总（按 UTC 日期，由后台任务从消息表汇总）"""
+
+    __tablename__ = "student_daily_activity"
+
+    day = Column(Date, primary_key=True)
+    class_id = Column(
+        Integer, ForeignKey("classes.id", ondelete="CASCADE"), primary_key=True
+    )
+    student_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    message_count = Column(Integer, default=0, nullable=False)  # 学生发出的消息
+    conversation_count = Column(Integer, default=0, nullable=False)  # 当天新建的对话
+    token_in = Column(Integer, default=0, nullable=False)
+    token_out = Column(Integer, default=0, nullable=False)
+    error_count = Column(Integer, default=0, nullable=False)
+    latency_ms_total = Column(Float, default=0, nullable=False)
+    latency_samples = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_student_daily_activity_student", "student_id", "day"),
+    )
+
+
+class ClassDailyActivity(Base):
+    """班级每日学习活动汇总"""
+
+    __tablename__ = "class_daily_activity"
+
+    day = Column(Date, primary_key=True)
+    class_id = Column(
+        Integer, ForeignKey("classes.id", ondelete="CASCADE"), primary_key=True
+    )
+    active_students = Column(Integer, default=0, nullable=False)
+    message_count = Column(Integer, default=0, nullable=False)
+    conversation_count = Column(Integer, default=0, nullable=False)
+    token_in = Column(Integer, default=0, nullable=False)
+    token_out = Column(Integer, default=0, nullable=False)
+    error_count = Column(Integer, default=0, nullable=False)
+    latency_ms_total = Column(Float, default=0, nullable=False)
+    latency_samples = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_class_daily_activity_class", "class_id", "day"),
+    )
+
+
 class SystemConfig(Base):
     """系统配置（键值对存储，持久化保存）"""
 
@@ -249,7 +429,7 @@ class SystemConfig(Base):
 
 
 class AuditLog(Base):
-    """审计日志"""
+    """审计日志（PostgreSQL 上按 created_at 月度分区，库中主键为 (id, created_at)）"""
 
     __tablename__ = "audit_logs"
 
@@ -10,8 +10,6 @@ from app.models import (
     PromptScope,
     ScopeType,
     Class,
-    ClassTeacher,
-    AuditLog,
 )
 from app.schemas.prompts import (
     PromptCreate,
@@ -19,7 +17,9 @@ from app.schemas.prompts import (
     PromptListResponse,
     EffectivePrompt,
 )
+from app.audit import record_audit
 from app.auth.deps import get_current_active_user, require_teacher
+from app.auth.membership_cache import get_teacher_class_ids
 
 router = APIRouter(prefix="/prompts", tags=["提示词管理"])
 
@@ -105,13 +105,9 @@ async def create_prompt(
             )
         # 教师权限检查
         if current_user.role == UserRole.TEACHER:
-            teacher_check = await db.execute(
-                select(ClassTeacher).where(
-                    ClassTeacher.class_id == request.class_id,
-                    ClassTeacher.teacher_id == current_user.id,
-                )
-            )
-            if not teacher_check.scalar_one_or_none():
+            if request.class_id not in await get_teacher_class_ids(
+                db, current_user.id
+            ):
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="无权为该班级配置提示词",
@@ -160,8 +156,10 @@ async def create_prompt(
     )
     db.add(prompt)
 
+    await db.commit()
+
     # 审计日志
-    audit_log = AuditLog(
+    record_audit(
         actor_id=current_user.id,
         action="prompt_create",
         target_type="prompt",
@@ -170,11 +168,7 @@ async def create_prompt(
             "class_id": request.class_id,
             "version": new_version,
         },
-        created_at=datetime.utcnow(),
     )
-    db.add(audit_log)
-
-    await db.commit()
     await db.refresh(prompt)
 
     return _prompt_to_info(prompt)
@@ -201,13 +195,7 @@ async def activate_prompt(
             status_code=status.HTTP_403_FORBIDDEN, detail="只有超管可以激活全局提示词"
         )
     if prompt.scope_type == ScopeType.CLASS and current_user.role == UserRole.TEACHER:
-        teacher_check = await db.execute(
-            select(ClassTeacher).where(
-                ClassTeacher.class_id == prompt.class_id,
-                ClassTeacher.teacher_id == current_user.id,
-            )
-        )
-        if not teacher_check.scalar_one_or_none():
+        if prompt.class_id not in await get_teacher_class_ids(db, current_user.id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN, detail="无权操作该班级的提示词"
             )
@@ -228,18 +216,16 @@ async def activate_prompt(
     # 激活当前版本
     prompt.is_active = True
 
+    await db.commit()
+
     # 审计日志
-    audit_log = AuditLog(
+    record_audit(
         actor_id=current_user.id,
         action="prompt_activate",
         target_type="prompt",
         target_id=prompt_id,
         meta={"version": prompt.version},
-        created_at=datetime.utcnow(),
     )
-    db.add(audit_log)
-
-    await db.commit()
 
     return {"message": "提示词已激活", "version": prompt.version}
 
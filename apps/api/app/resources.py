@@ -0,0 +1,129 @@
+"""进程级共享资源：数据库引擎、Redis 连接池、上游（LLM）HTTP 连接池。
+
+由 app.main 的 lifespan 统一管理：启动时创建并预热，关闭时释放。
+- 数据库引擎与 Redis 客户端仍是 app.db.base / app.db.redis 中的进程单例，这里只负责预热与释放
+- 上游 HTTP 连接池在启动时创建，所有 LLM Provider 共用；不在 API 进程中（RQ 任务、脚本）时为 None，
+  Provider 自建连接池
+- 每个流式回复在整段回复期间独占一个上游连接，连接数默认不设上限（与各请求自建连接时一致），
+  只限制保留的空闲连接数；设置上限后超出的请求排队等待空闲连接
+- 就绪检查结果缓存 readiness_cache_seconds 秒，并发的探测共用同一次检查
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import AsyncExitStack
+from typing import Optional
+
+import httpx
+from sqlalchemy import select
+
+from app.config import get_settings
+from app.db.base import async_session_maker, engine
+from app.db.redis import close_redis, get_redis
+from app.db.replica import dispose_replica_engine
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def create_upstream_http_client() -> httpx.AsyncClient:
+    """上游 HTTP 连接池；upstream_http_max_connections 为 0 时不限制并发连接数"""
+    return httpx.AsyncClient(
+        timeout=settings.upstream_http_timeout_seconds,
+        limits=httpx.Limits(
+            max_connections=settings.upstream_http_max_connections or None,
+            max_keepalive_connections=settings.upstream_http_max_keepalive_connections,
+        ),
+    )
+
+
+class Resources:
+    def __init__(self) -> None:
+        self.http_client: Optional[httpx.AsyncClient] = None
+        self._readiness: Optional[dict] = None
+        self._readiness_at = 0.0
+        self._readiness_lock = asyncio.Lock()
+
+    async def startup(self) -> None:
+        self.http_client = create_upstream_http_client()
+        await self.warm_up()
+
+    async def warm_up(self) -> None:
+        """预先建立数据库与 Redis 连接，失败不影响启动（由 /readyz 反映）"""
+        try:
+            async with asyncio.timeout(settings.startup_db_timeout_seconds):
+                async with AsyncExitStack() as stack:
+                    # 同时持有多个连接，连接池中才会留下多个可复用的连接
+                    for _ in range(settings.warmup_db_connections):
+                        conn = await stack.enter_async_context(engine.connect())
+                        await conn.execute(select(1))
+        except Exception:
+            logger.warning("database warm-up failed", exc_info=True)
+
+        if settings.readiness_check_redis:
+            try:
+                async with asyncio.timeout(settings.startup_db_timeout_seconds):
+                    await get_redis().ping()
+            except Exception:
+                logger.warning("redis warm-up failed", exc_info=True)
+
+    async def shutdown(self) -> None:
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+        await close_redis()
+        await dispose_replica_engine()
+        await engine.dispose()
+
+    async def _check(self) -> dict:
+        checks = {
+            "database": False,
+            "redis": not settings.readiness_check_redis,
+        }
+
+        try:
+            async with asyncio.timeout(settings.startup_db_timeout_seconds):
+                async with async_session_maker() as session:
+                    await session.execute(select(1))
+                    checks["database"] = True
+        except Exception:
+            checks["database"] = False
+
+        if settings.readiness_check_redis:
+            try:
+                async with asyncio.timeout(settings.startup_db_timeout_seconds):
+                    checks["redis"] = bool(await get_redis().ping())
+            except Exception:
+                checks["redis"] = False
+
+        return {
+            "ok": all(checks.values()),
+            "checks": checks,
+        }
+
+    def _cached_readiness(self) -> Optional[dict]:
+        if self._readiness is None:
+            return None
+        if time.monotonic() - self._readiness_at >= settings.readiness_cache_seconds:
+            return None
+        return self._readiness
+
+    async def readiness(self) -> dict:
+        """就绪检查（短时缓存，负载均衡频繁探测时不会每次都访问依赖）"""
+        cached = self._cached_readiness()
+        if cached is not None:
+            return cached
+        async with self._readiness_lock:
+            cached = self._cached_readiness()
+            if cached is not None:
+                return cached
+            self._readiness = await self._check()
+            self._readiness_at = time.monotonic()
+            return self._readiness
+
+    def clear_readiness(self) -> None:
+        self._readiness = None
+
+
+resources = Resources()
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import Optional, List
+
+
+class DailyActivity(BaseModel):
+    """某一天的学习活动汇总"""
+    day: str
+    active_students: Optional[int] = None  # 仅班级报表
+    message_count: int
+    conversation_count: int
+    token_in: int
+    token_out: int
+    error_count: int
+    avg_latency_ms: Optional[float]
+
+
+class ActivityReport(BaseModel):
+    class_id: int
+    student_id: Optional[int] = None
+    start: str
+    end: str
+    days: List[DailyActivity]
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List
-from app.models import UserRole, UserStatus
+from app.models import DeletionStatus, DeletionTarget, ImportStatus, UserRole, UserStatus
 
 
 class TeacherClassesUpdateRequest(BaseModel):
@@ -37,6 +37,29 @@ class BulkImportResponse(BaseModel):
     errors: List[str] = []
 
 
+class CredentialSheetRequest(BaseModel):
+    """根据导入结果生成密码单"""
+    users: List[UserCreatedInfo] = Field(..., min_length=1)
+
+
+class ImportJobInfo(BaseModel):
+    """用户名单导入任务"""
+    id: int
+    requested_by: int
+    filename: str
+    dry_run: bool
+    status: ImportStatus
+    total_rows: Optional[int]
+    processed_rows: int
+    created_count: int
+    error_count: int
+    errors: List[str] = Field(default_factory=list)
+    has_credentials: bool = False
+    error_message: Optional[str]
+    created_at: str
+    finished_at: Optional[str]
+
+
 class UserListItem(BaseModel):
     id: int
     username: str
@@ -47,6 +70,7 @@ class UserListItem(BaseModel):
     created_at: str
     last_login_at: Optional[str]
     class_names: List[str] = Field(default_factory=list)
+    pending_deletion: bool = False  # 已提交删除，后台任务尚未完成
 
     class Config:
         from_attributes = True
@@ -76,6 +100,30 @@ class DeleteUserResponse(BaseModel):
     id: int
     username: str
     message: str
+    job_id: Optional[int] = None  # 后台删除任务
+
+
+class DeletionJobCreate(BaseModel):
+    """创建后台删除任务：user/class 需要 target_id，cohort 需要 grade"""
+    target_type: DeletionTarget
+    target_id: Optional[int] = None
+    grade: Optional[str] = Field(None, max_length=50)
+
+
+class DeletionJobInfo(BaseModel):
+    id: int
+    requested_by: int
+    target_type: DeletionTarget
+    target_id: Optional[int]
+    target_label: Optional[str]
+    status: DeletionStatus
+    total_users: int
+    deleted_users: int
+    deleted_conversations: int
+    deleted_messages: int
+    error_message: Optional[str]
+    created_at: str
+    finished_at: Optional[str]
 
 
 class StudentClassUpdateRequest(BaseModel):
@@ -96,6 +144,7 @@ class LLMConfigResponse(BaseModel):
     api_key_masked: str = Field(default="", description="遮蔽后的 API Key")
     model_name: str = Field(default="", description="模型名称")
     has_api_key: bool = Field(default=False, description="是否已配置 API Key")
+    version: int = Field(default=0, description="配置版本号")
 
 
 class LLMConfigUpdateRequest(BaseModel):
@@ -127,3 +176,95 @@ class LLMTestResponse(BaseModel):
     message: str
     latency_ms: Optional[int] = None
     model: Optional[str] = None
+
+
+class LLMBenchmarkRequest(LLMTestRequest):
+    """LLM 压测请求（未指定的连接参数使用当前配置）"""
+    concurrency: int = Field(10, ge=1, description="并发请求数")
+    total_requests: int = Field(20, ge=1, description="请求总数")
+    max_tokens: int = Field(256, ge=1, le=4096, description="每个请求的最大输出 token")
+    class_id: Optional[int] = Field(None, description="使用该班级的有效提示词（不填则为全局提示词）")
+    questions: Optional[List[str]] = Field(None, description="学生提问样本（不填使用内置样本）")
+
+
+class LLMBenchmarkResult(BaseModel):
+    """LLM 压测结果"""
+    id: int
+    provider_name: Optional[str]
+    base_url: Optional[str]
+    model_name: str
+    class_id: Optional[int]
+    prompt_version: Optional[int]
+    concurrency: int
+    total_requests: int
+    max_tokens: int
+    success_count: int
+    error_count: int
+    rate_limited_count: int
+    error_rate: float
+    rate_limited_rate: float
+    wall_time_ms: float
+    ttft_p50_ms: Optional[float]
+    ttft_p90_ms: Optional[float]
+    ttft_p99_ms: Optional[float]
+    latency_p50_ms: Optional[float]
+    latency_p90_ms: Optional[float]
+    latency_p99_ms: Optional[float]
+    tokens_per_second: Optional[float]
+    aggregate_tokens_per_second: Optional[float]
+    errors: List[str] = Field(default_factory=list)
+    created_at: str
+
+
+class LLMBenchmarkListResponse(BaseModel):
+    total: int
+    items: List[LLMBenchmarkResult]
+
+
+# Runtime Metrics Schemas
+class PasswordHasherMetrics(BaseModel):
+    """密码哈希工作池指标"""
+    max_workers: int
+    queued: int
+    in_flight: int
+    completed: int
+    total_wait_ms: float
+    max_wait_ms: float
+    total_run_ms: float
+
+
+class AuditWriterMetrics(BaseModel):
+    """审计日志写入队列指标（背压）"""
+    running: bool
+    queued: int
+    max_queue_size: int
+    enqueued: int
+    written: int
+    batches: int
+    failed_batches: int
+    spilled: int
+    dropped: int
+    last_flush_ms: Optional[float] = None
+
+
+class LLMWorkerInfo(BaseModel):
+    """单个 worker 正在使用的 LLM 配置"""
+    worker_id: str
+    version: int
+    provider: Optional[str] = None
+    model_name: Optional[str] = None
+    reported_at: str
+    in_sync: bool
+    stale: bool = False
+
+
+class LLMWorkersResponse(BaseModel):
+    current_version: int
+    broadcast_available: bool = Field(description="Redis 是否可用；不可用时只返回当前 worker")
+    workers: List[LLMWorkerInfo]
+
+
+class RuntimeMetricsResponse(BaseModel):
+    """当前 API 进程的运行时指标"""
+    password_hasher: PasswordHasherMetrics
+    audit_writer: AuditWriterMetrics
@@ -47,6 +47,11 @@ class ClassDetail(BaseModel):
     id: int
     name: str
     grade: Optional[str]
+    student_count: int = 0
+    teacher_count: int = 0
+    student_total: int = 0  # 符合筛选条件的学生数，用于分页
+    page: int = 1
+    page_size: int = 0
     students: List[StudentInClass]
     teachers: List[TeacherInClass]
     created_at: str
@@ -58,3 +63,36 @@ class AddStudentsRequest(BaseModel):
 
 class AddTeachersRequest(BaseModel):
     teacher_ids: List[int] = Field(..., min_items=1)
+
+
+class MembershipResult(BaseModel):
+    """单个用户的加入结果"""
+    user_id: int
+    status: str  # added / already_member / not_found / wrong_role / in_other_class
+    message: Optional[str] = None
+
+
+class MembershipChangeResponse(BaseModel):
+    added: int
+    errors: List[str]
+    results: List[MembershipResult]
+
+
+class ClassRolloverMove(BaseModel):
+    from_class_id: int
+    to_class_id: int
+
+
+class ClassRolloverRequest(BaseModel):
+    moves: List[ClassRolloverMove] = Field(..., min_items=1)
+
+
+class ClassRolloverResult(BaseModel):
+    from_class_id: int
+    to_class_id: int
+    moved: int
+
+
+class ClassRolloverResponse(BaseModel):
+    moved: int
+    classes: List[ClassRolloverResult]
@@ -8,6 +8,9 @@ class ExportCreate(BaseModel):
     student_id: Optional[int] = None
     start_date: Optional[str] = None  # ISO format: 2026-01-01
     end_date: Optional[str] = None
+    format: str = Field("csv", pattern="^(csv|xlsx|ndjson)$")
+    # 指定消费方时为增量导出：只导出该消费方上次水位之后的消息（gzip NDJSON 分段）
+    consumer: Optional[str] = Field(None, pattern=r"^[A-Za-z0-9_.-]{1,64}$")
 
 
 class ExportJobInfo(BaseModel):
@@ -24,6 +27,18 @@ class ExportJobInfo(BaseModel):
         from_attributes = True
 
 
+class ExportWatermark(BaseModel):
+    consumer: str
+    job_id: Optional[int]
+    message_id: int
+    created_at: Optional[str]
+
+
+class ExportLink(BaseModel):
+    url: str
+    expires_at: str
+
+
 class ExportListResponse(BaseModel):
     total: int
     items: List[ExportJobInfo]
@@ -1,7 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import or_, select, func
+from app.config import get_settings
+from app.db.partitions import conversation_messages
 from app.db.base import get_db
+from app.db.replica import get_read_db
 from app.models import (
     User,
     UserRole,
@@ -10,8 +16,10 @@ from app.models import (
     MessageRole,
     Class,
     ClassStudent,
-    ClassTeacher,
+    ClassDailyActivity,
+    StudentDailyActivity,
 )
+from app.schemas.activity import ActivityReport, DailyActivity
 from app.schemas.chat import (
     ConversationInfo,
     ConversationListResponse,
@@ -20,6 +28,9 @@ from app.schemas.chat import (
 )
 from app.schemas.classes import StudentInClass
 from app.auth.deps import get_current_active_user, require_teacher
+from app.auth.membership_cache import get_student_class_ids, get_teacher_class_ids
+
+settings = get_settings()
 
 router = APIRouter(prefix="/teacher", tags=["教师审计"])
 
@@ -30,64 +41,233 @@ async def check_teacher_class_permission(
     class_id: int,
     teacher_role: UserRole,
 ) -> bool:
-    """检查教师是否有权限访问该班级"""
+    """检查教师是否有权限访问该班级
+
+    db 须为主库会话：成员关系会写入缓存，从可能滞后的副本加载会使刚做的变更失效。
+    """
     if teacher_role == UserRole.ADMIN:
         return True
 
-    result = await db.execute(
-        select(ClassTeacher).where(
-            ClassTeacher.class_id == class_id,
-            ClassTeacher.teacher_id == teacher_id,
-        )
-    )
-    return result.scalar_one_or_none() is not None
+    return class_id in await get_teacher_class_ids(db, teacher_id)
+
+
+# 学生列表可用的排序字段
+STUDENT_SORT_PATTERN = "^(username|last_active|conversations|messages|tokens)$"
 
 
 @router.get("/classes/{class_id}/students")
 async def get_class_students(
     class_id: int,
-    db: AsyncSession = Depends(get_db),
+    sort: str = Query("username", pattern=STUDENT_SORT_PATTERN),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    inactive_days: Optional[int] = Query(None, ge=0),
+    db: AsyncSession = Depends(get_read_db),
+    auth_db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_teacher),
 ):
-    """获取班级学生列表（教师专用）"""
+    """获取班级学生列表及学习统计（教师专用）
+
+    - 对话数、提问数（学生发出的消息）、token 用量、最后活跃时间由分组子查询一次算出
+    - sort/order 在数据库中排序；没有活跃记录的学生总排在最后
+    - inactive_days：只返回最近 N 天没有对话的学生（含从未使用过的）
+    """
     if not await check_teacher_class_permission(
-        db, current_user.id, class_id, current_user.role
+        auth_db, current_user.id, class_id, current_user.role
     ):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="无权访问该班级"
         )
 
-    result = await db.execute(
-        select(User)
+    conversation_stats = (
+        select(
+            Conversation.student_id,
+            func.count(Conversation.id).label("conversation_count"),
+            func.max(Conversation.last_message_at).label("last_active_at"),
+        )
+        .where(Conversation.class_id == class_id)
+        .group_by(Conversation.student_id)
+        .subquery()
+    )
+    message_stats = (
+        select(
+            Conversation.student_id,
+            func.count(Message.id)
+            .filter(Message.role == MessageRole.USER)
+            .label("message_count"),
+            func.sum(
+                func.coalesce(Message.token_in, 0) + func.coalesce(Message.token_out, 0)
+            ).label("tokens_used"),
+        )
+        .join(Message, conversation_messages(Conversation.id, Conversation.created_at))
+        .where(Conversation.class_id == class_id)
+        .group_by(Conversation.student_id)
+        .subquery()
+    )
+
+    conversation_count = func.coalesce(conversation_stats.c.conversation_count, 0)
+    message_count = func.coalesce(message_stats.c.message_count, 0)
+    tokens_used = func.coalesce(message_stats.c.tokens_used, 0)
+    last_active_at = conversation_stats.c.last_active_at
+
+    query = (
+        select(
+            User.id,
+            User.username,
+            User.display_name,
+            User.last_login_at,
+            conversation_count.label("conversation_count"),
+            message_count.label("message_count"),
+            tokens_used.label("tokens_used"),
+            last_active_at.label("last_active_at"),
+        )
         .join(ClassStudent, User.id == ClassStudent.student_id)
+        .outerjoin(conversation_stats, conversation_stats.c.student_id == User.id)
+        .outerjoin(message_stats, message_stats.c.student_id == User.id)
         .where(ClassStudent.class_id == class_id)
     )
-    students = result.scalars().all()
+    if inactive_days is not None:
+        cutoff = datetime.utcnow() - timedelta(days=inactive_days)
+        query = query.where(or_(last_active_at.is_(None), last_active_at < cutoff))
 
-    items = []
-    for s in students:
-        # 获取学生的对话数和最后活跃时间
-        conv_result = await db.execute(
-            select(
-                func.count(Conversation.id), func.max(Conversation.last_message_at)
-            ).where(Conversation.student_id == s.id, Conversation.class_id == class_id)
+    sort_column = {
+        "username": User.username,
+        "last_active": last_active_at,
+        "conversations": conversation_count,
+        "messages": message_count,
+        "tokens": tokens_used,
+    }[sort]
+    sort_column = sort_column.desc() if order == "desc" else sort_column.asc()
+    result = await db.execute(query.order_by(sort_column.nulls_last(), User.id))
+
+    items = [
+        {
+            "id": row.id,
+            "username": row.username,
+            "display_name": row.display_name,
+            "last_login_at": row.last_login_at.isoformat()
+            if row.last_login_at
+            else None,
+            "conversation_count": row.conversation_count,
+            "message_count": row.message_count,
+            "tokens_used": row.tokens_used,
+            "last_active_at": row.last_active_at.isoformat()
+            if row.last_active_at
+            else None,
+        }
+        for row in result.all()
+    ]
+
+    return {"students": items}
+
+
+def _activity_range(start: Optional[date], end: Optional[date]) -> tuple[date, date]:
+    """默认最近 30 天；超出上限返回 400"""
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="开始日期不能晚于结束日期"
+        )
+    if (end - start).days + 1 > settings.activity_report_max_days:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"查询范围不能超过 {settings.activity_report_max_days} 天",
         )
-        conv_count, last_active = conv_result.one()
+    return start, end
 
-        items.append(
-            {
-                "id": s.id,
-                "username": s.username,
-                "display_name": s.display_name,
-                "last_login_at": s.last_login_at.isoformat()
-                if s.last_login_at
-                else None,
-                "conversation_count": conv_count or 0,
-                "last_active_at": last_active.isoformat() if last_active else None,
-            }
+
+def _daily_activity(row, active_students: Optional[int] = None) -> DailyActivity:
+    return DailyActivity(
+        day=row.day.isoformat(),
+        active_students=active_students,
+        message_count=row.message_count,
+        conversation_count=row.conversation_count,
+        token_in=row.token_in,
+        token_out=row.token_out,
+        error_count=row.error_count,
+        avg_latency_ms=round(row.latency_ms_total / row.latency_samples, 1)
+        if row.latency_samples
+        else None,
+    )
+
+
+@router.get("/classes/{class_id}/activity", response_model=ActivityReport)
+async def get_class_activity(
+    class_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_read_db),
+    auth_db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_teacher),
+):
+    """班级每日学习活动趋势（教师专用）
+
+    只读取日汇总表（由 app.jobs.activity_rollup 定时更新），不扫描消息表。
+    """
+    if not await check_teacher_class_permission(
+        auth_db, current_user.id, class_id, current_user.role
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="无权访问该班级"
         )
+    start, end = _activity_range(start, end)
 
-    return {"students": items}
+    result = await db.execute(
+        select(ClassDailyActivity)
+        .where(
+            ClassDailyActivity.class_id == class_id,
+            ClassDailyActivity.day >= start,
+            ClassDailyActivity.day <= end,
+        )
+        .order_by(ClassDailyActivity.day)
+    )
+    days = [_daily_activity(row, row.active_students) for row in result.scalars().all()]
+
+    return ActivityReport(
+        class_id=class_id, start=start.isoformat(), end=end.isoformat(), days=days
+    )
+
+
+@router.get(
+    "/classes/{class_id}/students/{student_id}/activity", response_model=ActivityReport
+)
+async def get_student_activity(
+    class_id: int,
+    student_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_read_db),
+    auth_db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_teacher),
+):
+    """学生在该班级的每日学习活动趋势（教师专用）"""
+    if not await check_teacher_class_permission(
+        auth_db, current_user.id, class_id, current_user.role
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="无权访问该班级"
+        )
+    start, end = _activity_range(start, end)
+
+    result = await db.execute(
+        select(StudentDailyActivity)
+        .where(
+            StudentDailyActivity.class_id == class_id,
+            StudentDailyActivity.student_id == student_id,
+            StudentDailyActivity.day >= start,
+            StudentDailyActivity.day <= end,
+        )
+        .order_by(StudentDailyActivity.day)
+    )
+    days = [_daily_activity(row) for row in result.scalars().all()]
+
+    return ActivityReport(
+        class_id=class_id,
+        student_id=student_id,
+        start=start.isoformat(),
+        end=end.isoformat(),
+        days=days,
+    )
 
 
 @router.get(
@@ -99,25 +279,20 @@ async def get_student_conversations(
     student_id: int,
     page: int = 1,
     page_size: int = 20,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
+    auth_db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_teacher),
 ):
     """获取指定学生的对话列表（教师专用）"""
     if not await check_teacher_class_permission(
-        db, current_user.id, class_id, current_user.role
+        auth_db, current_user.id, class_id, current_user.role
     ):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="无权访问该班级"
         )
 
     # 验证学生属于该班级
-    student_check = await db.execute(
-        select(ClassStudent).where(
-            ClassStudent.class_id == class_id,
-            ClassStudent.student_id == student_id,
-        )
-    )
-    if not student_check.scalar_one_or_none():
+    if class_id not in await get_student_class_ids(auth_db, student_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="学生不属于该班级"
         )
@@ -133,7 +308,7 @@ async def get_student_conversations(
     assistant_exists = (
         select(Message.id)
         .where(
-            Message.conversation_id == Conversation.id,
+            conversation_messages(Conversation.id, Conversation.created_at),
             Message.role == MessageRole.ASSISTANT,
         )
         .exists()
@@ -164,14 +339,16 @@ async def get_student_conversations(
     items = []
     for conv in conversations:
         msg_count_result = await db.execute(
-            select(func.count(Message.id)).where(Message.conversation_id == conv.id)
+            select(func.count(Message.id)).where(
+                conversation_messages(conv.id, conv.created_at)
+            )
         )
         msg_count = msg_count_result.scalar() or 0
 
         first_user_msg_result = await db.execute(
             select(Message.content)
             .where(
-                Message.conversation_id == conv.id,
+                conversation_messages(conv.id, conv.created_at),
                 Message.role == MessageRole.USER,
             )
             .order_by(Message.created_at.asc())
@@ -209,7 +386,8 @@ async def get_student_conversations(
 )
 async def get_conversation_messages(
     conversation_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
+    auth_db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_teacher),
 ):
     """获取对话消息详情（教师专用）"""
@@ -223,7 +401,7 @@ async def get_conversation_messages(
 
     # 检查教师权限
     if not await check_teacher_class_permission(
-        db, current_user.id, conversation.class_id, current_user.role
+        auth_db, current_user.id, conversation.class_id, current_user.role
     ):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="无权查看该对话"
@@ -232,7 +410,7 @@ async def get_conversation_messages(
     # 获取消息
     msg_result = await db.execute(
         select(Message)
-        .where(Message.conversation_id == conversation_id)
+        .where(conversation_messages(conversation.id, conversation.created_at))
         .order_by(Message.created_at.asc())
     )
     messages = msg_result.scalars().all()
@@ -0,0 +1,157 @@
+"""Benchmark: admin class listing with member counts.
+
+Seeds --classes classes with --students students and one teacher each, then
+pages through GET /classes as an admin. Reports latency per page and the
+number of SQL statements each request issues.
+
+Usage:
+    python -m benchmarks.class_listing --classes 1000 --students 50
+    python -m benchmarks.class_listing --page-size 100
+
+Requires the dev extras (aiosqlite); runs against an in-memory SQLite database.
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.auth.security import create_access_token
+from app.classes import classes_router
+from app.db.base import Base, get_db
+from app.models import Class, ClassStudent, ClassTeacher, User, UserRole, UserStatus
+
+from benchmarks.login_burst import percentile
+
+
+async def seed(session_maker, classes: int, students: int) -> int:
+    async with session_maker() as session:
+        admin_id = (
+            await session.execute(
+                insert(User).returning(User.id),
+                [
+                    {
+                        "username": "bench_admin",
+                        "role": UserRole.ADMIN,
+                        "password_hash": "x",
+                        "must_change_password": False,
+                        "status": UserStatus.ACTIVE,
+                    }
+                ],
+            )
+        ).scalar_one()
+
+        class_ids = (
+            await session.execute(
+                insert(Class).returning(Class.id),
+                [{"name": f"班级{i:04d}", "grade": "七年级"} for i in range(classes)],
+            )
+        ).scalars().all()
+
+        users = [
+            {
+                "username": f"bench_{role.value}_{c:04d}_{i:03d}",
+                "role": role,
+                "password_hash": "x",
+                "must_change_password": False,
+                "status": UserStatus.ACTIVE,
+            }
+            for c in range(classes)
+            for role, count in ((UserRole.STUDENT, students), (UserRole.TEACHER, 1))
+            for i in range(count)
+        ]
+        user_ids = (
+            await session.execute(insert(User).returning(User.id), users)
+        ).scalars().all()
+
+        student_links, teacher_links = [], []
+        per_class = students + 1
+        for c, class_id in enumerate(class_ids):
+            ids = user_ids[c * per_class : (c + 1) * per_class]
+            student_links.extend({"class_id": class_id, "student_id": i} for i in ids[:-1])
+            teacher_links.append({"class_id": class_id, "teacher_id": ids[-1]})
+        await session.execute(insert(ClassStudent), student_links)
+        await session.execute(insert(ClassTeacher), teacher_links)
+        await session.commit()
+    return admin_id
+
+
+async def run(classes: int, students: int, page_size: int, rounds: int) -> None:
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    statements = 0
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(*args):
+        nonlocal statements
+        statements += 1
+
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    seed_started = time.perf_counter()
+    admin_id = await seed(session_maker, classes, students)
+    seed_elapsed = time.perf_counter() - seed_started
+
+    async def override_get_db():
+        async with session_maker() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(classes_router)
+    app.dependency_overrides[get_db] = override_get_db
+    token = create_access_token(admin_id, UserRole.ADMIN.value)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    pages = (classes + page_size - 1) // page_size
+    latencies_ms: list[float] = []
+    statements_per_request: list[int] = []
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(rounds):
+            for page in range(1, pages + 1):
+                statements = 0
+                started = time.perf_counter()
+                response = await client.get(
+                    f"/classes?page={page}&page_size={page_size}", headers=headers
+                )
+                latencies_ms.append((time.perf_counter() - started) * 1000)
+                statements_per_request.append(statements)
+                response.raise_for_status()
+
+    await engine.dispose()
+
+    print(f"classes:            {classes} x {students} students")
+    print(f"seed:               {seed_elapsed:.1f}s")
+    print(f"page size:          {page_size} ({pages} pages x {rounds} rounds)")
+    print(
+        "latency ms:         "
+        f"p50={percentile(latencies_ms, 50):.1f} "
+        f"p95={percentile(latencies_ms, 95):.1f} "
+        f"max={max(latencies_ms):.1f}"
+    )
+    print(
+        "SQL per request:    "
+        f"min={min(statements_per_request)} max={max(statements_per_request)} "
+        "(includes the principal lookup on cache miss)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--classes", type=int, default=1000)
+    parser.add_argument("--students", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args.classes, args.students, args.page_size, args.rounds))
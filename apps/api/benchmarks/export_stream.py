@@ -0,0 +1,215 @@
+"""Benchmark: on-the-fly gzip export (POST /exports/stream).
+
+Seeds --messages messages into a temporary SQLite file, then drives the
+endpoint through the raw ASGI interface with a `send` that discards the body
+(so the client side holds nothing). Reports rows/s, compressed throughput and
+the peak RSS growth observed while streaming.
+
+Usage:
+    python -m benchmarks.export_stream --messages 1000000
+    python -m benchmarks.export_stream --messages 200000 --format ndjson
+
+Requires the dev extras (aiosqlite). Peak RSS is read from /proc (Linux).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.auth.security import create_access_token
+from app.db.base import Base, get_db
+from app.db.replica import get_read_db
+from app.exports import exports_router
+from app.exports import routes as export_routes
+from app.models import (
+    Class,
+    Conversation,
+    Message,
+    MessageRole,
+    User,
+    UserRole,
+    UserStatus,
+)
+
+SEED_CHUNK = 20_000
+MESSAGES_PER_CONVERSATION = 50
+STUDENTS = 1000
+CLASSES = 20
+
+CONTENT = "为什么我的 for 循环只执行了一次？我把 range(10) 写在了 print 后面。" * 2
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def seed(url: str, messages: int) -> int:
+    """同步批量写入，返回管理员 id"""
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    started = datetime.utcnow() - timedelta(days=30)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            [
+                {
+                    "id": 1,
+                    "username": "bench_admin",
+                    "role": UserRole.ADMIN,
+                    "password_hash": "x",
+                    "must_change_password": False,
+                    "status": UserStatus.ACTIVE,
+                }
+            ]
+            + [
+                {
+                    "id": 2 + i,
+                    "username": f"bench_student_{i:05d}",
+                    "display_name": f"学生{i}",
+                    "role": UserRole.STUDENT,
+                    "password_hash": "x",
+                    "must_change_password": False,
+                    "status": UserStatus.ACTIVE,
+                }
+                for i in range(STUDENTS)
+            ],
+        )
+        conn.execute(
+            insert(Class),
+            [{"id": 1 + i, "name": f"班级{i:02d}", "grade": "七年级"} for i in range(CLASSES)],
+        )
+        conversations = (messages + MESSAGES_PER_CONVERSATION - 1) // MESSAGES_PER_CONVERSATION
+        conn.execute(
+            insert(Conversation),
+            [
+                {
+                    "id": 1 + c,
+                    "class_id": 1 + c % CLASSES,
+                    "student_id": 2 + c % STUDENTS,
+                    "title": f"会话{c}",
+                    "created_at": started,
+                }
+                for c in range(conversations)
+            ],
+        )
+        for offset in range(0, messages, SEED_CHUNK):
+            conn.execute(
+                insert(Message),
+                [
+                    {
+                        "conversation_id": 1 + i // MESSAGES_PER_CONVERSATION,
+                        "role": MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+                        "content": CONTENT,
+                        "created_at": started + timedelta(seconds=i),
+                        "token_in": None if i % 2 == 0 else 120,
+                        "token_out": None if i % 2 == 0 else 80,
+                    }
+                    for i in range(offset, min(offset + SEED_CHUNK, messages))
+                ],
+            )
+    engine.dispose()
+    return 1
+
+
+async def run(messages: int, fmt: str, batch_size: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed_started = time.perf_counter()
+        admin_id = seed(f"sqlite:///{path}", messages)
+        seed_elapsed = time.perf_counter() - seed_started
+
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        async def override_get_db():
+            async with session_maker() as session:
+                yield session
+
+        app = FastAPI()
+        app.include_router(exports_router)
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_read_db] = override_get_db
+        export_routes.settings.export_batch_size = batch_size
+        token = create_access_token(admin_id, UserRole.ADMIN.value)
+
+        body = json.dumps({"format": fmt}).encode()
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": "/exports/stream",
+            "raw_path": b"/exports/stream",
+            "query_string": b"",
+            "root_path": "",
+            "headers": [
+                (b"host", b"bench"),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"authorization", f"Bearer {token}".encode()),
+            ],
+            "client": ("127.0.0.1", 50000),
+            "server": ("bench", 80),
+        }
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await asyncio.Event().wait()
+
+        status_code = None
+        compressed = 0
+        chunks = 0
+        baseline = rss_bytes()
+        peak = baseline
+
+        async def send(message):
+            nonlocal status_code, compressed, chunks, peak
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                compressed += len(message.get("body", b""))
+                chunks += 1
+                if chunks % 16 == 0:
+                    peak = max(peak, rss_bytes())
+
+        started = time.perf_counter()
+        await app(scope, receive, send)
+        elapsed = time.perf_counter() - started
+        peak = max(peak, rss_bytes())
+        await engine.dispose()
+
+    print(f"messages:           {messages} ({fmt}, batch {batch_size})")
+    print(f"seed:               {seed_elapsed:.1f}s")
+    print(f"status:             {status_code}")
+    print(f"elapsed:            {elapsed:.1f}s")
+    print(f"throughput:         {messages / elapsed:,.0f} rows/s")
+    print(f"compressed:         {compressed / 1024 / 1024:.1f} MiB in {chunks} chunks")
+    print(f"RSS baseline:       {baseline / 1024 / 1024:.1f} MiB")
+    print(f"RSS peak growth:    {(peak - baseline) / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args.messages, args.format, args.batch_size))
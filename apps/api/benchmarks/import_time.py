@@ -0,0 +1,175 @@
+"""Benchmark: cold start of the API process (import app.main + first /healthz).
+
+Each run is a fresh interpreter. It imports app.main, then serves GET /healthz
+through the ASGI interface. Every run is timed twice: with the rarely used
+subsystems loaded on demand (the default), and with --eager, which loads every
+lazy router up front as the app did before. Also prints an `-X importtime`
+breakdown by top-level package and the slowest modules.
+
+The check fails (exit 1) if the median import of app.main exceeds --budget-ms.
+It also fails if a lazily loaded subsystem (exports, admin LLM tools, XLSX
+import / credential sheets, rq, redis, openpyxl, boto3) was imported before the
+first /healthz.
+
+Usage:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --runs 10 --budget-ms 600 --top 25
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+# 冷启动时不应导入的模块（首次请求相应接口时才加载）
+LAZY_MODULES = (
+    "app.exports",
+    "app.admin.credential_routes",
+    "app.admin.import_routes",
+    "app.admin.llm_routes",
+    "app.llm.benchmark",
+    "rq",
+    "redis",
+    "openpyxl",
+    "boto3",
+)
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child(eager: bool) -> None:
+    import asyncio
+
+    started = time.perf_counter()
+    from app.main import app
+
+    if eager:
+        from app.lazy_router import load_lazy_routers
+
+        load_lazy_routers(app)
+    imported = time.perf_counter()
+
+    from httpx import ASGITransport, AsyncClient
+
+    async def healthz() -> int:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://bench") as client:
+            return (await client.get("/healthz")).status_code
+
+    status = asyncio.run(healthz())
+    finished = time.perf_counter()
+    print(
+        json.dumps(
+            {
+                "status": status,
+                "import_ms": (imported - started) * 1000,
+                "first_request_ms": (finished - imported) * 1000,
+                "loaded": [name for name in LAZY_MODULES if name in sys.modules],
+            }
+        )
+    )
+
+
+def run_child(eager: bool) -> dict:
+    command = [sys.executable, "-m", "benchmarks.import_time", "--child"]
+    if eager:
+        command.append("--eager")
+    started = time.perf_counter()
+    output = subprocess.run(
+        command, cwd=API_DIR, check=True, capture_output=True, text=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def importtime_breakdown(top: int) -> None:
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=API_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+
+    packages: dict[str, int] = defaultdict(int)
+    for name, self_us, _ in modules:
+        packages[name.split(".")[0]] += self_us
+    total = sum(packages.values())
+
+    print(f"-X importtime: {len(modules)} modules, {total / 1000:.1f}ms (self time)")
+    print("by top-level package:")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {package:<28} {self_us / 1000:8.1f}ms")
+    print("slowest modules (self):")
+    for name, self_us, cumulative_us in sorted(modules, key=lambda m: -m[1])[:top]:
+        print(f"  {name:<56} {self_us / 1000:8.1f}ms  (cumulative {cumulative_us / 1000:.1f}ms)")
+    print()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=900.0, help="median import of app.main")
+    parser.add_argument("--top", type=int, default=15, help="rows in the importtime breakdown")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--eager", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.eager)
+        return 0
+
+    importtime_breakdown(args.top)
+
+    runs = {
+        label: [run_child(label == "eager") for _ in range(args.runs)]
+        for label in ("lazy", "eager")
+    }
+    medians = {}
+    for label, results in runs.items():
+        medians[label] = {
+            key: statistics.median(result[key] for result in results)
+            for key in ("import_ms", "first_request_ms", "process_ms")
+        }
+        print(
+            f"{label:<6} import app.main {medians[label]['import_ms']:7.1f}ms   "
+            f"first /healthz {medians[label]['first_request_ms']:6.1f}ms   "
+            f"process start to exit {medians[label]['process_ms']:7.1f}ms   "
+            f"(median of {args.runs})"
+        )
+    lazy_runs = runs["lazy"]
+
+    saved = medians["eager"]["import_ms"] - medians["lazy"]["import_ms"]
+    print(f"saved by lazy loading: {saved:.1f}ms")
+    print()
+
+    ok = True
+    loaded = sorted({name for run in lazy_runs for name in run["loaded"]})
+    if loaded:
+        ok = False
+        print(f"[FAIL] imported at cold start: {', '.join(loaded)}")
+    if any(run["status"] != 200 for run in lazy_runs):
+        ok = False
+        print("[FAIL] /healthz did not return 200")
+    within = medians["lazy"]["import_ms"] <= args.budget_ms
+    ok = ok and within
+    print(
+        f"[{'ok' if within else 'FAIL'}] import budget: "
+        f"{medians['lazy']['import_ms']:.1f}ms <= {args.budget_ms:.0f}ms"
+    )
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
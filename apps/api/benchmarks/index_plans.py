@@ -0,0 +1,281 @@
+"""Verify that hot-path queries use the indexes from migration a9d3e6f2c481.
+
+Loads a synthetic school (students, teachers, classes, conversations, messages,
+versioned prompts), runs ANALYZE, then EXPLAINs the app's hot queries and
+asserts each plan uses the expected index. Exits non-zero if any does not.
+
+Usage:
+    python -m benchmarks.index_plans
+    python -m benchmarks.index_plans --students 5000 --messages-per-conversation 30
+    python -m benchmarks.index_plans --database-url postgresql://user:pw@localhost/socratic_db
+
+Without --database-url a temporary SQLite file is used (EXPLAIN QUERY PLAN).
+With a PostgreSQL URL (sync driver) everything happens in a throwaway schema
+inside one transaction that is rolled back, so existing data is not touched.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.engine import Connection
+
+from app.db.base import Base
+from app.models import (
+    Class,
+    ClassStudent,
+    ClassTeacher,
+    Conversation,
+    Message,
+    MessageRole,
+    PromptScope,
+    ScopeType,
+    User,
+    UserRole,
+    UserStatus,
+)
+
+SEED_CHUNK = 20_000
+SCHEMA = "index_plan_check"
+
+
+def chunks(rows: Iterator[dict], size: int = SEED_CHUNK) -> Iterator[list[dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed(conn: Connection, args) -> None:
+    classes = args.classes
+    teachers = classes
+    students = args.students
+    started = datetime.utcnow() - timedelta(days=60)
+
+    def users():
+        yield {"id": 1, "username": "plan_admin", "role": UserRole.ADMIN}
+        for i in range(teachers):
+            yield {"id": 2 + i, "username": f"plan_teacher_{i:05d}", "role": UserRole.TEACHER}
+        for i in range(students):
+            yield {
+                "id": 2 + teachers + i,
+                "username": f"plan_student_{i:06d}",
+                "role": UserRole.STUDENT,
+            }
+
+    for batch in chunks(
+        {**u, "password_hash": "x", "must_change_password": False, "status": UserStatus.ACTIVE}
+        for u in users()
+    ):
+        conn.execute(insert(User), batch)
+
+    conn.execute(
+        insert(Class),
+        [{"id": 1 + c, "name": f"班级{c:04d}", "grade": "七年级"} for c in range(classes)],
+    )
+    conn.execute(
+        insert(ClassTeacher),
+        [{"class_id": 1 + c, "teacher_id": 2 + c} for c in range(classes)],
+    )
+    for batch in chunks(
+        {"class_id": 1 + s % classes, "student_id": 2 + teachers + s} for s in range(students)
+    ):
+        conn.execute(insert(ClassStudent), batch)
+
+    conn.execute(
+        insert(PromptScope),
+        [
+            {
+                "scope_type": ScopeType.CLASS,
+                "class_id": 1 + c,
+                "content": f"班级提示词 v{v}",
+                "version": v,
+                "is_active": v == args.prompt_versions,
+                "created_by": 1,
+            }
+            for c in range(classes)
+            for v in range(1, args.prompt_versions + 1)
+        ],
+    )
+
+    per_student = args.conversations_per_student
+    for batch in chunks(
+        {
+            "id": 1 + c,
+            "class_id": 1 + (c // per_student) % classes,
+            "student_id": 2 + teachers + c // per_student,
+            "title": None,
+            "created_at": started + timedelta(minutes=c),
+        }
+        for c in range(students * per_student)
+    ):
+        conn.execute(insert(Conversation), batch)
+
+    per_conversation = args.messages_per_conversation
+    for batch in chunks(
+        {
+            "conversation_id": 1 + m // per_conversation,
+            "role": MessageRole.USER if m % 2 == 0 else MessageRole.ASSISTANT,
+            "content": "为什么我的 for 循环只执行了一次？",
+            "created_at": started + timedelta(seconds=m),
+        }
+        for m in range(students * per_student * per_conversation)
+    ):
+        conn.execute(insert(Message), batch)
+
+
+def hot_queries(args) -> list[tuple[str, str, object]]:
+    """(名称, 期望使用的索引, 语句)：与接口中的查询保持一致"""
+    conversation_id = args.students * args.conversations_per_student // 2
+    student_id = 2 + args.classes + args.students // 2
+    teacher_id = 2 + args.classes // 2
+    class_id = 1 + args.classes // 2
+
+    assistant_exists = (
+        select(Message.id)
+        .where(
+            Message.conversation_id == Conversation.id,
+            Message.role == MessageRole.ASSISTANT,
+        )
+        .exists()
+    )
+    return [
+        (
+            "first user message preview",
+            "ix_message_conversation_role",
+            select(Message.content)
+            .where(
+                Message.conversation_id == conversation_id,
+                Message.role == MessageRole.USER,
+            )
+            .order_by(Message.created_at.asc())
+            .limit(1),
+        ),
+        (
+            "conversation list assistant_exists",
+            "ix_message_conversation_role",
+            select(func.count(Conversation.id)).where(
+                Conversation.student_id == student_id, assistant_exists
+            ),
+        ),
+        (
+            "student class memberships",
+            "ix_class_student_student",
+            select(ClassStudent.class_id).where(ClassStudent.student_id == student_id),
+        ),
+        (
+            "teacher class memberships",
+            "ix_class_teacher_teacher",
+            select(ClassTeacher.class_id).where(ClassTeacher.teacher_id == teacher_id),
+        ),
+        (
+            "prompt max(version) per scope",
+            "ix_prompt_scope_version",
+            select(func.max(PromptScope.version)).where(
+                PromptScope.scope_type == ScopeType.CLASS,
+                PromptScope.class_id == class_id,
+            ),
+        ),
+    ]
+
+
+def _pg_index_names(node: dict) -> Iterator[str]:
+    if "Index Name" in node:
+        yield node["Index Name"]
+    for child in node.get("Plans", []):
+        yield from _pg_index_names(child)
+
+
+def explain(conn: Connection, statement) -> tuple[set[str], str]:
+    """返回计划中用到的索引名与可读的计划文本"""
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "postgresql":
+        plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        root = plan[0]["Plan"]
+        text_plan = "\n".join(
+            row[0] for row in conn.exec_driver_sql(f"EXPLAIN {sql}").fetchall()
+        )
+        return set(_pg_index_names(root)), text_plan
+
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    details = [row[-1] for row in rows]
+    used = {
+        word
+        for detail in details
+        for word in detail.replace("(", " ").split()
+        if word.startswith(("ix_", "sqlite_autoindex_"))
+    }
+    return used, "\n".join(details)
+
+
+def run(conn: Connection, args) -> bool:
+    seed_started = time.perf_counter()
+    seed(conn, args)
+    conn.exec_driver_sql("ANALYZE")
+    print(f"seed + analyze:     {time.perf_counter() - seed_started:.1f}s")
+    messages = args.students * args.conversations_per_student * args.messages_per_conversation
+    print(f"dataset:            {args.students} students, {messages} messages ({conn.dialect.name})")
+    print()
+
+    ok = True
+    for name, expected, statement in hot_queries(args):
+        used, plan = explain(conn, statement)
+        passed = expected in used
+        ok = ok and passed
+        print(f"[{'ok' if passed else 'FAIL'}] {name}: expects {expected}")
+        if not passed or args.verbose:
+            for line in plan.splitlines():
+                print(f"        {line}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="sync SQLAlchemy URL; default: temp SQLite")
+    parser.add_argument("--classes", type=int, default=50)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--conversations-per-student", type=int, default=5)
+    parser.add_argument("--messages-per-conversation", type=int, default=20)
+    parser.add_argument("--prompt-versions", type=int, default=20)
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    if args.database_url and args.database_url.startswith("postgresql"):
+        engine = create_engine(args.database_url)
+        with engine.connect() as conn:
+            trans = conn.begin()
+            try:
+                # 在临时 schema 中建表与造数，结束时整体回滚
+                conn.exec_driver_sql(f"CREATE SCHEMA {SCHEMA}")
+                conn.exec_driver_sql(f"SET LOCAL search_path TO {SCHEMA}")
+                Base.metadata.create_all(conn)
+                ok = run(conn, args)
+            finally:
+                trans.rollback()
+        engine.dispose()
+        return 0 if ok else 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{os.path.join(tmp, 'plans.db')}"
+        engine = create_engine(url)
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            ok = run(conn, args)
+        engine.dispose()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""Benchmark: login throughput and stream jitter during a classroom login burst.
+
+Simulates N students logging in at the same moment while an SSE-style stream
+emits a chunk every --tick-ms on the same event loop. Reports login throughput
+and how late each stream chunk was delivered (event-loop stall).
+
+Usage:
+    python -m benchmarks.login_burst --students 200
+    python -m benchmarks.login_burst --students 200 --blocking   # 对比：同步 bcrypt
+
+Requires the dev extras (aiosqlite); runs against an in-memory SQLite database.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.auth import auth_router
+from app.auth import routes as auth_routes
+from app.auth.security import (
+    get_password_hasher_stats,
+    hash_password,
+    verify_password,
+)
+from app.db.base import Base, get_db
+from app.models import User, UserRole, UserStatus
+
+PASSWORD = "student123"
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def stream_ticker(
+    stop: asyncio.Event, tick_ms: float, lags_ms: list[float]
+) -> None:
+    """模拟 SSE 流：每 tick_ms 发送一个分片，记录实际延迟"""
+    interval = tick_ms / 1000
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags_ms.append(max(0.0, (time.perf_counter() - expected) * 1000))
+
+
+async def run(students: int, tick_ms: float, blocking: bool) -> None:
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    # 所有学生共用一个哈希即可：校验成本与哈希内容无关
+    password_hash = hash_password(PASSWORD)
+    async with session_maker() as session:
+        await session.execute(
+            insert(User),
+            [
+                {
+                    "username": f"bench_student_{i:05d}",
+                    "display_name": f"Student {i}",
+                    "role": UserRole.STUDENT,
+                    "password_hash": password_hash,
+                    "must_change_password": False,
+                    "status": UserStatus.ACTIVE,
+                }
+                for i in range(students)
+            ],
+        )
+        await session.commit()
+
+    async def override_get_db():
+        async with session_maker() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(auth_router)
+    app.dependency_overrides[get_db] = override_get_db
+
+    if blocking:
+
+        async def verify_inline(plain: str, hashed: str) -> bool:
+            return verify_password(plain, hashed)
+
+        auth_routes.verify_password_async = verify_inline
+
+    lags_ms: list[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(stream_ticker(stop, tick_ms, lags_ms))
+    await asyncio.sleep(tick_ms / 1000 * 5)  # 预热，采集基线
+
+    latencies_ms: list[float] = []
+    failures = 0
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def login(i: int) -> None:
+            nonlocal failures
+            started = time.perf_counter()
+            response = await client.post(
+                "/auth/login",
+                json={"username": f"bench_student_{i:05d}", "password": PASSWORD},
+            )
+            latencies_ms.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                failures += 1
+
+        burst_started = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(students)))
+        elapsed = time.perf_counter() - burst_started
+
+    stop.set()
+    await ticker
+    await engine.dispose()
+
+    mode = "blocking (inline bcrypt)" if blocking else "worker pool"
+    print(f"mode:               {mode}")
+    print(f"students:           {students}")
+    print(f"failures:           {failures}")
+    print(f"elapsed:            {elapsed:.2f}s")
+    print(f"throughput:         {students / elapsed:.1f} logins/s")
+    print(
+        "login latency ms:   "
+        f"p50={percentile(latencies_ms, 50):.0f} "
+        f"p95={percentile(latencies_ms, 95):.0f} "
+        f"max={max(latencies_ms):.0f}"
+    )
+    print(
+        f"stream jitter ms:   ticks={len(lags_ms)} "
+        f"mean={statistics.fmean(lags_ms):.1f} "
+        f"p95={percentile(lags_ms, 95):.1f} "
+        f"p99={percentile(lags_ms, 99):.1f} "
+        f"max={max(lags_ms):.1f}"
+    )
+    if not blocking:
+        stats = get_password_hasher_stats()
+        print(
+            f"hasher:             workers={stats.max_workers} "
+            f"completed={stats.completed} max_wait_ms={stats.max_wait_ms:.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--tick-ms", type=float, default=20.0)
+    parser.add_argument("--blocking", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args.students, args.tick_ms, args.blocking))
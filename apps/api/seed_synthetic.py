@@ -0,0 +1,530 @@
+"""生成大规模合成学校数据，用于本地复现生产规模的性能问题。
+
+生成内容：班级、教师、学生、授课与在班关系、班级提示词的多个版本、会话、消息
+（用户消息短、AI 回复长，长度按对数正态分布）、审计日志。
+同一 --seed 与参数生成的数据完全相同（包括 id、时间与密码哈希），基准测试与
+查询计划检查可以在可重复的数据集上运行。
+
+- PostgreSQL：用 COPY（asyncpg copy_records_to_table）分块写入，导入后重置自增序列并 ANALYZE
+- 其他数据库（如 SQLite）：分块 executemany，适合小规模数据
+- 目标库必须为空，或加 --truncate 先清空全部业务表
+
+用法（在 apps/api 目录下，先执行 alembic upgrade head）：
+    python seed_synthetic.py --messages 1000000
+    python seed_synthetic.py --classes 300 --messages 10000000 --truncate
+    python seed_synthetic.py --database-url sqlite+aiosqlite:///./synthetic.db --messages 50000
+
+所有账号密码相同（--password，默认 Passw0rd!），无需首登改密；导入后可运行
+python -m app.jobs.activity_rollup --backfill 生成日报汇总。
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Iterable, Iterator, Optional
+
+import bcrypt
+from sqlalchemy import JSON, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from app.config import get_settings
+from app.db.base import Base
+from app.models import (
+    AuditLog,
+    Class,
+    ClassStudent,
+    ClassTeacher,
+    Conversation,
+    Message,
+    PromptScope,
+    User,
+)
+
+settings = get_settings()
+
+CHUNK_ROWS = 50_000
+
+GRADES = ["七年级", "八年级", "九年级"]
+MODEL_PROVIDER = "openai"
+MODEL_NAME = "gpt-4o-mini"
+
+# 消息正文从这段语料中截取，长度由分布决定
+CORPUS = (
+    "老师，我的 for 循环只执行了一次，是不是 range 写错了？"
+    "你先想一想：range(1, 10) 会产生哪些数？循环体里的 print 缩进在哪一层？"
+    "我把 if 写在循环外面了，所以只判断了最后一个数。"
+    "很好！那如果要统计列表里所有偶数的个数，你会先初始化什么变量？"
+    "def add(a, b):\n    return a + b\nprint(add(3, 5))\n"
+    "为什么会报 IndexError: list index out of range？"
+    "列表的下标从 0 开始，长度为 n 的列表最后一个下标是多少？试着打印 len(nums) 看看。"
+    "while True 一直不停，我应该在哪里 break？"
+    "想想循环应该在什么条件下结束，这个条件在循环里有没有机会变成真？"
+)
+
+# 审计动作及其权重（与各接口记录的 action 一致）
+AUDIT_ACTIONS = [
+    ("login", "user", 70),
+    ("change_password", "user", 5),
+    ("prompt_create", "prompt_scope", 5),
+    ("prompt_activate", "prompt_scope", 3),
+    ("export", "export_job", 4),
+    ("export_stream", "export", 3),
+    ("reset_password", "user", 5),
+    ("update_user", "user", 5),
+]
+
+# 一天中各小时开始会话的相对权重（上课与晚自习时段更多）
+HOUR_WEIGHTS = [0, 0, 0, 0, 0, 0, 1, 2, 6, 9, 9, 7, 3, 4, 9, 10, 8, 6, 5, 7, 8, 6, 3, 1]
+
+
+@dataclass
+class SchoolSpec:
+    seed: int = 42
+    classes: int = 60
+    students_per_class: int = 45
+    teachers: int = 40
+    messages: int = 1_000_000
+    turns_per_conversation: float = 6.0  # 平均问答轮数（每轮一条用户消息 + 一条回复）
+    prompt_versions: int = 5  # 每个班级最多的提示词版本数
+    audit_logs: Optional[int] = None  # 默认为消息数的 1/20
+    start: date = date(2026, 9, 1)
+    days: int = 60
+    password: str = "Passw0rd!"
+
+    @property
+    def students(self) -> int:
+        return self.classes * self.students_per_class
+
+    def rng(self, stream: str) -> random.Random:
+        # 每类数据使用独立的随机流，调整某一类的参数不影响其他类
+        return random.Random(f"{self.seed}:{stream}")
+
+
+@dataclass
+class TableData:
+    table: str
+    columns: tuple[str, ...]
+    rows: Iterable[tuple]
+
+
+def _password_hash(spec: SchoolSpec) -> str:
+    """固定盐的 bcrypt 哈希（cost 10），保证同一 seed 的结果一致"""
+    rng = spec.rng("password")
+    alphabet = "./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+    salt = "".join(rng.choice(alphabet) for _ in range(21)) + rng.choice(".Oeu")
+    return bcrypt.hashpw(spec.password.encode(), f"$2b$10${salt}".encode()).decode()
+
+
+def _text(rng: random.Random, mu: float, sigma: float, low: int, high: int) -> str:
+    length = min(high, max(low, int(rng.lognormvariate(mu, sigma))))
+    offset = rng.randrange(len(CORPUS))
+    repeated = CORPUS * (length // len(CORPUS) + 2)
+    return repeated[offset : offset + length]
+
+
+# ---------------------------------------------------------------------------
+# 生成器：按外键依赖顺序产出各表的行
+# ---------------------------------------------------------------------------
+
+
+def _teacher_id(spec: SchoolSpec, t: int) -> int:
+    return 2 + t
+
+
+def _student_id(spec: SchoolSpec, s: int) -> int:
+    return 2 + spec.teachers + s
+
+
+def users(spec: SchoolSpec) -> TableData:
+    started = datetime.combine(spec.start, datetime.min.time()) - timedelta(days=30)
+    password_hash = _password_hash(spec)
+    rng = spec.rng("users")
+
+    def rows():
+        yield (1, "A00001", "系统管理员", "admin", password_hash, False, "active", started, None)
+        for t in range(spec.teachers):
+            yield (
+                _teacher_id(spec, t), f"T{t + 1:05d}", f"教师{t + 1}", "teacher",
+                password_hash, False, "active", started, None,
+            )
+        for s in range(spec.students):
+            status = "disabled" if rng.random() < 0.01 else "active"
+            yield (
+                _student_id(spec, s), f"S{s + 1:06d}", f"学生{s + 1}", "student",
+                password_hash, False, status, started, None,
+            )
+
+    return TableData(
+        "users",
+        ("id", "username", "display_name", "role", "password_hash",
+         "must_change_password", "status", "created_at", "last_login_at"),
+        rows(),
+    )
+
+
+def classes(spec: SchoolSpec) -> TableData:
+    created_at = datetime.combine(spec.start, datetime.min.time()) - timedelta(days=30)
+    per_grade = math.ceil(spec.classes / len(GRADES))
+    return TableData(
+        "classes",
+        ("id", "name", "grade", "created_at"),
+        (
+            (1 + c, f"{GRADES[c // per_grade]}{c % per_grade + 1}班", GRADES[c // per_grade], created_at)
+            for c in range(spec.classes)
+        ),
+    )
+
+
+def class_teachers(spec: SchoolSpec) -> TableData:
+    """每个班一位主讲教师，约一半的班另有一位协同教师"""
+    rng = spec.rng("class_teachers")
+    created_at = datetime.combine(spec.start, datetime.min.time()) - timedelta(days=30)
+
+    def rows():
+        for c in range(spec.classes):
+            lead = c % spec.teachers
+            yield (1 + c, _teacher_id(spec, lead), created_at)
+            if spec.teachers > 1 and rng.random() < 0.5:
+                other = (lead + rng.randrange(1, spec.teachers)) % spec.teachers
+                yield (1 + c, _teacher_id(spec, other), created_at)
+
+    return TableData("class_teachers", ("class_id", "teacher_id", "created_at"), rows())
+
+
+def class_students(spec: SchoolSpec) -> TableData:
+    created_at = datetime.combine(spec.start, datetime.min.time()) - timedelta(days=30)
+    return TableData(
+        "class_students",
+        ("class_id", "student_id", "created_at"),
+        (
+            (1 + s // spec.students_per_class, _student_id(spec, s), created_at)
+            for s in range(spec.students)
+        ),
+    )
+
+
+def _prompt_version_counts(spec: SchoolSpec) -> list[int]:
+    rng = spec.rng("prompts")
+    return [rng.randint(1, spec.prompt_versions) for _ in range(spec.classes)]
+
+
+def prompt_scopes(spec: SchoolSpec) -> TableData:
+    """每个班级若干个版本，最新版本为激活状态"""
+    created_at = datetime.combine(spec.start, datetime.min.time())
+
+    def rows():
+        prompt_id = 1
+        for c, versions in enumerate(_prompt_version_counts(spec)):
+            for v in range(1, versions + 1):
+                yield (
+                    prompt_id, "class", 1 + c, f"第{v}版：请多用提问引导学生，少给完整代码。",
+                    v, v == versions, _teacher_id(spec, c % spec.teachers),
+                    created_at + timedelta(days=v),
+                )
+                prompt_id += 1
+
+    return TableData(
+        "prompt_scopes",
+        ("id", "scope_type", "class_id", "content", "version", "is_active",
+         "created_by", "created_at"),
+        rows(),
+    )
+
+
+def _conversation_plan(spec: SchoolSpec) -> list[tuple[int, int, int, datetime, int]]:
+    """每个会话的 (id, 班级下标, 学生下标, 开始时间, 轮数)，总消息数恰为 spec.messages
+
+    学生活跃度按对数正态分布，少数学生贡献大量会话。
+    """
+    rng = spec.rng("conversations")
+    weights = [rng.lognormvariate(0, 1) for _ in range(spec.students)]
+    cumulative = []
+    total = 0.0
+    for w in weights:
+        total += w
+        cumulative.append(total)
+
+    plan = []
+    remaining = spec.messages // 2  # 轮数
+    base = datetime.combine(spec.start, datetime.min.time())
+    hours = list(range(24))
+    mean_extra = max(spec.turns_per_conversation - 1, 0.0)
+    while remaining > 0:
+        # 轮数：1 + 几何分布
+        turns = 1
+        if mean_extra > 0:
+            turns += int(rng.expovariate(1 / mean_extra))
+        turns = min(turns, remaining)
+        remaining -= turns
+        s = rng.choices(range(spec.students), cum_weights=cumulative)[0]
+        started_at = base + timedelta(
+            days=rng.randrange(spec.days),
+            hours=rng.choices(hours, weights=HOUR_WEIGHTS)[0],
+            seconds=rng.randrange(3600),
+        )
+        plan.append((len(plan) + 1, s // spec.students_per_class, s, started_at, turns))
+    return plan
+
+
+def _message_times(rng: random.Random, started_at: datetime, turns: int) -> list[datetime]:
+    times = []
+    at = started_at
+    for _ in range(turns):
+        at += timedelta(seconds=rng.randint(5, 240))  # 学生思考、输入
+        times.append(at)
+        at += timedelta(milliseconds=rng.randint(1500, 20000))  # 模型回复
+        times.append(at)
+    return times
+
+
+def conversations(spec: SchoolSpec, plan, versions: list[int]) -> TableData:
+    rng = spec.rng("conversation_titles")
+
+    def rows():
+        times_rng = spec.rng("message_times")
+        for conversation_id, c, s, started_at, turns in plan:
+            times = _message_times(times_rng, started_at, turns)
+            title = _text(rng, 2.3, 0.4, 4, 40) if rng.random() < 0.6 else None
+            yield (
+                conversation_id, 1 + c, _student_id(spec, s), title, versions[c],
+                MODEL_PROVIDER, MODEL_NAME, started_at, times[-1],
+            )
+
+    return TableData(
+        "conversations",
+        ("id", "class_id", "student_id", "title", "prompt_version", "model_provider",
+         "model_name", "created_at", "last_message_at"),
+        rows(),
+    )
+
+
+def messages(spec: SchoolSpec, plan) -> TableData:
+    """用户消息约 60 字、回复约 400 字（对数正态）；约 0.5% 的回复为错误"""
+    rng = spec.rng("messages")
+
+    def rows():
+        times_rng = spec.rng("message_times")
+        message_id = 1
+        for conversation_id, _, _, started_at, turns in plan:
+            times = _message_times(times_rng, started_at, turns)
+            history_tokens = 300  # 系统提示词
+            for turn in range(turns):
+                question = _text(rng, 4.0, 0.7, 2, 2000)
+                yield (
+                    message_id, conversation_id, "user", question,
+                    times[2 * turn], None, None, None,
+                )
+                history_tokens += len(question)
+                if rng.random() < 0.005:
+                    answer = "抱歉，AI 服务暂时不可用，请稍后重试。错误信息：upstream timeout"
+                    flags = {"error": "upstream timeout"}
+                    token_in = token_out = None
+                else:
+                    answer = _text(rng, 6.0, 0.6, 20, 6000)
+                    token_in = history_tokens
+                    token_out = max(1, len(answer) * 2 // 3)
+                    latency_ms = int((times[2 * turn + 1] - times[2 * turn]).total_seconds() * 1000)
+                    flags = {"provider": MODEL_PROVIDER, "model": MODEL_NAME, "latency_ms": latency_ms}
+                history_tokens += len(answer)
+                yield (
+                    message_id + 1, conversation_id, "assistant", answer,
+                    times[2 * turn + 1], token_in, token_out, flags,
+                )
+                message_id += 2
+
+    return TableData(
+        "messages",
+        ("id", "conversation_id", "role", "content", "created_at", "token_in",
+         "token_out", "policy_flags"),
+        rows(),
+    )
+
+
+def audit_logs(spec: SchoolSpec) -> TableData:
+    rng = spec.rng("audit_logs")
+    count = spec.audit_logs if spec.audit_logs is not None else spec.messages // 20
+    base = datetime.combine(spec.start, datetime.min.time())
+    actions = [a for a, _, _ in AUDIT_ACTIONS]
+    weights = [w for _, _, w in AUDIT_ACTIONS]
+    target_types = {a: t for a, t, _ in AUDIT_ACTIONS}
+
+    def rows():
+        for i in range(count):
+            action = rng.choices(actions, weights=weights)[0]
+            if action in ("login", "change_password"):
+                actor = _student_id(spec, rng.randrange(spec.students))
+                target = actor
+            else:
+                actor = _teacher_id(spec, rng.randrange(spec.teachers))
+                target = rng.randrange(1, spec.classes + 1)
+            yield (
+                1 + i, actor, action, target_types[action], target, {"synthetic": True},
+                base + timedelta(seconds=rng.randrange(spec.days * 86400)),
+            )
+
+    return TableData(
+        "audit_logs",
+        ("id", "actor_id", "action", "target_type", "target_id", "meta", "created_at"),
+        rows(),
+    )
+
+
+def generate(spec: SchoolSpec) -> Iterator[TableData]:
+    """按外键依赖顺序产出各表数据（行是惰性生成的）"""
+    versions = _prompt_version_counts(spec)
+    plan = _conversation_plan(spec)
+    yield users(spec)
+    yield classes(spec)
+    yield class_teachers(spec)
+    yield class_students(spec)
+    yield prompt_scopes(spec)
+    yield conversations(spec, plan, versions)
+    yield messages(spec, plan)
+    yield audit_logs(spec)
+
+
+# ---------------------------------------------------------------------------
+# 写入
+# ---------------------------------------------------------------------------
+
+SEEDED_MODELS = [User, Class, ClassTeacher, ClassStudent, PromptScope, Conversation, Message, AuditLog]
+
+
+def _chunks(rows: Iterable[tuple], size: int = CHUNK_ROWS) -> Iterator[list[tuple]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def _copy_postgresql(conn: AsyncConnection, data: TableData) -> int:
+    """COPY FROM STDIN（二进制），JSON 列需先序列化为文本"""
+    table = Base.metadata.tables[data.table]
+    json_columns = [i for i, name in enumerate(data.columns) if isinstance(table.c[name].type, JSON)]
+    raw = (await conn.get_raw_connection()).driver_connection
+    count = 0
+    for chunk in _chunks(data.rows):
+        if json_columns:
+            chunk = [
+                tuple(
+                    json.dumps(value, ensure_ascii=False) if i in json_columns and value is not None else value
+                    for i, value in enumerate(row)
+                )
+                for row in chunk
+            ]
+        await raw.copy_records_to_table(data.table, records=chunk, columns=list(data.columns))
+        count += len(chunk)
+    return count
+
+
+async def _insert_many(conn: AsyncConnection, data: TableData) -> int:
+    table = Base.metadata.tables[data.table]
+    count = 0
+    for chunk in _chunks(data.rows):
+        await conn.execute(insert(table), [dict(zip(data.columns, row)) for row in chunk])
+        count += len(chunk)
+    return count
+
+
+async def _truncate(conn: AsyncConnection) -> None:
+    names = [model.__tablename__ for model in SEEDED_MODELS]
+    if conn.dialect.name == "postgresql":
+        # 级联清空依赖这些表的其他表（导出任务、日报汇总等）
+        await conn.execute(text(f"TRUNCATE {', '.join(names)} RESTART IDENTITY CASCADE"))
+        return
+    for table in reversed(Base.metadata.sorted_tables):
+        await conn.execute(table.delete())
+
+
+async def _reset_sequences(conn: AsyncConnection) -> None:
+    """显式写入了 id，导入后把自增序列移到最大 id 之后"""
+    for model in SEEDED_MODELS:
+        if "id" not in model.__table__.c:
+            continue
+        await conn.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('{model.__tablename__}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {model.__tablename__}), 0) + 1, false)"
+            )
+        )
+
+
+async def seed(database_url: str, spec: SchoolSpec, truncate: bool = False) -> dict[str, int]:
+    """写入合成数据，返回各表行数"""
+    engine = create_async_engine(database_url)
+    counts: dict[str, int] = {}
+    try:
+        async with engine.begin() as conn:
+            if truncate:
+                await _truncate(conn)
+            elif await conn.scalar(select(func.count()).select_from(User)):
+                raise SystemExit("目标数据库非空，请使用 --truncate 清空后再生成")
+
+            postgresql = conn.dialect.name == "postgresql"
+            write = _copy_postgresql if postgresql else _insert_many
+            for data in generate(spec):
+                started = time.perf_counter()
+                counts[data.table] = await write(conn, data)
+                elapsed = time.perf_counter() - started
+                print(f"{data.table:<16} {counts[data.table]:>12,} rows  {elapsed:7.1f}s")
+
+            if postgresql:
+                await _reset_sequences(conn)
+        # ANALYZE 放在事务外，让规划器立即拿到新统计
+        async with engine.connect() as conn:
+            await conn.execute(text("ANALYZE"))
+            await conn.commit()
+    finally:
+        await engine.dispose()
+    return counts
+
+
+def main() -> None:
+    defaults = SchoolSpec()
+    parser = argparse.ArgumentParser(description="生成大规模合成学校数据")
+    parser.add_argument("--database-url", default=settings.database_url)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--classes", type=int, default=defaults.classes)
+    parser.add_argument("--students-per-class", type=int, default=defaults.students_per_class)
+    parser.add_argument("--teachers", type=int, default=defaults.teachers)
+    parser.add_argument("--messages", type=int, default=defaults.messages, help="消息总数")
+    parser.add_argument("--turns", type=float, default=defaults.turns_per_conversation, help="每个会话的平均问答轮数")
+    parser.add_argument("--prompt-versions", type=int, default=defaults.prompt_versions)
+    parser.add_argument("--audit-logs", type=int, help="审计日志条数（默认消息数的 1/20）")
+    parser.add_argument("--start", type=date.fromisoformat, default=defaults.start, help="数据起始日期")
+    parser.add_argument("--days", type=int, default=defaults.days)
+    parser.add_argument("--password", default=defaults.password, help="所有账号的密码")
+    parser.add_argument("--truncate", action="store_true", help="先清空业务表")
+    args = parser.parse_args()
+
+    spec = SchoolSpec(
+        seed=args.seed,
+        classes=args.classes,
+        students_per_class=args.students_per_class,
+        teachers=args.teachers,
+        messages=args.messages,
+        turns_per_conversation=args.turns,
+        prompt_versions=args.prompt_versions,
+        audit_logs=args.audit_logs,
+        start=args.start,
+        days=args.days,
+        password=args.password,
+    )
+    started = time.perf_counter()
+    counts = asyncio.run(seed(args.database_url, spec, truncate=args.truncate))
+    total = sum(counts.values())
+    elapsed = time.perf_counter() - started
+    print(f"done: {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
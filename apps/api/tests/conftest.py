@@ -12,10 +12,13 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sess
 from sqlalchemy.pool import StaticPool
 
 from app.db.base import Base, get_db
+from app.db.replica import get_read_db
 from app.main import app
 from app.config import get_settings
 from app.models import User, UserRole, UserStatus, Class, ClassStudent, ClassTeacher
 from app.auth.security import hash_password, create_access_token
+from app.cache import get_cache
+from app.audit import audit_writer
 
 
 # Test database URL (SQLite in-memory)
@@ -48,6 +51,14 @@ async def test_engine():
     await engine.dispose()
 
 
+@pytest.fixture(autouse=True)
+async def reset_auth_caches():
+    """Drop cached principals between tests (user ids restart per test DB)."""
+    await get_cache().clear()
+    yield
+    await get_cache().clear()
+
+
 @pytest.fixture(scope="function")
 async def test_session(test_engine) -> AsyncGenerator[AsyncSession, None]:
     """Create a test database session."""
@@ -79,11 +90,14 @@ async def client(test_engine) -> AsyncGenerator[AsyncClient, None]:
                 await session.close()
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    await audit_writer.start(async_session_maker)
 
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         yield ac
 
+    await audit_writer.stop()
     app.dependency_overrides.clear()
 
 
@@ -8,12 +8,32 @@ Tests:
 - RBAC for admin endpoints
 """
 
+import asyncio
 import pytest
 from httpx import AsyncClient
+import csv
+import io
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from openpyxl import Workbook, load_workbook
 from sqlalchemy import select
-from app.models import User, UserRole, UserStatus, PromptScope, ScopeType, ExportJob, ExportStatus, AuditLog, SystemConfig
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.admin import deletion_routes, import_routes, llm_routes
+from app.auth.security import create_access_token
+from app.auth.membership_cache import get_teacher_class_ids
+from app.cache import get_cache
+from app.jobs import deletion as deletion_job
+from app.jobs.deletion import process_deletion
+from app.jobs import user_import as user_import_job
+from app.jobs.user_import import process_user_import, purge_import_credentials
+from app.models import User, UserRole, UserStatus, PromptScope, ScopeType, ExportJob, ExportStatus, AuditLog, SystemConfig, ImportJob, ImportStatus, Class, Conversation, Message, MessageRole, DeletionJob, DeletionStatus
+from app.llm import get_llm_provider
+from app.db.base import Base, get_db
+from app.llm.config_sync import LLMConfigSync, load_llm_config_snapshot
 from app.llm.runtime_settings import get_llm_runtime_settings
 
+from app.main import app
 from tests.conftest import auth_header
 
 
@@ -172,6 +192,69 @@ class TestBulkImportUsers:
         assert len(data["errors"]) == 1
         assert "必须选择班级" in data["errors"][0]
 
+    async def test_bulk_import_mixed_batch_reports_errors_per_row(
+        self,
+        client: AsyncClient,
+        admin_user: User,
+        admin_token: str,
+        student_user: User,
+        test_class,
+        test_session,
+    ):
+        """Test a mixed batch keeps per-row errors in submission order."""
+        response = await client.post(
+            "/admin/users/bulk-import",
+            json={
+                "users": [
+                    {"username": "batch_s1", "role": "student", "class_name": test_class.name},
+                    {"username": "student1", "role": "student", "class_name": test_class.name},
+                    {"username": "batch_s1", "role": "student", "class_name": test_class.name},
+                    {"username": "batch_t1", "role": "teacher", "class_name": "NonexistentClass"},
+                    {"username": "batch_t2", "role": "teacher", "class_name": test_class.name},
+                ]
+            },
+            headers=auth_header(admin_token),
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["created_count"] == 3
+        assert [u["username"] for u in data["users"]] == ["batch_s1", "batch_t1", "batch_t2"]
+        assert [u["class_name"] for u in data["users"]] == [test_class.name, None, test_class.name]
+        assert len(data["errors"]) == 3
+        assert "student1" in data["errors"][0]
+        assert "batch_s1" in data["errors"][1]
+        assert "batch_t1" in data["errors"][2]
+
+        from app.models import ClassStudent, ClassTeacher
+
+        created = (
+            await test_session.execute(
+                select(User).where(User.username.in_(["batch_s1", "batch_t1", "batch_t2"]))
+            )
+        ).scalars().all()
+        assert len(created) == 3
+        assert all(u.must_change_password for u in created)
+
+        student_links = (
+            await test_session.execute(
+                select(ClassStudent).where(ClassStudent.class_id == test_class.id)
+            )
+        ).scalars().all()
+        teacher_links = (
+            await test_session.execute(
+                select(ClassTeacher).where(ClassTeacher.class_id == test_class.id)
+            )
+        ).scalars().all()
+        assert len(student_links) == 1
+        assert len(teacher_links) == 1
+
+        login = await client.post(
+            "/auth/login",
+            json={"username": "batch_t2", "password": data["users"][2]["initial_password"]},
+        )
+        assert login.status_code == 200
+
     async def test_non_admin_cannot_bulk_import(
         self,
         client: AsyncClient,
@@ -425,12 +508,30 @@ class TestResetPassword:
 
 
 class TestDeleteUser:
+    @pytest.fixture
+    def enqueued(self, monkeypatch):
+        jobs = []
+        monkeypatch.setattr(
+            deletion_routes, "enqueue_job", lambda func_path, *args: jobs.append(args) or "job"
+        )
+        monkeypatch.setattr(deletion_job.settings, "deletion_batch_size", 2)
+        return jobs
+
+    async def _run_job(self, test_engine, job_id: int) -> None:
+        session_maker = async_sessionmaker(
+            test_engine, class_=AsyncSession, expire_on_commit=False
+        )
+        await process_deletion(session_maker, job_id)
+
     async def test_delete_user_with_related_records(
         self,
         client: AsyncClient,
         admin_user: User,
         admin_token: str,
         test_session,
+        test_engine,
+        test_class,
+        enqueued,
     ):
         user = User(
             username="delete_me",
@@ -470,6 +571,13 @@ class TestDeleteUser:
                 meta={"ip": "127.0.0.1"},
             )
         )
+        conversation = Conversation(class_id=test_class.id, student_id=user_id)
+        test_session.add(conversation)
+        await test_session.commit()
+        test_session.add_all(
+            Message(conversation_id=conversation.id, role=MessageRole.USER, content=f"m{i}")
+            for i in range(5)
+        )
         await test_session.commit()
 
         response = await client.delete(
@@ -477,6 +585,24 @@ class TestDeleteUser:
             headers=auth_header(admin_token),
         )
         assert response.status_code == 200
+        job_id = response.json()["job_id"]
+        assert enqueued == [(job_id,)]
+
+        # 账号立即禁用，数据尚未删除
+        test_session.expire_all()
+        disabled = await test_session.get(User, user_id)
+        assert disabled.status == UserStatus.DISABLED
+
+        await self._run_job(test_engine, job_id)
+
+        job_response = await client.get(
+            f"/admin/deletion-jobs/{job_id}", headers=auth_header(admin_token)
+        )
+        job = job_response.json()
+        assert job["status"] == "completed"
+        assert job["deleted_users"] == 1
+        assert job["deleted_conversations"] == 1
+        assert job["deleted_messages"] == 5
 
         test_session.expire_all()
 
@@ -505,6 +631,147 @@ class TestDeleteUser:
         assert len(login_logs) == 1
         assert login_logs[0].actor_id is None
 
+    async def test_delete_cohort_removes_classes_and_students(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+        fully_setup_class: Class,
+        student_user: User,
+        teacher_user: User,
+        test_session,
+        test_engine,
+        enqueued,
+    ):
+        class_id, student_id, teacher_id = fully_setup_class.id, student_user.id, teacher_user.id
+        assert class_id in await get_teacher_class_ids(test_session, teacher_id)
+        response = await client.post(
+            "/admin/deletion-jobs",
+            json={"target_type": "cohort", "grade": fully_setup_class.grade},
+            headers=auth_header(admin_token),
+        )
+        assert response.status_code == 200
+        job_id = response.json()["id"]
+        assert response.json()["total_users"] == 1
+
+        await self._run_job(test_engine, job_id)
+
+        test_session.expire_all()
+        assert await test_session.get(Class, class_id) is None
+        assert await test_session.get(User, student_id) is None
+        # 教师账号保留，成员关系缓存随班级删除而失效
+        assert await test_session.get(User, teacher_id) is not None
+        assert await get_cache().get(f"membership:{teacher_id}", "teacher") is None
+        assert class_id not in await get_teacher_class_ids(test_session, teacher_id)
+
+    async def test_failed_job_can_resume(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+        student_user: User,
+        test_session,
+        test_engine,
+        enqueued,
+    ):
+        student_id = student_user.id
+        response = await client.post(
+            "/admin/deletion-jobs",
+            json={"target_type": "user", "target_id": student_id},
+            headers=auth_header(admin_token),
+        )
+        job_id = response.json()["id"]
+
+        job = await test_session.get(DeletionJob, job_id)
+        job.status = DeletionStatus.FAILED
+        await test_session.commit()
+
+        response = await client.post(
+            f"/admin/deletion-jobs/{job_id}/resume", headers=auth_header(admin_token)
+        )
+        assert response.status_code == 200
+        assert response.json()["status"] == "pending"
+        assert enqueued == [(job_id,), (job_id,)]
+
+        await self._run_job(test_engine, job_id)
+
+        test_session.expire_all()
+        assert await test_session.get(User, student_id) is None
+
+    async def test_user_pending_deletion_cannot_be_edited(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+        student_user: User,
+        test_class: Class,
+        test_session,
+        enqueued,
+    ):
+        student_id = student_user.id
+        response = await client.delete(
+            f"/admin/users/{student_id}", headers=auth_header(admin_token)
+        )
+        job_id = response.json()["job_id"]
+
+        response = await client.get("/admin/users", headers=auth_header(admin_token))
+        item = next(u for u in response.json()["items"] if u["id"] == student_id)
+        assert (item["status"], item["pending_deletion"]) == ("disabled", True)
+
+        # 恢复启用、重置密码、调整班级都会被拒绝：删除任务完成后账号仍会被删除
+        requests = [
+            client.patch(
+                f"/admin/users/{student_id}",
+                json={"status": "active"},
+                headers=auth_header(admin_token),
+            ),
+            client.post(
+                f"/admin/users/{student_id}/reset-password", headers=auth_header(admin_token)
+            ),
+            client.put(
+                f"/admin/students/{student_id}/class",
+                json={"class_id": test_class.id},
+                headers=auth_header(admin_token),
+            ),
+        ]
+        for request in requests:
+            response = await request
+            assert response.status_code == 409
+
+        # 失败的任务仍未结束，账号仍视为待删除
+        job = await test_session.get(DeletionJob, job_id)
+        job.status = DeletionStatus.FAILED
+        await test_session.commit()
+        response = await client.patch(
+            f"/admin/users/{student_id}",
+            json={"display_name": "新名字"},
+            headers=auth_header(admin_token),
+        )
+        assert response.status_code == 409
+
+    async def test_running_job_cannot_resume(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+        student_user: User,
+        test_session,
+        enqueued,
+    ):
+        response = await client.post(
+            "/admin/deletion-jobs",
+            json={"target_type": "user", "target_id": student_user.id},
+            headers=auth_header(admin_token),
+        )
+        job_id = response.json()["id"]
+
+        for job_status in (DeletionStatus.PENDING, DeletionStatus.PROCESSING):
+            job = await test_session.get(DeletionJob, job_id)
+            job.status = job_status
+            await test_session.commit()
+
+            response = await client.post(
+                f"/admin/deletion-jobs/{job_id}/resume", headers=auth_header(admin_token)
+            )
+            assert response.status_code == 400
+        assert enqueued == [(job_id,)]
+
 
 class TestAdminLlmSettings:
     async def test_update_llm_settings_updates_runtime(
@@ -571,3 +838,549 @@ class TestAdminLlmSettings:
         assert found.get(dotted_keys["base_url"]) == payload["base_url"]
         assert found.get(dotted_keys["api_key"]) == payload["api_key"]
         assert found.get(dotted_keys["model_name"]) == payload["model_name"]
+
+    async def test_update_bumps_version_and_swaps_provider(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+    ):
+        response = await client.put(
+            "/admin/settings/llm",
+            json={"model_name": "model-a", "api_key": "key-a"},
+            headers=auth_header(admin_token),
+        )
+        assert response.json()["config"]["version"] == 1
+        provider_a = get_llm_provider()
+        assert get_llm_provider() is provider_a
+        assert provider_a.model == "model-a"
+
+        response = await client.put(
+            "/admin/settings/llm",
+            json={"model_name": "model-b"},
+            headers=auth_header(admin_token),
+        )
+        assert response.json()["config"]["version"] == 2
+        provider_b = get_llm_provider()
+        assert provider_b is not provider_a
+        assert provider_b.model == "model-b"
+        assert provider_b.api_key == "key-a"
+
+    async def test_concurrent_updates_get_distinct_versions(
+        self,
+        client: AsyncClient,
+        tmp_path,
+        monkeypatch,
+    ):
+        # 内存库的所有会话共用一个连接，并发事务需要基于文件的数据库
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'llm.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_maker() as session:
+            admin = User(
+                username="llm_admin",
+                role=UserRole.ADMIN,
+                password_hash="x",
+                must_change_password=False,
+                status=UserStatus.ACTIVE,
+            )
+            session.add(admin)
+            await session.commit()
+        token = create_access_token(admin.id, admin.role.value)
+
+        async def override_get_db():
+            async with session_maker() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+
+        # 读取配置前让出事件循环，另一个更新有机会在同一版本上并发执行
+        load_rows = llm_routes.load_llm_config_rows
+
+        async def slow_load_rows(db):
+            await asyncio.sleep(0.05)
+            return await load_rows(db)
+
+        monkeypatch.setattr(llm_routes, "load_llm_config_rows", slow_load_rows)
+        try:
+            responses = await asyncio.gather(
+                client.put(
+                    "/admin/settings/llm",
+                    json={"model_name": "model-a"},
+                    headers=auth_header(token),
+                ),
+                client.put(
+                    "/admin/settings/llm",
+                    json={"base_url": "https://b.example/v1"},
+                    headers=auth_header(token),
+                ),
+            )
+            assert [r.status_code for r in responses] == [200, 200]
+            versions = sorted(r.json()["config"]["version"] for r in responses)
+            assert versions == [1, 2]
+
+            # 后执行的更新读到了先提交的配置，版本 2 包含两次修改
+            async with session_maker() as session:
+                snapshot = await load_llm_config_snapshot(session)
+            assert snapshot.version == 2
+            assert (snapshot.model_name, snapshot.base_url) == ("model-a", "https://b.example/v1")
+        finally:
+            await engine.dispose()
+
+    async def test_get_falls_back_to_legacy_keys(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+        test_session,
+    ):
+        test_session.add(SystemConfig(key="llm_model_name", value="legacy-model"))
+        await test_session.commit()
+
+        response = await client.get("/admin/settings/llm", headers=auth_header(admin_token))
+
+        assert response.status_code == 200
+        assert response.json()["model_name"] == "legacy-model"
+        assert response.json()["version"] == 0
+
+    async def test_other_worker_reloads_snapshot(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+        test_engine,
+        test_session,
+    ):
+        # 模拟另一个 worker 直接写库后广播：本 worker 从数据库重新加载完整快照
+        test_session.add_all(
+            [
+                SystemConfig(key="llm.model_name", value="remote-model"),
+                SystemConfig(key="llm.config_version", value="7"),
+            ]
+        )
+        await test_session.commit()
+
+        sync = LLMConfigSync(
+            async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+        )
+        snapshot = await sync.reload()
+
+        assert snapshot.version == 7
+        runtime = get_llm_runtime_settings()
+        assert runtime is snapshot
+        assert runtime.model_name == "remote-model"
+        assert runtime.api_key is None
+
+    async def test_workers_view_reports_local_version(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+        monkeypatch,
+    ):
+        from app.admin import llm_routes
+
+        async def redis_unavailable():
+            raise ConnectionError("redis down")
+
+        monkeypatch.setattr(llm_routes, "list_llm_config_workers", redis_unavailable)
+        await client.put(
+            "/admin/settings/llm",
+            json={"model_name": "model-a"},
+            headers=auth_header(admin_token),
+        )
+
+        response = await client.get(
+            "/admin/settings/llm/workers", headers=auth_header(admin_token)
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["current_version"] == 1
+        assert data["broadcast_available"] is False
+        assert data["workers"][0]["version"] == 1
+        assert data["workers"][0]["in_sync"] is True
+
+
+class FakeBenchmarkProvider:
+    """每第 4 个请求返回 429，其余请求流式返回 5 个分片"""
+
+    instances: list = []
+
+    def __init__(self, api_key, base_url, model, provider_name):
+        self.model = model
+        self.calls = 0
+        self.system_prompts = []
+        self.closed = False
+        FakeBenchmarkProvider.instances.append(self)
+
+    async def chat_stream(self, messages, temperature=0.7, max_tokens=2048):
+        import asyncio
+
+        import httpx
+
+        self.calls += 1
+        self.system_prompts.append(messages[0].content)
+        if self.calls % 4 == 0:
+            request = httpx.Request("POST", "http://llm.test/chat/completions")
+            raise httpx.HTTPStatusError(
+                "rate limited", request=request, response=httpx.Response(429, request=request)
+            )
+        for i in range(5):
+            await asyncio.sleep(0.001)
+            yield f"chunk{i}"
+
+    async def aclose(self):
+        self.closed = True
+
+
+class TestLlmBenchmark:
+    @pytest.fixture(autouse=True)
+    def fake_provider(self, monkeypatch):
+        from app.admin import llm_routes
+
+        FakeBenchmarkProvider.instances = []
+        monkeypatch.setattr(llm_routes, "OpenAICompatibleProvider", FakeBenchmarkProvider)
+
+    async def test_benchmark_reports_and_stores_results(
+        self,
+        client: AsyncClient,
+        admin_user: User,
+        admin_token: str,
+        test_session,
+    ):
+        test_session.add(
+            PromptScope(
+                scope_type=ScopeType.GLOBAL,
+                content="不要直接给出答案",
+                version=3,
+                is_active=True,
+                created_by=admin_user.id,
+            )
+        )
+        await test_session.commit()
+
+        response = await client.post(
+            "/admin/settings/llm/benchmark",
+            json={
+                "api_key": "key",
+                "base_url": "http://llm.test",
+                "model_name": "candidate-model",
+                "concurrency": 4,
+                "total_requests": 8,
+            },
+            headers=auth_header(admin_token),
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["model_name"] == "candidate-model"
+        assert data["prompt_version"] == 3
+        assert data["success_count"] == 6
+        assert data["rate_limited_count"] == 2
+        assert data["rate_limited_rate"] == 0.25
+        assert data["ttft_p50_ms"] is not None
+        assert data["latency_p99_ms"] >= data["latency_p50_ms"]
+        assert data["tokens_per_second"] > 0
+        assert data["errors"] == ["HTTP 429"]
+
+        provider = FakeBenchmarkProvider.instances[0]
+        assert provider.closed is True
+        assert all("不要直接给出答案" in p for p in provider.system_prompts)
+
+        history = await client.get(
+            "/admin/settings/llm/benchmarks?model_name=candidate-model",
+            headers=auth_header(admin_token),
+        )
+        assert history.json()["total"] == 1
+        assert history.json()["items"][0]["id"] == data["id"]
+
+    async def test_benchmark_rejects_excessive_concurrency(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+    ):
+        response = await client.post(
+            "/admin/settings/llm/benchmark",
+            json={"api_key": "key", "concurrency": 1000},
+            headers=auth_header(admin_token),
+        )
+
+        assert response.status_code == 400
+        assert FakeBenchmarkProvider.instances == []
+
+
+class TestRuntimeMetrics:
+    async def test_admin_can_read_password_hasher_metrics(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+    ):
+        response = await client.get("/admin/metrics", headers=auth_header(admin_token))
+
+        assert response.status_code == 200
+        data = response.json()["password_hasher"]
+        assert data["max_workers"] >= 1
+        assert data["queued"] >= 0
+
+    async def test_non_admin_cannot_read_metrics(
+        self,
+        client: AsyncClient,
+        teacher_token: str,
+    ):
+        response = await client.get("/admin/metrics", headers=auth_header(teacher_token))
+
+        assert response.status_code == 403
+
+
+class TestUserImportJobs:
+    @pytest.fixture
+    def enqueued(self, monkeypatch, tmp_path):
+        jobs = []
+        monkeypatch.setattr(import_routes.settings, "import_upload_path", str(tmp_path))
+        monkeypatch.setattr(
+            import_routes, "enqueue_job", lambda func_path, *args: jobs.append(args) or "job"
+        )
+        return jobs
+
+    async def _run_job(self, test_engine, job_id: int) -> None:
+        session_maker = async_sessionmaker(
+            test_engine, class_=AsyncSession, expire_on_commit=False
+        )
+        await process_user_import(session_maker, job_id)
+
+    async def test_import_csv_roster(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+        test_class,
+        test_session,
+        test_engine,
+        enqueued,
+    ):
+        content = (
+            "学号/工号,姓名,角色,班级\n"
+            "csv_s001,学生一,学生,七年级一班\n"
+            "csv_s002,学生二,学生,不存在的班级\n"
+            "csv_t001,老师一,教师,\n"
+            "csv_x001,未知,家长,\n"
+        )
+        response = await client.post(
+            "/admin/users/import-jobs",
+            headers=auth_header(admin_token),
+            files={"file": ("roster.csv", content.encode("utf-8"), "text/csv")},
+        )
+
+        assert response.status_code == 200
+        job_id = response.json()["id"]
+        assert response.json()["status"] == "pending"
+        assert enqueued == [(job_id,)]
+
+        await self._run_job(test_engine, job_id)
+
+        response = await client.get(
+            f"/admin/users/import-jobs/{job_id}", headers=auth_header(admin_token)
+        )
+        data = response.json()
+        assert data["status"] == "completed"
+        assert data["total_rows"] == 4
+        assert data["processed_rows"] == 4
+        assert data["created_count"] == 2
+        assert data["error_count"] == 2
+        assert data["has_credentials"] is True
+
+        result = await test_session.execute(
+            select(User.username).where(User.username.like("csv_%"))
+        )
+        assert set(result.scalars().all()) == {"csv_s001", "csv_t001"}
+
+        response = await client.get(
+            f"/admin/users/import-jobs/{job_id}/credentials",
+            headers=auth_header(admin_token),
+        )
+        assert response.status_code == 200
+        workbook = load_workbook(io.BytesIO(response.content))
+        sheets = {
+            sheet.title: [row[1] for row in sheet.iter_rows(min_row=2, values_only=True)]
+            for sheet in workbook.worksheets
+        }
+        assert sheets == {"七年级一班": ["csv_s001"], "未分班": ["csv_t001"]}
+
+    async def test_import_xlsx_dry_run_creates_nothing(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+        test_class,
+        test_session,
+        test_engine,
+        enqueued,
+        tmp_path,
+    ):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["学号/工号", "姓名", "角色", "班级"])
+        sheet.append([20240001, "学生一", "学生", "七年级一班"])
+        sheet.append(["xlsx_t001", "老师一", "teacher", None])
+        xlsx_path = tmp_path / "roster-source.xlsx"
+        workbook.save(xlsx_path)
+
+        response = await client.post(
+            "/admin/users/import-jobs",
+            headers=auth_header(admin_token),
+            data={"dry_run": "true"},
+            files={"file": ("roster.xlsx", xlsx_path.read_bytes())},
+        )
+        assert response.status_code == 200
+        job_id = response.json()["id"]
+
+        await self._run_job(test_engine, job_id)
+
+        job = await test_session.get(ImportJob, job_id)
+        await test_session.refresh(job)
+        assert job.status == ImportStatus.COMPLETED
+        assert job.created_count == 2
+        assert job.error_count == 0
+        assert job.result_file_key is None
+
+        result = await test_session.execute(
+            select(User).where(User.username.in_(["20240001", "xlsx_t001"]))
+        )
+        assert result.scalars().all() == []
+
+    async def test_failed_import_keeps_credentials_until_retention(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+        test_class,
+        test_session,
+        test_engine,
+        enqueued,
+        monkeypatch,
+        tmp_path,
+    ):
+        calls = []
+        real_import_users = user_import_job.import_users
+
+        async def failing_import_users(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError("db down")
+            return await real_import_users(*args, **kwargs)
+
+        monkeypatch.setattr(user_import_job.settings, "import_batch_size", 1)
+        monkeypatch.setattr(user_import_job, "import_users", failing_import_users)
+        content = "学号/工号,姓名,角色,班级\nfail_t001,教师一,教师,\nfail_t002,教师二,教师,\n"
+        response = await client.post(
+            "/admin/users/import-jobs",
+            headers=auth_header(admin_token),
+            files={"file": ("roster.csv", content.encode("utf-8"), "text/csv")},
+        )
+        job_id = response.json()["id"]
+        await self._run_job(test_engine, job_id)
+
+        job = await test_session.get(ImportJob, job_id)
+        await test_session.refresh(job)
+        assert (job.status, job.created_count) == (ImportStatus.FAILED, 1)
+        # 上传的名单在任务结束后删除
+        assert not Path(job.file_key).exists()
+
+        # 失败前已创建的用户仍可下载密码单
+        response = await client.get(
+            f"/admin/users/import-jobs/{job_id}/credentials?format=csv",
+            headers=auth_header(admin_token),
+        )
+        assert response.status_code == 200
+        assert "fail_t001" in response.content.decode("utf-8-sig")
+
+        session_maker = async_sessionmaker(test_engine, class_=AsyncSession)
+        assert await purge_import_credentials(session_maker) == 0
+        later = datetime.utcnow() + timedelta(
+            hours=user_import_job.settings.import_credentials_retention_hours + 1
+        )
+        assert await purge_import_credentials(session_maker, later) == 1
+        await test_session.refresh(job)
+        assert job.result_file_key is None
+        assert list(tmp_path.glob("*.credentials.csv")) == []
+
+        response = await client.get(
+            f"/admin/users/import-jobs/{job_id}/credentials",
+            headers=auth_header(admin_token),
+        )
+        assert response.status_code == 400
+
+    async def test_rejects_unsupported_file_type(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+        enqueued,
+    ):
+        response = await client.post(
+            "/admin/users/import-jobs",
+            headers=auth_header(admin_token),
+            files={"file": ("roster.txt", b"username,role\n")},
+        )
+
+        assert response.status_code == 400
+        assert enqueued == []
+
+
+class TestCredentialSheets:
+    async def test_render_sheet_groups_by_class(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+    ):
+        users = [
+            {"username": "s1", "display_name": "学生一", "role": "student", "initial_password": "p1", "class_name": "一班"},
+            {"username": "s2", "display_name": "学生二", "role": "student", "initial_password": "p2", "class_name": "二班"},
+            {"username": "s3", "display_name": "学生三", "role": "student", "initial_password": "p3", "class_name": "一班"},
+        ]
+        response = await client.post(
+            "/admin/users/credential-sheet?format=csv",
+            headers=auth_header(admin_token),
+            json={"users": users},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.reader(io.StringIO(response.content.decode("utf-8-sig"))))
+        assert rows[0] == ["班级", "学号/工号", "姓名", "角色", "初始密码"]
+        assert [row[1] for row in rows[1:]] == ["s1", "s3", "s2"]
+
+    async def test_reset_class_passwords(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+        class_with_student,
+        student_user: User,
+        test_session,
+    ):
+        response = await client.post(
+            f"/admin/classes/{class_with_student.id}/reset-passwords?format=csv",
+            headers=auth_header(admin_token),
+        )
+
+        assert response.status_code == 200
+        rows = list(csv.reader(io.StringIO(response.content.decode("utf-8-sig"))))
+        assert len(rows) == 2
+        assert rows[1][1] == student_user.username
+        new_password = rows[1][4]
+
+        await test_session.refresh(student_user)
+        assert student_user.must_change_password is True
+
+        login = await client.post(
+            "/auth/login",
+            json={"username": student_user.username, "password": new_password},
+        )
+        assert login.status_code == 200
+
+    async def test_reset_class_passwords_requires_admin(
+        self,
+        client: AsyncClient,
+        teacher_token: str,
+        class_with_student,
+    ):
+        response = await client.post(
+            f"/admin/classes/{class_with_student.id}/reset-passwords",
+            headers=auth_header(teacher_token),
+        )
+
+        assert response.status_code == 403
@@ -0,0 +1,127 @@
+"""
+Audit writer tests.
+
+Tests:
+- Audit entries recorded by endpoints are written in batches on flush
+- Entries whose actor was deleted before the flush are kept with a null actor
+- Queue overflow drops the oldest entries when no spill is configured
+- A row that can never be written is dropped instead of blocking the queue
+- Batches that fail while the database is unavailable stay queued
+"""
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.audit import AuditWriter, audit_writer, record_audit
+from app.audit.writer import AuditEntry
+from app.models import AuditLog, User
+
+
+async def test_login_audit_is_written_on_flush(
+    client: AsyncClient, admin_user: User, test_session
+):
+    response = await client.post(
+        "/auth/login", json={"username": "admin", "password": "admin123"}
+    )
+    assert response.status_code == 200
+
+    written = await audit_writer.flush()
+
+    assert written == 1
+    logs = (
+        await test_session.execute(select(AuditLog).where(AuditLog.action == "login"))
+    ).scalars().all()
+    assert len(logs) == 1
+    assert logs[0].actor_id == admin_user.id
+    assert audit_writer.stats().queued == 0
+
+
+async def test_entry_for_deleted_actor_is_kept_without_actor(
+    client: AsyncClient, admin_user: User, test_session
+):
+    record_audit(action="login", actor_id=admin_user.id, target_type="user")
+    record_audit(action="login", actor_id=999999, target_type="user")
+
+    written = await audit_writer.flush()
+
+    assert written == 2
+    logs = (
+        await test_session.execute(select(AuditLog).order_by(AuditLog.id))
+    ).scalars().all()
+    assert [log.actor_id for log in logs] == [admin_user.id, None]
+
+
+async def test_full_queue_drops_oldest_entries():
+    writer = AuditWriter()
+    writer.max_queue_size = 2
+    writer.spill_to_redis = False
+
+    for i in range(3):
+        writer.record(AuditEntry(action=f"action_{i}"))
+
+    stats = writer.stats()
+    assert stats.queued == 2
+    assert stats.dropped == 1
+    assert stats.enqueued == 3
+
+
+def _writer(test_engine) -> AuditWriter:
+    writer = AuditWriter()
+    writer._session_factory = async_sessionmaker(test_engine, class_=AsyncSession)
+    return writer
+
+
+async def test_bad_entry_does_not_block_later_entries(test_engine, test_session):
+    writer = _writer(test_engine)
+    writer.record(AuditEntry(action="before"))
+    # action 不能为空：批量插入与置空 actor 后的重试都会失败
+    writer.record(AuditEntry(action=None))
+    writer.record(AuditEntry(action="after"))
+
+    assert await writer.flush() == 2
+    writer.record(AuditEntry(action="later"))
+    assert await writer.flush() == 1
+
+    stats = writer.stats()
+    assert (stats.queued, stats.dropped, stats.written) == (0, 1, 3)
+    actions = (
+        await test_session.execute(select(AuditLog.action).order_by(AuditLog.id))
+    ).scalars().all()
+    assert actions == ["before", "after", "later"]
+
+
+async def test_unavailable_database_keeps_entries_queued(test_engine, test_session):
+    writer = _writer(test_engine)
+    writer.max_batch_attempts = 2
+    write = writer._write
+    attempts = []
+    available = False
+
+    async def flaky(batch):
+        attempts.append(len(batch))
+        if not available:
+            raise OperationalError("INSERT INTO audit_logs", {}, ConnectionError("refused"))
+        await write(batch)
+
+    writer._write = flaky
+    writer.record(AuditEntry(action="first"))
+    writer.record(AuditEntry(action="second"))
+
+    # 第二次失败达到上限后改为逐条写入；数据库仍不可用，条目留在队列中，不丢弃
+    for _ in range(3):
+        with pytest.raises(OperationalError):
+            await writer.flush()
+        assert writer.stats().queued == 2
+    assert attempts == [2, 2, 1, 2, 1]
+
+    available = True
+    assert await writer.flush() == 2
+    stats = writer.stats()
+    assert (stats.queued, stats.dropped, stats.written) == (0, 0, 2)
+    actions = (
+        await test_session.execute(select(AuditLog.action).order_by(AuditLog.id))
+    ).scalars().all()
+    assert actions == ["first", "second"]
@@ -281,3 +281,49 @@ class TestRBAC:
         )
 
         assert response.status_code == 200
+
+
+class TestPrincipalCache:
+    """Tests for cached principal invalidation."""
+
+    async def test_disabling_user_takes_effect_immediately(
+        self,
+        client: AsyncClient,
+        admin_user: User,
+        admin_token: str,
+        student_user: User,
+        student_token: str,
+    ):
+        """Test a cached principal is dropped when an admin disables the account."""
+        response = await client.get("/auth/me", headers=auth_header(student_token))
+        assert response.status_code == 200
+
+        response = await client.patch(
+            f"/admin/users/{student_user.id}",
+            json={"status": "disabled"},
+            headers=auth_header(admin_token),
+        )
+        assert response.status_code == 200
+
+        response = await client.get("/auth/me", headers=auth_header(student_token))
+        assert response.status_code == 403
+
+    async def test_reset_password_requires_password_change_immediately(
+        self,
+        client: AsyncClient,
+        admin_user: User,
+        admin_token: str,
+        student_user: User,
+        student_token: str,
+    ):
+        """Test must_change_password from a reset is not masked by the cache."""
+        response = await client.get("/auth/me", headers=auth_header(student_token))
+        assert response.json()["must_change_password"] is False
+
+        await client.post(
+            f"/admin/users/{student_user.id}/reset-password",
+            headers=auth_header(admin_token),
+        )
+
+        response = await client.get("/auth/me", headers=auth_header(student_token))
+        assert response.json()["must_change_password"] is True
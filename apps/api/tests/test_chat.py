@@ -451,3 +451,161 @@ class TestGetMessages:
 
         assert response.status_code == 200
         assert len(response.json()["messages"]) == 2
+
+
+class TestTeacherStudentOverview:
+    """Tests for GET /teacher/classes/{class_id}/students."""
+
+    async def test_student_stats_sorting_and_inactivity(
+        self,
+        client: AsyncClient,
+        teacher_token: str,
+        student_user: User,
+        fully_setup_class: Class,
+        test_session,
+    ):
+        """Per-student stats come from one grouped query; sort/filter in SQL."""
+        from datetime import datetime, timedelta
+        from app.models import ClassStudent, Message, MessageRole, UserRole, UserStatus
+
+        idle = User(
+            username="student_idle",
+            role=UserRole.STUDENT,
+            password_hash="x",
+            status=UserStatus.ACTIVE,
+        )
+        test_session.add(idle)
+        await test_session.flush()
+        test_session.add(ClassStudent(class_id=fully_setup_class.id, student_id=idle.id))
+
+        now = datetime.utcnow()
+        conversations = [
+            Conversation(
+                class_id=fully_setup_class.id,
+                student_id=student_user.id,
+                last_message_at=now - timedelta(days=days),
+            )
+            for days in (1, 10)
+        ]
+        test_session.add_all(conversations)
+        await test_session.flush()
+        test_session.add_all(
+            [
+                Message(conversation_id=conversations[0].id, role=MessageRole.USER, content="问"),
+                Message(
+                    conversation_id=conversations[0].id,
+                    role=MessageRole.ASSISTANT,
+                    content="答",
+                    token_in=30,
+                    token_out=12,
+                ),
+                Message(conversation_id=conversations[1].id, role=MessageRole.USER, content="问"),
+            ]
+        )
+        await test_session.commit()
+
+        response = await client.get(
+            f"/teacher/classes/{fully_setup_class.id}/students?sort=tokens&order=desc",
+            headers=auth_header(teacher_token),
+        )
+        assert response.status_code == 200
+        students = response.json()["students"]
+        assert [s["username"] for s in students] == ["student1", "student_idle"]
+        assert students[0]["conversation_count"] == 2
+        assert students[0]["message_count"] == 2
+        assert students[0]["tokens_used"] == 42
+        assert students[1]["conversation_count"] == 0
+        assert students[1]["last_active_at"] is None
+
+        response = await client.get(
+            f"/teacher/classes/{fully_setup_class.id}/students?inactive_days=3",
+            headers=auth_header(teacher_token),
+        )
+        assert [s["username"] for s in response.json()["students"]] == ["student_idle"]
+
+
+class TestActivityRollup:
+    """Tests for the daily activity rollup job and report endpoints."""
+
+    async def test_rollup_feeds_reports_and_follows_watermark(
+        self,
+        client: AsyncClient,
+        teacher_token: str,
+        student_user: User,
+        fully_setup_class: Class,
+        test_session,
+        test_engine,
+    ):
+        from datetime import datetime, timedelta
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+        from app.jobs.activity_rollup import process_activity_rollup
+        from app.models import Message, MessageRole
+
+        class_id, student_id = fully_setup_class.id, student_user.id
+        now = datetime.utcnow()
+        earlier = now - timedelta(days=3)
+        conversations = [
+            Conversation(class_id=class_id, student_id=student_id, created_at=at)
+            for at in (earlier, now)
+        ]
+        test_session.add_all(conversations)
+        await test_session.flush()
+        conversation_ids = [c.id for c in conversations]
+        test_session.add_all(
+            [
+                Message(conversation_id=conversation_ids[0], role=MessageRole.USER, content="问", created_at=earlier),
+                Message(
+                    conversation_id=conversation_ids[0],
+                    role=MessageRole.ASSISTANT,
+                    content="答",
+                    created_at=earlier,
+                    token_in=20,
+                    token_out=10,
+                    policy_flags={"latency_ms": 300},
+                ),
+                Message(conversation_id=conversation_ids[1], role=MessageRole.USER, content="问", created_at=now),
+                Message(
+                    conversation_id=conversation_ids[1],
+                    role=MessageRole.ASSISTANT,
+                    content="AI 服务暂不可用",
+                    created_at=now,
+                    policy_flags={"error": "timeout"},
+                ),
+            ]
+        )
+        await test_session.commit()
+
+        session_maker = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+        assert await process_activity_rollup(session_maker) == 4
+
+        response = await client.get(
+            f"/teacher/classes/{class_id}/activity",
+            headers=auth_header(teacher_token),
+        )
+        assert response.status_code == 200
+        days = response.json()["days"]
+        assert [d["day"] for d in days] == [earlier.date().isoformat(), now.date().isoformat()]
+        assert days[0]["active_students"] == 1
+        assert (days[0]["message_count"], days[0]["token_in"], days[0]["token_out"]) == (1, 20, 10)
+        assert days[0]["avg_latency_ms"] == 300
+        assert (days[1]["conversation_count"], days[1]["error_count"]) == (1, 1)
+
+        # 新消息写入后，下次运行只重算受影响的日期
+        test_session.add(
+            Message(conversation_id=conversation_ids[1], role=MessageRole.USER, content="再问", created_at=now)
+        )
+        await test_session.commit()
+        assert await process_activity_rollup(session_maker) < 4
+
+        response = await client.get(
+            f"/teacher/classes/{class_id}/students/{student_id}/activity",
+            headers=auth_header(teacher_token),
+        )
+        days = response.json()["days"]
+        assert days[-1]["message_count"] == 2
+
+        response = await client.get(
+            f"/teacher/classes/{class_id}/activity?start=2020-01-01&end=2026-01-01",
+            headers=auth_header(teacher_token),
+        )
+        assert response.status_code == 400
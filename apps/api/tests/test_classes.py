@@ -6,6 +6,7 @@ Tests:
 - List classes (role-based filtering)
 - Get class detail
 - Add students/teachers to class
+- Cohort rollover
 """
 
 import pytest
@@ -145,6 +146,34 @@ class TestListClasses:
         assert "items" in data
         assert len(data["items"]) <= 1
 
+    async def test_list_classes_counts_members_and_pages(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+        fully_setup_class: Class,
+        test_session,
+    ):
+        test_session.add_all(Class(name=f"选修班{i}", grade="八年级") for i in range(3))
+        await test_session.commit()
+
+        response = await client.get(
+            "/classes?page=1&page_size=10",
+            headers=auth_header(admin_token),
+        )
+        data = response.json()
+        assert data["total"] == 4
+        counts = {c["name"]: (c["student_count"], c["teacher_count"]) for c in data["items"]}
+        assert counts[fully_setup_class.name] == (1, 1)
+        assert counts["选修班0"] == (0, 0)
+
+        response = await client.get(
+            "/classes?page=5&page_size=10",
+            headers=auth_header(admin_token),
+        )
+        data = response.json()
+        assert data["items"] == []
+        assert data["total"] == 4
+
 
 class TestGetClassDetail:
     """Tests for GET /classes/{class_id} endpoint."""
@@ -244,6 +273,71 @@ class TestGetClassDetail:
 
         assert response.status_code == 404
 
+    async def test_roster_pagination_search_and_compact(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+        fully_setup_class: Class,
+        test_session,
+    ):
+        """Roster is paged, prefix-searchable, and omitted in compact mode."""
+        from app.models import ClassStudent, UserRole, UserStatus
+
+        class_id = fully_setup_class.id
+        users = [
+            User(
+                username=f"s{i:02d}",
+                display_name="王同学" if i % 2 else "李同学",
+                role=UserRole.STUDENT,
+                password_hash="x",
+                status=UserStatus.ACTIVE,
+            )
+            for i in range(5)
+        ]
+        test_session.add_all(users)
+        await test_session.flush()
+        test_session.add_all(ClassStudent(class_id=class_id, student_id=u.id) for u in users)
+        await test_session.commit()
+
+        response = await client.get(
+            f"/classes/{class_id}?page=2&page_size=2",
+            headers=auth_header(admin_token),
+        )
+        data = response.json()
+        assert data["student_count"] == 6
+        assert data["student_total"] == 6
+        assert [s["username"] for s in data["students"]] == ["s02", "s03"]
+        assert len(data["teachers"]) == 1
+
+        # 不传分页参数时返回完整名单（管理端页面依赖）
+        response = await client.get(f"/classes/{class_id}", headers=auth_header(admin_token))
+        data = response.json()
+        assert len(data["students"]) == data["student_total"] == 6
+
+        response = await client.get(
+            f"/classes/{class_id}?q=王",
+            headers=auth_header(admin_token),
+        )
+        data = response.json()
+        assert data["student_total"] == 2
+        assert [s["username"] for s in data["students"]] == ["s01", "s03"]
+
+        response = await client.get(
+            f"/classes/{class_id}?q=s0&page=9&page_size=2",
+            headers=auth_header(admin_token),
+        )
+        data = response.json()
+        assert data["students"] == []
+        assert data["student_total"] == 5
+
+        response = await client.get(
+            f"/classes/{class_id}?compact=true",
+            headers=auth_header(admin_token),
+        )
+        data = response.json()
+        assert (data["student_count"], data["teacher_count"]) == (6, 1)
+        assert data["students"] == [] and data["teachers"] == []
+
 
 class TestAddStudentsToClass:
     """Tests for POST /classes/{class_id}/students/bulk-add endpoint."""
@@ -369,6 +463,32 @@ class TestAddStudentsToClass:
         assert data["added"] == 0
         assert any("已在班级" in e and class_with_student.name in e for e in data["errors"])
 
+    async def test_mixed_batch_reports_per_id_results(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+        class_with_student: Class,
+        student_user: User,
+        teacher_user: User,
+        new_student_user: User,
+    ):
+        ids = [new_student_user.id, student_user.id, teacher_user.id, 99999, new_student_user.id]
+        response = await client.post(
+            f"/classes/{class_with_student.id}/students/bulk-add",
+            json={"student_ids": ids},
+            headers=auth_header(admin_token),
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["added"] == 1
+        assert [(r["user_id"], r["status"]) for r in data["results"]] == [
+            (new_student_user.id, "added"),
+            (student_user.id, "already_member"),
+            (teacher_user.id, "wrong_role"),
+            (99999, "not_found"),
+        ]
+
 
 class TestAddTeachersToClass:
     """Tests for POST /classes/{class_id}/teachers/add endpoint."""
@@ -444,3 +564,125 @@ class TestAddTeachersToClass:
         )
 
         assert response.status_code == 404
+
+
+class TestMembershipCache:
+    """Tests for cached membership checks staying consistent with mutations."""
+
+    async def test_removed_teacher_loses_access_immediately(
+        self,
+        client: AsyncClient,
+        admin_user: User,
+        admin_token: str,
+        teacher_user: User,
+        teacher_token: str,
+        class_with_teacher: Class,
+    ):
+        """Test membership cache is invalidated when a teacher is removed."""
+        response = await client.get(
+            f"/classes/{class_with_teacher.id}",
+            headers=auth_header(teacher_token),
+        )
+        assert response.status_code == 200
+
+        response = await client.delete(
+            f"/classes/{class_with_teacher.id}/teachers/{teacher_user.id}",
+            headers=auth_header(admin_token),
+        )
+        assert response.status_code == 200
+
+        response = await client.get(
+            f"/classes/{class_with_teacher.id}",
+            headers=auth_header(teacher_token),
+        )
+        assert response.status_code == 403
+
+    async def test_added_student_gains_access_immediately(
+        self,
+        client: AsyncClient,
+        admin_user: User,
+        admin_token: str,
+        student_user: User,
+        student_token: str,
+        test_class: Class,
+    ):
+        """Test a cached empty membership set is invalidated by bulk-add."""
+        response = await client.get(
+            f"/classes/{test_class.id}",
+            headers=auth_header(student_token),
+        )
+        assert response.status_code == 403
+
+        response = await client.post(
+            f"/classes/{test_class.id}/students/bulk-add",
+            json={"student_ids": [student_user.id]},
+            headers=auth_header(admin_token),
+        )
+        assert response.json()["added"] == 1
+
+        response = await client.get(
+            f"/classes/{test_class.id}",
+            headers=auth_header(student_token),
+        )
+        assert response.status_code == 200
+
+
+class TestClassRollover:
+    """Tests for POST /classes/rollover endpoint."""
+
+    async def test_chained_rollover_moves_each_class_once(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+        class_with_student: Class,
+        student_user: User,
+        new_student_user: User,
+        test_session,
+    ):
+        from app.models import ClassStudent
+
+        grade8 = Class(name="八年级一班", grade="八年级")
+        grade9 = Class(name="九年级一班", grade="九年级")
+        test_session.add_all([grade8, grade9])
+        await test_session.commit()
+        test_session.add(ClassStudent(class_id=grade8.id, student_id=new_student_user.id))
+        await test_session.commit()
+
+        response = await client.post(
+            "/classes/rollover",
+            json={
+                "moves": [
+                    {"from_class_id": class_with_student.id, "to_class_id": grade8.id},
+                    {"from_class_id": grade8.id, "to_class_id": grade9.id},
+                ]
+            },
+            headers=auth_header(admin_token),
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["moved"] == 2
+        assert [c["moved"] for c in data["classes"]] == [1, 1]
+
+        grade8_detail = await client.get(
+            f"/classes/{grade8.id}", headers=auth_header(admin_token)
+        )
+        grade9_detail = await client.get(
+            f"/classes/{grade9.id}", headers=auth_header(admin_token)
+        )
+        assert [s["id"] for s in grade8_detail.json()["students"]] == [student_user.id]
+        assert [s["id"] for s in grade9_detail.json()["students"]] == [new_student_user.id]
+
+    async def test_rollover_rejects_missing_class(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+        test_class: Class,
+    ):
+        response = await client.post(
+            "/classes/rollover",
+            json={"moves": [{"from_class_id": test_class.id, "to_class_id": 99999}]},
+            headers=auth_header(admin_token),
+        )
+
+        assert response.status_code == 404
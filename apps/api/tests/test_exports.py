@@ -0,0 +1,461 @@
+"""
+Exports integration tests.
+
+Tests:
+- Create export job (scope and permission checks)
+- Export job writes CSV / XLSX / NDJSON from a streamed query
+- Download and delete
+- Signed download links and the S3 multipart writer
+- Synchronous gzip streaming export
+- Incremental per-consumer exports (segments, watermark, resume)
+"""
+
+import csv
+import gzip
+import io
+import json
+
+import pytest
+from httpx import AsyncClient
+from openpyxl import load_workbook
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.exports import routes as export_routes
+from app.exports.storage import S3ExportStorage, get_export_storage, sign_download_token
+from app.jobs import export as export_job
+from app.jobs.export import process_export
+from app.models import Class, Conversation, Message, MessageRole, User
+
+from tests.conftest import auth_header
+
+
+@pytest.fixture
+def enqueued(monkeypatch, tmp_path):
+    jobs = []
+    monkeypatch.setattr(
+        export_routes, "enqueue_job", lambda func_path, *args: jobs.append(args) or "job"
+    )
+    monkeypatch.setattr(export_job.settings, "export_local_path", str(tmp_path))
+    monkeypatch.setattr(export_job.settings, "export_batch_size", 2)
+    get_export_storage.cache_clear()
+    yield jobs
+    get_export_storage.cache_clear()
+
+
+@pytest.fixture
+async def class_with_messages(
+    test_session, fully_setup_class: Class, student_user: User
+) -> Class:
+    conversation = Conversation(
+        class_id=fully_setup_class.id, student_id=student_user.id, title="循环"
+    )
+    test_session.add(conversation)
+    await test_session.flush()
+    test_session.add_all(
+        Message(
+            conversation_id=conversation.id,
+            role=MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+            content=f"第{i}条",
+        )
+        for i in range(5)
+    )
+    await test_session.commit()
+    return fully_setup_class
+
+
+async def _run_job(test_engine, job_id: int) -> None:
+    session_maker = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+    await process_export(session_maker, job_id)
+
+
+class TestExports:
+    """Tests for /exports endpoints and the export job."""
+
+    @pytest.mark.parametrize("fmt", ["csv", "xlsx", "ndjson"])
+    async def test_export_job_writes_file(
+        self,
+        client: AsyncClient,
+        teacher_token: str,
+        class_with_messages: Class,
+        test_engine,
+        enqueued,
+        fmt,
+    ):
+        response = await client.post(
+            "/exports",
+            json={"class_id": class_with_messages.id, "format": fmt},
+            headers=auth_header(teacher_token),
+        )
+        assert response.status_code == 200
+        job_id = response.json()["id"]
+        assert enqueued == [(job_id,)]
+
+        await _run_job(test_engine, job_id)
+
+        response = await client.get(f"/exports/{job_id}", headers=auth_header(teacher_token))
+        data = response.json()
+        assert data["status"] == "completed"
+        assert data["finished_at"]
+
+        response = await client.get(
+            f"/exports/{job_id}/download", headers=auth_header(teacher_token)
+        )
+        assert response.status_code == 200
+        if fmt == "csv":
+            rows = list(csv.reader(io.StringIO(response.content.decode("utf-8-sig"))))
+            assert rows[0][0] == "会话ID"
+            contents = [r[7] for r in rows[1:]]
+        elif fmt == "xlsx":
+            sheet = load_workbook(io.BytesIO(response.content)).active
+            contents = [r[7] for r in sheet.iter_rows(min_row=2, values_only=True)]
+        else:
+            records = [json.loads(line) for line in response.text.splitlines()]
+            contents = [r["content"] for r in records]
+            assert records[0]["role"] == "user"
+        assert contents == [f"第{i}条" for i in range(5)]
+
+    async def test_teacher_cannot_export_other_class(
+        self,
+        client: AsyncClient,
+        teacher_token: str,
+        test_class: Class,
+        enqueued,
+    ):
+        response = await client.post(
+            "/exports",
+            json={"class_id": test_class.id},
+            headers=auth_header(teacher_token),
+        )
+        assert response.status_code == 403
+
+        response = await client.post(
+            "/exports", json={}, headers=auth_header(teacher_token)
+        )
+        assert response.status_code == 400
+        assert enqueued == []
+
+    async def test_date_scope_and_delete(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+        class_with_messages: Class,
+        test_engine,
+        enqueued,
+    ):
+        response = await client.post(
+            "/exports",
+            json={"start_date": "2000-01-01", "end_date": "2000-01-31", "format": "ndjson"},
+            headers=auth_header(admin_token),
+        )
+        job_id = response.json()["id"]
+        await _run_job(test_engine, job_id)
+
+        response = await client.get(
+            f"/exports/{job_id}/download", headers=auth_header(admin_token)
+        )
+        assert response.content == b""
+
+        response = await client.delete(f"/exports/{job_id}", headers=auth_header(admin_token))
+        assert response.status_code == 200
+        response = await client.get("/exports", headers=auth_header(admin_token))
+        assert response.json()["total"] == 0
+
+        response = await client.post(
+            "/exports", json={"start_date": "2026-13-01"}, headers=auth_header(admin_token)
+        )
+        assert response.status_code == 400
+
+
+class TestExportLinks:
+    """Tests for signed download links (local storage)."""
+
+    async def test_signed_link_round_trip(
+        self,
+        client: AsyncClient,
+        teacher_token: str,
+        class_with_messages: Class,
+        test_engine,
+        enqueued,
+    ):
+        response = await client.post(
+            "/exports",
+            json={"class_id": class_with_messages.id, "format": "ndjson"},
+            headers=auth_header(teacher_token),
+        )
+        job_id = response.json()["id"]
+        await _run_job(test_engine, job_id)
+
+        response = await client.get(f"/exports/{job_id}/link", headers=auth_header(teacher_token))
+        assert response.status_code == 200
+        data = response.json()
+        assert data["url"].startswith("/exports/files/")
+        assert data["expires_at"]
+
+        # 链接本身即凭证，无需登录
+        response = await client.get(data["url"])
+        assert response.status_code == 200
+        assert f'filename="export_{job_id}.ndjson"' in response.headers["content-disposition"]
+        assert len(response.text.splitlines()) == 5
+
+    async def test_expired_or_forged_link_rejected(self, client: AsyncClient, enqueued):
+        expired = sign_download_token("export-1.csv", "export_1.csv", expires_in=-1)
+        response = await client.get(f"/exports/files/{expired}")
+        assert response.status_code == 403
+
+        response = await client.get("/exports/files/not-a-token")
+        assert response.status_code == 403
+
+        # 签名有效但文件已不存在
+        missing = sign_download_token("export-404.csv", "export_404.csv", expires_in=60)
+        response = await client.get(f"/exports/files/{missing}")
+        assert response.status_code == 404
+
+
+class TestStreamExport:
+    """Tests for POST /exports/stream."""
+
+    @pytest.mark.parametrize("fmt", ["csv", "ndjson"])
+    async def test_stream_gzip_export(
+        self,
+        client: AsyncClient,
+        teacher_token: str,
+        class_with_messages: Class,
+        enqueued,
+        fmt,
+    ):
+        response = await client.post(
+            "/exports/stream",
+            json={"class_id": class_with_messages.id, "format": fmt},
+            headers=auth_header(teacher_token),
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/gzip"
+        assert f".{fmt}.gz" in response.headers["content-disposition"]
+
+        text = gzip.decompress(response.content).decode("utf-8-sig")
+        if fmt == "csv":
+            contents = [r[7] for r in list(csv.reader(io.StringIO(text)))[1:]]
+        else:
+            contents = [json.loads(line)["content"] for line in text.splitlines()]
+        assert contents == [f"第{i}条" for i in range(5)]
+        assert enqueued == []
+
+    async def test_stream_rejects_xlsx_and_foreign_class(
+        self,
+        client: AsyncClient,
+        teacher_token: str,
+        class_with_messages: Class,
+        test_session,
+    ):
+        response = await client.post(
+            "/exports/stream",
+            json={"class_id": class_with_messages.id, "format": "xlsx"},
+            headers=auth_header(teacher_token),
+        )
+        assert response.status_code == 400
+
+        other = Class(name="八年级二班", grade="八年级")
+        test_session.add(other)
+        await test_session.commit()
+        response = await client.post(
+            "/exports/stream",
+            json={"class_id": other.id, "format": "csv"},
+            headers=auth_header(teacher_token),
+        )
+        assert response.status_code == 403
+
+
+class TestIncrementalExport:
+    """Tests for per-consumer incremental exports."""
+
+    @pytest.fixture
+    def incremental(self, enqueued, monkeypatch):
+        monkeypatch.setattr(export_job.settings, "export_segment_rows", 2)
+        monkeypatch.setattr(export_job.settings, "export_incremental_settle_minutes", 0)
+        return enqueued
+
+    async def _segment_ids(self, client, token, job_id, count):
+        ids = []
+        for index in range(count):
+            response = await client.get(
+                f"/exports/{job_id}/segments/{index}", headers=auth_header(token)
+            )
+            assert response.status_code == 200
+            lines = gzip.decompress(response.content).decode("utf-8").splitlines()
+            ids.extend(json.loads(line)["message_id"] for line in lines)
+        return ids
+
+    async def test_segments_watermark_and_next_run(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+        class_with_messages: Class,
+        test_session,
+        test_engine,
+        incremental,
+    ):
+        response = await client.post(
+            "/exports",
+            json={"class_id": class_with_messages.id, "consumer": "district"},
+            headers=auth_header(admin_token),
+        )
+        assert response.status_code == 200
+        job_id = response.json()["id"]
+        assert response.json()["scope"]["format"] == "ndjson"
+        await _run_job(test_engine, job_id)
+
+        response = await client.get(f"/exports/{job_id}", headers=auth_header(admin_token))
+        scope = response.json()["scope"]
+        assert response.json()["status"] == "completed"
+        assert [s["rows"] for s in scope["segments"]] == [2, 2, 1]
+        first_ids = await self._segment_ids(client, admin_token, job_id, 3)
+        assert first_ids == sorted(first_ids) and len(first_ids) == 5
+
+        response = await client.get(
+            f"/exports/{job_id}/download", headers=auth_header(admin_token)
+        )
+        assert response.json()["to_message_id"] == first_ids[-1]
+
+        response = await client.get(
+            "/exports/watermarks/district", headers=auth_header(admin_token)
+        )
+        assert response.json()["message_id"] == first_ids[-1]
+
+        conversation_id = (
+            await test_session.execute(select(Conversation.id))
+        ).scalars().first()
+        test_session.add(
+            Message(conversation_id=conversation_id, role=MessageRole.USER, content="新问题")
+        )
+        await test_session.commit()
+
+        response = await client.post(
+            "/exports",
+            json={"class_id": class_with_messages.id, "consumer": "district"},
+            headers=auth_header(admin_token),
+        )
+        next_id = response.json()["id"]
+        assert response.json()["scope"]["from_message_id"] == first_ids[-1]
+        await _run_job(test_engine, next_id)
+        assert await self._segment_ids(client, admin_token, next_id, 1) == [first_ids[-1] + 1]
+
+        response = await client.post(
+            "/exports",
+            json={"consumer": "district"},
+            headers=auth_header(admin_token),
+        )
+        assert response.status_code == 400
+
+    async def test_resume_after_partial_failure(
+        self,
+        client: AsyncClient,
+        admin_token: str,
+        teacher_token: str,
+        class_with_messages: Class,
+        test_engine,
+        incremental,
+        monkeypatch,
+    ):
+        response = await client.post(
+            "/exports",
+            json={"class_id": class_with_messages.id, "consumer": "nightly"},
+            headers=auth_header(teacher_token),
+        )
+        assert response.status_code == 403
+
+        response = await client.post(
+            "/exports",
+            json={"consumer": "nightly"},
+            headers=auth_header(admin_token),
+        )
+        job_id = response.json()["id"]
+
+        finish = export_job._Segment.finish
+        calls = []
+
+        def failing_finish(segment):
+            calls.append(segment.index)
+            if len(calls) == 2:
+                raise OSError("disk full")
+            return finish(segment)
+
+        monkeypatch.setattr(export_job._Segment, "finish", failing_finish)
+        await _run_job(test_engine, job_id)
+        response = await client.get(f"/exports/{job_id}", headers=auth_header(admin_token))
+        data = response.json()
+        assert data["status"] == "failed"
+        assert len(data["scope"]["segments"]) == 1
+        assert data["scope"]["resume_after"] == data["scope"]["segments"][0]["last_message_id"]
+
+        monkeypatch.setattr(export_job._Segment, "finish", finish)
+        response = await client.post(
+            f"/exports/{job_id}/resume", headers=auth_header(admin_token)
+        )
+        assert response.json()["status"] == "pending"
+        # 已在队列中的任务不能再次入队
+        response = await client.post(
+            f"/exports/{job_id}/resume", headers=auth_header(admin_token)
+        )
+        assert response.status_code == 400
+        await _run_job(test_engine, job_id)
+
+        response = await client.get(f"/exports/{job_id}", headers=auth_header(admin_token))
+        assert response.json()["status"] == "completed"
+        ids = await self._segment_ids(client, admin_token, job_id, 3)
+        assert len(ids) == len(set(ids)) == 5
+
+
+class FakeS3Client:
+    def __init__(self):
+        self.objects: dict[str, bytes] = {}
+        self.uploads: dict[str, list[bytes]] = {}
+        self.aborted: list[str] = []
+
+    def create_multipart_upload(self, Bucket, Key):
+        upload_id = f"upload-{len(self.uploads) + 1}"
+        self.uploads[upload_id] = []
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        assert PartNumber == len(self.uploads[UploadId]) + 1
+        self.uploads[UploadId].append(Body)
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = MultipartUpload["Parts"]
+        assert [p["PartNumber"] for p in parts] == list(range(1, len(parts) + 1))
+        self.objects[Key] = b"".join(self.uploads.pop(UploadId))
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId)
+        self.aborted.append(Key)
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[Key] = Body
+
+
+class TestS3Storage:
+    """Tests for the S3 multipart writer against a fake client."""
+
+    def test_multipart_upload_and_abort(self):
+        client = FakeS3Client()
+        storage = S3ExportStorage("bucket", prefix="exports/", client=client, part_size=4)
+
+        with storage.writer("a.csv") as out:
+            out.write(b"0123456")
+            out.write(b"789")
+        assert client.objects["exports/a.csv"] == b"0123456789"
+        assert client.uploads == {}
+
+        # 不足一个分块时直接 put_object
+        storage.write_bytes("small.json", b"{}")
+        assert client.objects["exports/small.json"] == b"{}"
+
+        with pytest.raises(RuntimeError):
+            with storage.writer("b.csv") as out:
+                out.write(b"0123456789")
+                raise RuntimeError("查询失败")
+        assert "exports/b.csv" not in client.objects
+        assert client.aborted == ["exports/b.csv"]
+        assert client.uploads == {}
@@ -2,9 +2,15 @@
 Health and readiness endpoint tests.
 """
 
+import asyncio
+
 import pytest
 
-from app.main import healthz, readyz
+from app import resources as resources_module
+from app.llm import get_llm_provider
+from app.llm.provider import ChatMessage, OpenAICompatibleProvider
+from app.main import app, healthz, readyz
+from app.resources import create_upstream_http_client, resources
 
 
 class _DummySessionOK:
@@ -14,7 +20,10 @@ class _DummySessionOK:
     async def __aexit__(self, exc_type, exc, tb):
         return False
 
+    calls = 0
+
     async def execute(self, _statement):
+        _DummySessionOK.calls += 1
         return None
 
 
@@ -29,6 +38,13 @@ class _DummySessionFail:
         raise RuntimeError("db down")
 
 
+@pytest.fixture(autouse=True)
+def fresh_readiness():
+    resources.clear_readiness()
+    yield
+    resources.clear_readiness()
+
+
 @pytest.mark.asyncio
 async def test_healthz_returns_ok():
     response = await healthz()
@@ -37,10 +53,8 @@ async def test_healthz_returns_ok():
 
 @pytest.mark.asyncio
 async def test_readyz_reports_database_ok(monkeypatch):
-    from app import main
-
-    monkeypatch.setattr(main.settings, "readiness_check_redis", False)
-    monkeypatch.setattr(main, "async_session_maker", lambda: _DummySessionOK())
+    monkeypatch.setattr(resources_module.settings, "readiness_check_redis", False)
+    monkeypatch.setattr(resources_module, "async_session_maker", lambda: _DummySessionOK())
 
     response = await readyz()
 
@@ -51,13 +65,155 @@ async def test_readyz_reports_database_ok(monkeypatch):
 
 @pytest.mark.asyncio
 async def test_readyz_reports_database_failure(monkeypatch):
-    from app import main
-
-    monkeypatch.setattr(main.settings, "readiness_check_redis", False)
-    monkeypatch.setattr(main, "async_session_maker", lambda: _DummySessionFail())
+    monkeypatch.setattr(resources_module.settings, "readiness_check_redis", False)
+    monkeypatch.setattr(resources_module, "async_session_maker", lambda: _DummySessionFail())
 
     response = await readyz()
 
     assert response["ok"] is False
     assert response["checks"]["database"] is False
     assert response["checks"]["redis"] is True
+
+
+@pytest.mark.asyncio
+async def test_readyz_result_is_cached(monkeypatch):
+    monkeypatch.setattr(resources_module.settings, "readiness_check_redis", False)
+    monkeypatch.setattr(resources_module.settings, "readiness_cache_seconds", 60)
+    monkeypatch.setattr(resources_module, "async_session_maker", lambda: _DummySessionOK())
+    _DummySessionOK.calls = 0
+
+    responses = await asyncio.gather(*[readyz() for _ in range(5)])
+    assert all(response["ok"] for response in responses)
+    assert _DummySessionOK.calls == 1
+
+    # 缓存期内数据库故障不会立即反映，过期后重新检查
+    monkeypatch.setattr(resources_module, "async_session_maker", lambda: _DummySessionFail())
+    assert (await readyz())["ok"] is True
+    monkeypatch.setattr(resources_module.settings, "readiness_cache_seconds", 0)
+    assert (await readyz())["ok"] is False
+
+
+@pytest.mark.asyncio
+async def test_lifespan_shares_upstream_http_pool(monkeypatch):
+    monkeypatch.setattr(resources_module.settings, "skip_startup_llm_sync", True)
+    monkeypatch.setattr(resources_module.settings, "readiness_check_redis", False)
+    monkeypatch.setattr(resources_module.settings, "startup_db_timeout_seconds", 0.2)
+
+    async with app.router.lifespan_context(app):
+        client = resources.http_client
+        assert client is not None and not client.is_closed
+        provider = get_llm_provider()
+        assert provider.client is client
+        # 共享连接池不随 Provider 关闭
+        await provider.aclose()
+        assert not client.is_closed
+
+    assert resources.http_client is None
+    assert client.is_closed
+    assert get_llm_provider().client is not client
+
+
+class _StreamingUpstream:
+    """本地 SSE 上游：每个回复先发一段，等 release 后才结束，统计同时打开的连接数"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.open = 0
+        self.peak = 0
+        self.server = None
+
+    async def _handle(self, reader, writer):
+        self.open += 1
+        self.peak = max(self.peak, self.open)
+        try:
+            while True:
+                headers = await reader.readuntil(b"\r\n\r\n")
+                length = int(
+                    next(
+                        (
+                            line.split(b":", 1)[1]
+                            for line in headers.split(b"\r\n")
+                            if line.lower().startswith(b"content-length:")
+                        ),
+                        b"0",
+                    )
+                )
+                await reader.readexactly(length)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                    b"Transfer-Encoding: chunked\r\n\r\n"
+                )
+                self._chunk(writer, b'data: {"choices": [{"delta": {"content": "hi"}}]}\n\n')
+                await writer.drain()
+                await self.release.wait()
+                self._chunk(writer, b"data: [DONE]\n\n")
+                writer.write(b"0\r\n\r\n")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.open -= 1
+            writer.close()
+
+    @staticmethod
+    def _chunk(writer, data: bytes) -> None:
+        writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}/v1"
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def _stream_all(upstream: _StreamingUpstream, streams: int, peak: int) -> list[str]:
+    client = create_upstream_http_client()
+    provider = OpenAICompatibleProvider(api_key="key", base_url=upstream.base_url, client=client)
+
+    async def one() -> str:
+        parts = []
+        async for part in provider.chat_stream([ChatMessage(role="user", content="q")]):
+            parts.append(part)
+        return "".join(parts)
+
+    try:
+        tasks = [asyncio.ensure_future(one()) for _ in range(streams)]
+        for _ in range(100):
+            await asyncio.sleep(0.02)
+            if upstream.peak >= peak:
+                break
+        # 多等一会，确认排队的请求没有打开新连接
+        await asyncio.sleep(0.1)
+        upstream.release.set()
+        return await asyncio.wait_for(asyncio.gather(*tasks), timeout=5)
+    finally:
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_upstream_pool_does_not_cap_concurrent_streams(monkeypatch):
+    # 默认不限制连接数：流式回复数超过空闲连接上限时也全部同时进行
+    monkeypatch.setattr(resources_module.settings, "upstream_http_max_connections", 0)
+    monkeypatch.setattr(resources_module.settings, "upstream_http_max_keepalive_connections", 2)
+
+    async with _StreamingUpstream() as upstream:
+        results = await _stream_all(upstream, 6, peak=6)
+
+    assert results == ["hi"] * 6
+    assert upstream.peak == 6
+
+
+@pytest.mark.asyncio
+async def test_upstream_pool_limit_queues_extra_streams(monkeypatch):
+    # 设置上限后超出的流式回复排队，等前面的回复结束后复用连接
+    monkeypatch.setattr(resources_module.settings, "upstream_http_max_connections", 2)
+
+    async with _StreamingUpstream() as upstream:
+        results = await _stream_all(upstream, 4, peak=2)
+
+    assert results == ["hi"] * 4
+    assert upstream.peak == 2
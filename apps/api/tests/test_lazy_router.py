@@ -0,0 +1,75 @@
+"""
+On-demand routers: rarely used subsystems are imported on first request.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi import APIRouter, FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.lazy_router import LazyRouter, include_lazy_router, load_lazy_routers
+
+lazy_router = APIRouter()
+
+
+@lazy_router.get("/items/{item_id}")
+async def get_item(item_id: int):
+    return {"item_id": item_id}
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/lazy/eager")
+    async def eager():
+        return {"eager": True}
+
+    include_lazy_router(app, "tests.test_lazy_router:lazy_router", ["/items"], prefix="/lazy")
+    return app
+
+
+async def test_loads_on_first_matching_request():
+    app = _app()
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        # 立即加载的路由优先，不触发加载
+        assert (await client.get("/lazy/eager")).json() == {"eager": True}
+        assert any(isinstance(route, LazyRouter) for route in app.router.routes)
+
+        assert (await client.get("/lazy/items/3")).json() == {"item_id": 3}
+        assert not any(isinstance(route, LazyRouter) for route in app.router.routes)
+        assert (await client.get("/lazy/items/4")).json() == {"item_id": 4}
+        assert (await client.post("/lazy/items/4")).status_code == 405
+        assert (await client.get("/lazy/other")).status_code == 404
+
+
+def test_openapi_after_loading():
+    app = _app()
+    load_lazy_routers(app)
+    assert "/lazy/items/{item_id}" in app.openapi()["paths"]
+
+
+def test_app_main_defers_rarely_used_subsystems():
+    code = (
+        "import sys, app.main; "
+        "print(','.join(m for m in ('app.exports', 'app.admin.llm_routes', "
+        "'app.admin.import_routes', 'app.admin.credential_routes', 'rq', 'openpyxl') "
+        "if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parents[1],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == ""
+
+    from app.main import app
+
+    paths = app.openapi()["paths"]
+    assert "/exports/{job_id}/link" in paths
+    assert "/admin/settings/llm/benchmark" in paths
+    assert "/admin/users/import-jobs" in paths
@@ -0,0 +1,89 @@
+"""
+Monthly partition helpers, pruning predicates and the maintenance job.
+
+Partitioning itself is PostgreSQL-only; on SQLite the predicates must still
+return the same rows and the job must do nothing.
+"""
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.partitions import (
+    add_months,
+    conversation_messages,
+    message_floor,
+    month_start,
+    parse_partition_month,
+    partition_name,
+)
+from app.jobs.partitions import process_partitions
+from app.models import Class, Conversation, Message, MessageRole, User
+
+
+def test_month_helpers():
+    assert month_start(datetime(2026, 9, 17, 8, 30)) == date(2026, 9, 1)
+    assert add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 1), -13) == date(2024, 12, 1)
+
+    name = partition_name("messages", date(2026, 9, 1))
+    assert name == "messages_y2026m09"
+    assert parse_partition_month("messages", name) == date(2026, 9, 1)
+    assert parse_partition_month("messages", "messages_default") is None
+    assert parse_partition_month("audit_logs", name) is None
+
+
+def test_floor_compiles_per_dialect():
+    condition = conversation_messages(Conversation.id, Conversation.created_at)
+    pg = str(condition.compile(dialect=postgresql.dialect()))
+    assert "conversations.created_at - INTERVAL '1 days'" in pg
+    lite = str(condition.compile(dialect=sqlite.dialect()))
+    assert "datetime(conversations.created_at, '-1 days')" in lite
+
+    created = datetime(2026, 9, 1, 12)
+    assert message_floor(created) == created - timedelta(days=1)
+
+
+async def test_pruned_queries_return_all_messages(
+    test_session: AsyncSession,
+    student_user: User,
+    fully_setup_class: Class,
+):
+    created = datetime(2026, 9, 30, 23, 50)
+    conversation = Conversation(
+        class_id=fully_setup_class.id, student_id=student_user.id, created_at=created
+    )
+    test_session.add(conversation)
+    await test_session.flush()
+    # 跨月的会话；第一条消息的时间略早于会话（不同主机的时钟误差）
+    for offset in (-5, 1, 20, 60 * 24 * 3):
+        test_session.add(
+            Message(
+                conversation_id=conversation.id,
+                role=MessageRole.USER,
+                content="问题",
+                created_at=created + timedelta(minutes=offset),
+            )
+        )
+    await test_session.commit()
+
+    by_value = await test_session.scalars(
+        select(Message.id).where(conversation_messages(conversation.id, conversation.created_at))
+    )
+    assert len(by_value.all()) == 4
+
+    correlated = await test_session.scalars(
+        select(Conversation.id).where(
+            select(Message.id)
+            .where(conversation_messages(Conversation.id, Conversation.created_at))
+            .exists()
+        )
+    )
+    assert conversation.id in correlated.all()
+
+
+async def test_maintenance_job_is_noop_without_postgresql(test_engine):
+    session_factory = async_sessionmaker(test_engine, class_=AsyncSession)
+    assert await process_partitions(session_factory, date(2026, 10, 19)) == {}
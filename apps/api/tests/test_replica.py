@@ -0,0 +1,128 @@
+"""
+Read-replica routing tests.
+
+The "replica" is a second, empty in-memory database, so a read served by it
+sees no rows while a read served by the primary sees the test data.
+"""
+
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.auth.membership_cache import get_teacher_class_ids, invalidate_memberships
+from app.cache import get_cache
+from app.db import replica
+from app.db.base import Base
+from app.db.replica import REPLICA_SESSION_INFO, ReplicaLagMonitor, get_read_db
+from app.main import app
+from app.models import Class
+
+from tests.conftest import TEST_DATABASE_URL, auth_header
+
+
+@pytest.fixture
+async def stale_replica(monkeypatch, test_engine):
+    engine = create_async_engine(
+        TEST_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    monitor = ReplicaLagMonitor(engine, max_lag_seconds=5, check_interval_seconds=0)
+    monkeypatch.setattr(
+        replica,
+        "async_session_maker",
+        async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False),
+    )
+    monkeypatch.setattr(
+        replica,
+        "replica_session_maker",
+        async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False),
+    )
+    monkeypatch.setattr(replica, "replica_monitor", monitor)
+    monkeypatch.setattr(replica.settings, "read_your_writes_seconds", 0.2)
+    yield monitor
+    await engine.dispose()
+
+
+async def test_no_replica_uses_primary():
+    assert replica.replica_session_maker is None
+    assert await replica.read_session_maker(1) is replica.async_session_maker
+
+
+async def test_read_your_writes_and_lag_fallback(
+    client: AsyncClient,
+    student_token: str,
+    fully_setup_class: Class,
+    stale_replica: ReplicaLagMonitor,
+):
+    # 使用真实的 get_read_db 做路由
+    app.dependency_overrides.pop(get_read_db)
+
+    response = await client.post(
+        "/conversations",
+        json={"class_id": fully_setup_class.id, "title": "循环"},
+        headers=auth_header(student_token),
+    )
+    assert response.status_code == 200
+    messages_url = f"/conversations/{response.json()['id']}/messages"
+
+    # 刚写入：仍读主库，能看到自己的对话
+    response = await client.get(messages_url, headers=auth_header(student_token))
+    assert response.status_code == 200
+
+    # 写入标记过期后读副本（副本尚未同步）
+    await asyncio.sleep(0.3)
+    response = await client.get(messages_url, headers=auth_header(student_token))
+    assert response.status_code == 404
+
+    # 副本延迟超过阈值：回退主库
+    async def lagging():
+        return 30.0
+
+    stale_replica.measure_lag = lagging
+    response = await client.get(messages_url, headers=auth_header(student_token))
+    assert response.status_code == 200
+    assert stale_replica.lag_seconds == 30.0
+
+
+async def test_unreachable_replica_falls_back(stale_replica: ReplicaLagMonitor):
+    async def unreachable():
+        raise ConnectionRefusedError("replica down")
+
+    stale_replica.measure_lag = unreachable
+    assert await replica.read_session_maker(None) is replica.async_session_maker
+
+    # 测量结果在 check_interval_seconds 内复用
+    stale_replica.check_interval_seconds = 60
+    del stale_replica.measure_lag
+    assert await replica.read_session_maker(None) is replica.async_session_maker
+    stale_replica.check_interval_seconds = 0
+    assert await replica.read_session_maker(None) is replica.replica_session_maker
+
+
+async def test_authorization_reads_primary(
+    client: AsyncClient,
+    teacher_token: str,
+    teacher_user,
+    fully_setup_class: Class,
+    stale_replica: ReplicaLagMonitor,
+):
+    app.dependency_overrides.pop(get_read_db)
+
+    # 副本上还没有成员关系：权限仍按主库判断，列表数据来自副本
+    response = await client.get(
+        f"/teacher/classes/{fully_setup_class.id}/students",
+        headers=auth_header(teacher_token),
+    )
+    assert response.status_code == 200
+
+    # 副本会话读到的成员关系不写入缓存
+    await invalidate_memberships(teacher_user.id)
+    async with replica.replica_session_maker() as session:
+        session.info[REPLICA_SESSION_INFO] = True
+        assert await get_teacher_class_ids(session, teacher_user.id) == frozenset()
+    assert await get_cache().get(f"membership:{teacher_user.id}", "teacher") is None
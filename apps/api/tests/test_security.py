@@ -4,9 +4,23 @@ Security unit tests.
 Tests:
 - Password hashing and verification
 - bcrypt 72-byte truncation behavior is handled safely
+- Hashing offloaded to the bounded worker pool
+- Pool statistics stay balanced when submission fails or a waiting call is cancelled
 """
 
-from app.auth.security import hash_password, verify_password
+import asyncio
+import threading
+
+import pytest
+
+from app.auth import security
+from app.auth.security import (
+    get_password_hasher_stats,
+    hash_password,
+    hash_password_async,
+    verify_password,
+    verify_password_async,
+)
 
 
 def test_password_hash_and_verify():
@@ -32,3 +46,57 @@ def test_unicode_password_is_supported():
     assert verify_password(password, hashed) is True
     assert verify_password("密" + ("码" * 199), hashed) is False
 
+
+
+async def test_async_hash_and_verify_use_worker_pool():
+    before = get_password_hasher_stats()
+
+    hashed = await hash_password_async("student123")
+    results = await asyncio.gather(
+        verify_password_async("student123", hashed),
+        verify_password_async("wrongpassword", hashed),
+    )
+
+    assert results == [True, False]
+    assert verify_password("student123", hashed) is True
+
+    after = get_password_hasher_stats()
+    assert after.completed - before.completed == 3
+    assert after.queued == 0
+    assert after.in_flight == 0
+
+
+async def test_queued_count_recovers_when_submit_fails(monkeypatch):
+    class ClosedPool:
+        def submit(self, *args):
+            raise RuntimeError("cannot schedule new futures after shutdown")
+
+    monkeypatch.setattr(security, "_get_hash_pool", lambda: ClosedPool())
+    before = get_password_hasher_stats().queued
+
+    with pytest.raises(RuntimeError):
+        await hash_password_async("student123")
+
+    assert get_password_hasher_stats().queued == before
+
+
+async def test_queued_count_recovers_when_waiting_call_is_cancelled(monkeypatch):
+    monkeypatch.setattr(security.settings, "password_hash_workers", 1)
+    monkeypatch.setattr(security, "_pool", None)
+    release = threading.Event()
+    try:
+        # 占住唯一的工作线程，第二个调用只能排队
+        blocker = asyncio.ensure_future(security._run_in_hash_pool(release.wait))
+        await asyncio.sleep(0.05)
+        waiting = asyncio.ensure_future(hash_password_async("student123"))
+        await asyncio.sleep(0.05)
+        assert get_password_hasher_stats().queued == 1
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert get_password_hasher_stats().queued == 0
+    finally:
+        release.set()
+        await blocker
+        security.shutdown_password_hasher()
@@ -0,0 +1,55 @@
+"""
+Synthetic school generator tests (determinism and bulk load on SQLite).
+"""
+
+from sqlalchemy import create_engine, func, select
+
+import seed_synthetic
+from app.auth.security import verify_password
+from app.db.base import Base
+from app.models import Message, MessageRole, User
+from seed_synthetic import SchoolSpec, generate
+
+
+def _materialize(spec: SchoolSpec) -> dict[str, list[tuple]]:
+    return {data.table: list(data.rows) for data in generate(spec)}
+
+
+def test_same_seed_generates_identical_data():
+    spec = SchoolSpec(classes=3, students_per_class=5, teachers=2, messages=400)
+    first = _materialize(spec)
+    assert first == _materialize(spec)
+    other = SchoolSpec(seed=7, classes=3, students_per_class=5, teachers=2, messages=400)
+    assert first["messages"] != _materialize(other)["messages"]
+
+    messages = first["messages"]
+    assert len(messages) == 400
+    assert [m[2] for m in messages[:4]] == ["user", "assistant", "user", "assistant"]
+    # 每个会话的消息按时间递增，会话的 last_message_at 为最后一条消息的时间
+    last_by_conversation = {m[1]: m[4] for m in messages}
+    assert all(c[8] == last_by_conversation[c[0]] for c in first["conversations"])
+
+    users = first["users"]
+    assert len(users) == 1 + 2 + 15
+    assert verify_password(spec.password, users[0][4])
+
+
+async def test_seed_into_sqlite(tmp_path):
+    path = tmp_path / "synthetic.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    spec = SchoolSpec(classes=2, students_per_class=4, teachers=2, messages=200, audit_logs=20)
+
+    counts = await seed_synthetic.seed(f"sqlite+aiosqlite:///{path}", spec)
+    assert counts["messages"] == 200
+    assert counts["audit_logs"] == 20
+
+    # 重新生成（--truncate）结果一致
+    assert await seed_synthetic.seed(f"sqlite+aiosqlite:///{path}", spec, truncate=True) == counts
+
+    with engine.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(User)) == 1 + 2 + 8
+        assert conn.scalar(
+            select(func.count()).where(Message.role == MessageRole.USER)
+        ) == 100
+    engine.dispose()
@@ -130,7 +130,11 @@ export function UserTable({
                     : u.role === "teacher"
                       ? u.class_names?.join("、") || "-"
                       : "-";
-                const statusLabel = u.status === "disabled" ? "禁用" : "正常";
+                const statusLabel = u.pending_deletion
+                  ? "删除中"
+                  : u.status === "disabled"
+                    ? "禁用"
+                    : "正常";
 
                 return (
                   <tr key={u.id} className="border-b align-top">
@@ -188,6 +192,8 @@ export function UserTable({
                             取消
                           </Button>
                         </div>
+                      ) : u.pending_deletion ? (
+                        <span className="text-muted-foreground">后台删除中</span>
                       ) : (
                         <div className="flex gap-2 flex-wrap">
                           <Button size="sm" variant="outline" onClick={() => startEditUser(u)}>
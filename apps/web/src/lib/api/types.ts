@@ -69,6 +69,11 @@ export interface ClassDetail {
   id: number;
   name: string;
   grade: string | null;
+  student_count: number;
+  teacher_count: number;
+  student_total: number;
+  page: number;
+  page_size: number;
   students: StudentInClass[];
   teachers: { id: number; username: string; display_name: string | null }[];
   created_at: string;
@@ -132,6 +137,7 @@ export interface AdminUserListItem {
   created_at: string;
   last_login_at: string | null;
   class_names: string[];
+  pending_deletion?: boolean;
 }
 
 // Bulk import types